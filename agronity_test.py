@@ -1,22 +1,31 @@
+import importlib.util
+import io
 import os
 import joblib
 import pandas as pd
 import numpy as np
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
+from name_resolver import NameResolver
+from image_cache import PerceptualCache, dhash
+from circuit_breaker import CircuitBreaker
+from tree_explain import TreeExplainer
+from memory_budget import MemoryLedger, rss_bytes
+from data_store import DatabaseBuilder, ReadOnlyDatabase
 
-# Try to import Keras for the image model
-try:
-    import keras
-    KERAS_AVAILABLE = True
-except ImportError:
-    KERAS_AVAILABLE = False
-
-# Try to import TensorFlow for the image model
-try:
-    import tensorflow as tf
-    TF_AVAILABLE = True
-except ImportError:
-    TF_AVAILABLE = False
+# Keras and TensorFlow for the image model are imported on first use
+# (import_frameworks), so processes that only run the sklearn paths, such as
+# the bulk scoring workers, never load them
+keras = None
+tf = None
+KERAS_AVAILABLE = importlib.util.find_spec("keras") is not None
+TF_AVAILABLE = importlib.util.find_spec("tensorflow") is not None
+FRAMEWORK_IMPORT_BYTES = 0  # RSS the imports added, once imported
+_FRAMEWORK_LOCK = threading.Lock()
 
 # Try to import OpenCV for image processing
 try:
@@ -32,11 +41,455 @@ try:
 except ImportError:
     PIL_AVAILABLE = False
 
+# Try to import threadpoolctl (installed with scikit-learn) to size the BLAS/OpenMP pools
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+# fcntl (POSIX) lets several worker processes share the ingest store
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 # Get the directory where this script is located
 MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(MODEL_DIR, "models")
 DATA_FILE = "sihdatasets.csv"
 
+# --------------------
+# Dataset Schema
+# --------------------
+# Columns read by the sklearn analysis path and the ruleset image detector.
+# Everything else in the CSVs is dropped at load time.
+MAIN_DATA_COLUMNS = [
+    "District", "Soil_Type", "crop",
+    "Crop_Production_Rate_Yearly", "Mandi_Price_Rupees_per_kg",
+    "Avg_Rainfall_mm", "Avg_Temperature_C", "Fertilizer_Usage_kg_per_ha",
+    "pH_Level", "Phosphorus_kg_per_ha", "Potassium_kg_per_ha", "Nitrogen_kg_per_ha",
+    "Organic_Matter_Percentage", "Electrical_Conductivity_dS_per_m",
+    "Cation_Exchange_Capacity_meq_per_100g",
+    "Zinc_ppm", "Iron_ppm", "Manganese_ppm", "Copper_ppm",
+]
+
+# The agri_ml path averages every numeric column the model was trained on
+# (see models/agri_ml_model/model/columns.json), keyed by district and crop.
+REGIONAL_CATEGORICAL_COLUMNS = ["District", "Major_Crops", "Soil_Type"]
+
+# Categorical columns and the shared vocabulary each one is coded against.
+# Every frame draws its categories from the same append-only vocabulary, so a
+# given District/Soil_Type/crop has the same integer code in every frame.
+CATEGORY_VOCABULARY = {
+    "District": "District",
+    "Soil_Type": "Soil_Type",
+    "crop": "crop",
+    "Major_Crops": "crop",
+}
+
+_VOCABULARIES = {name: [] for name in set(CATEGORY_VOCABULARY.values())}
+_VOCABULARY_CODES = {name: {} for name in _VOCABULARIES}  # lowercase value -> [codes]
+
+# Typo-tolerant lookup over the shared vocabularies, extended as frames load
+NAME_RESOLVER = NameResolver()
+
+# Keywords the ruleset image detector looks for in filenames. Misspelled
+# keywords are accepted above a stricter score than typed form inputs, since
+# arbitrary filename words ("photo", "field") are also checked.
+IMAGE_KEYWORD_MIN_SCORE = 0.8
+CROP_KEYWORDS = {
+    "rice": ["rice", "paddy", "धान", "நெல்"],
+    "wheat": ["wheat", "गेहूं", "கோதுமை"],
+    "tomato": ["tomato", "टमाटर", "தக்காளி"],
+    "cotton": ["cotton", "कपास", "棉"],
+    "groundnut": ["groundnut", "mungfali", "गंडु", "கடலை"],
+    "sugarcane": ["sugarcane", "गन्ना", "கரும்பு"],
+    "maize": ["maize", "corn", "मक्का", "玉米"],
+    "chilli": ["chilli", "pepper", "मिर्च", "மிளகாய்"],
+    "soybean": ["soybean", "सोयाबीन", "சோயாபீன்"],
+    "mustard": ["mustard", "सरसों", "芥末"],
+    "potato": ["potato", "आलू", "உருளை"],
+    "onion": ["onion", "प्याज", "வெங்காயம்"]
+}
+for _crop, _keywords in CROP_KEYWORDS.items():
+    for _keyword in _keywords:
+        NAME_RESOLVER.add("image_crop", _keyword, canonical=_crop)
+
+
+def _regional_data_columns():
+    """Columns kept for the regional (agri_ml) frame."""
+    columns_file = os.path.join(MODELS_DIR, "agri_ml_model", "model", "columns.json")
+    try:
+        with open(columns_file, "r") as f:
+            import json
+            numeric_cols = json.load(f)["numeric_cols"]
+    except (OSError, ValueError, KeyError):
+        numeric_cols = None  # keep every numeric column
+    return REGIONAL_CATEGORICAL_COLUMNS, numeric_cols
+
+
+def _vocabulary_dtype(name, values):
+    """Extend the shared vocabulary `name` with `values` and return its dtype."""
+    vocabulary = _VOCABULARIES[name]
+    codes = _VOCABULARY_CODES[name]
+    known = set(vocabulary)
+    for value in pd.unique(values):
+        if isinstance(value, str) and value not in known:
+            known.add(value)
+            codes.setdefault(value.lower(), []).append(len(vocabulary))
+            vocabulary.append(value)
+            NAME_RESOLVER.add(name, value)
+    return pd.CategoricalDtype(vocabulary)
+
+
+def compact_frame(df, keep_columns=None, label="dataset"):
+    """
+    Converts a raw CSV frame to the compact in-memory layout:
+    - drops columns not in `keep_columns` (categoricals are always kept)
+    - converts categoricals to `category` over the shared vocabularies
+    - downcasts integers to the smallest safe int type; floats stay float64,
+      since they feed the preprocessor and the profit formula unchanged
+    Prints the memory used before and after.
+    """
+    before = df.memory_usage(deep=True).sum()
+
+    categorical = [c for c in df.columns if c in CATEGORY_VOCABULARY]
+    if keep_columns is not None:
+        keep = set(keep_columns) | set(categorical)
+        df = df[[c for c in df.columns if c in keep]]
+
+    compact = {}
+    for col in df.columns:
+        series = df[col]
+        if col in categorical:
+            compact[col] = series.astype(_vocabulary_dtype(CATEGORY_VOCABULARY[col], series.dropna()))
+        elif pd.api.types.is_integer_dtype(series):
+            compact[col] = pd.to_numeric(series, downcast="integer")
+        else:
+            compact[col] = series
+    df = pd.DataFrame(compact, index=df.index)
+
+    after = df.memory_usage(deep=True).sum()
+    print(f"✓ {label} memory: {before / 1e6:.2f} MB → {after / 1e6:.2f} MB ({len(df)} rows, {df.shape[1]} columns)")
+    return df
+
+
+def _category_mask(series, value):
+    """
+    Boolean mask of rows whose value equals `value` (case-insensitive).
+    Categorical columns are matched on their integer codes.
+    """
+    vocabulary = CATEGORY_VOCABULARY.get(series.name)
+    if vocabulary is None or not isinstance(series.dtype, pd.CategoricalDtype):
+        return (series.str.lower() == str(value).lower()).to_numpy()
+    codes = _VOCABULARY_CODES[vocabulary].get(str(value).lower())
+    if not codes:
+        return np.zeros(len(series), dtype=bool)
+    series_codes = series.cat.codes.to_numpy()
+    if len(codes) == 1:
+        return series_codes == codes[0]
+    return np.isin(series_codes, codes)
+
+
+def resolve_name(kind, query):
+    """
+    Best canonical match for a possibly misspelled name plus alternatives.
+    `kind` is a vocabulary name: "District", "Soil_Type" or "crop".
+    """
+    return NAME_RESOLVER.resolve(kind, query)
+
+
+def _resolve_inputs(data_df, inputs):
+    """
+    Resolves misspelled values against the names present in `data_df`.
+
+    `inputs` maps column -> user value. Values that match exactly are kept;
+    others are replaced by the best resolver candidate that has rows in the
+    frame. Returns (values, resolved) where `resolved` describes every value
+    that had to be corrected (or could not be).
+    """
+    values = dict(inputs)
+    resolved = {}
+    if not isinstance(data_df, pd.DataFrame):  # regional shards or a data store
+        contains = data_df.contains
+    else:
+        contains = lambda column, value: _category_mask(data_df[column], value).any()
+    for column, value in inputs.items():
+        if column not in data_df.columns or contains(column, value):
+            continue
+        resolution = resolve_name(CATEGORY_VOCABULARY.get(column, column), value)
+        candidates = [resolution["match"]] if resolution["match"] else []
+        candidates += [alt["name"] for alt in resolution["alternatives"]]
+        match = next((c for c in candidates if contains(column, c)), None)
+        resolved[column] = {
+            "input": value,
+            "match": match if resolution["match"] else None,
+            "alternatives": [c for c in candidates if c != match],
+        }
+        if resolved[column]["match"]:
+            values[column] = match
+    return values, resolved
+
+
+def _match_district_soil(data_df, district, soil_type):
+    """Rows of `data_df` for a district/soil pair (case-insensitive)."""
+    return data_df[_category_mask(data_df['District'], district) &
+                   _category_mask(data_df['Soil_Type'], soil_type)]
+
+
+def _row_to_dict(row):
+    """Converts a DataFrame row to a dict of native Python values.
+
+    Compact frames hold int8/int16 scalars, which would otherwise overflow
+    in the profit arithmetic.
+    """
+    return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in row.items()}
+
+# --------------------
+# Derived Indexes
+# --------------------
+# Structures derived from a DataFrame (spatial indexes, aggregates) are cached
+# per frame object and dropped when the frame is garbage collected, so a
+# reloaded dataset automatically gets fresh ones. Their arrays are read-only:
+# every request of every thread shares them.
+_FRAME_INDEXES = {}
+
+
+def frame_index(data_df):
+    """Dict of derived structures cached for this DataFrame object."""
+    key = id(data_df)
+    entry = _FRAME_INDEXES.get(key)
+    if entry is None:
+        entry = _FRAME_INDEXES[key] = {}
+        weakref.finalize(data_df, _FRAME_INDEXES.pop, key, None)
+    return entry
+
+
+def _read_only(array):
+    """
+    Marks a cached array read-only. For a view of an append buffer only the
+    view is locked; the buffer itself stays writable for later appends.
+    """
+    array.flags.writeable = False
+    return array
+
+
+def _read_only_values(mapping):
+    """`mapping` with its array values marked read-only."""
+    for value in mapping.values():
+        if isinstance(value, np.ndarray):
+            _read_only(value)
+    return mapping
+
+
+# Soil and climate features used to find similar district/soil profiles
+PROFILE_FEATURES = [
+    "Avg_Rainfall_mm", "Avg_Temperature_C",
+    "pH_Level", "Nitrogen_kg_per_ha", "Phosphorus_kg_per_ha", "Potassium_kg_per_ha",
+    "Organic_Matter_Percentage",
+    "Zinc_ppm", "Iron_ppm", "Manganese_ppm", "Copper_ppm",
+]
+NEAREST_PROFILES = 5
+
+
+def _profile_index(data_df):
+    """
+    KD-trees over the standardized profile features: one over every row and
+    one per Soil_Type category, plus the numeric columns and category codes as
+    plain arrays so a fallback never touches pandas (built once per frame).
+    """
+    entry = frame_index(data_df)
+    index = entry.get("profiles")
+    if index is not None:
+        return index
+
+    from scipy.spatial import cKDTree as KDTree  # scipy ships with scikit-learn
+    features = data_df[PROFILE_FEATURES].to_numpy(dtype=np.float64)
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    X = (features - mean) / scale
+
+    district_codes = data_df['District'].cat.codes.to_numpy()
+    soil_codes = data_df['Soil_Type'].cat.codes.to_numpy()
+    trees = {None: (KDTree(X), _read_only(np.arange(len(X))))}
+    for code in np.unique(soil_codes[soil_codes >= 0]):
+        rows = np.flatnonzero(soil_codes == code)
+        trees[int(code)] = (KDTree(X[rows]), _read_only(rows))
+
+    numeric_columns = [c for c in data_df.columns if pd.api.types.is_numeric_dtype(data_df[c])]
+    index = {
+        "mean": mean,
+        "scale": scale,
+        "X": X,
+        "trees": trees,
+        "pending": {},  # soil code (None = all) -> rows appended since the trees were built
+        "numeric_columns": numeric_columns,
+        "numeric": data_df[numeric_columns].to_numpy(dtype=np.float64),
+        "district_codes": district_codes,
+        "soil_codes": soil_codes,
+        "districts": np.asarray(data_df['District'].cat.categories, dtype=object),
+        "soils": np.asarray(data_df['Soil_Type'].cat.categories, dtype=object),
+    }
+    entry["profiles"] = _read_only_values(index)
+    return index
+
+
+def _nearest_profiles(data_df, district, soil_type, k=NEAREST_PROFILES):
+    """
+    Approximate profile for a district/soil pair that has no row in `data_df`.
+
+    The known half of the pair supplies the query (the district's mean
+    profile, or else the soil's); the neighbours are searched among the rows
+    of the requested soil when it exists in the frame, otherwise among all
+    rows. Returns None when neither the district nor the soil is known.
+    """
+    district_mask = _category_mask(data_df['District'], district)
+    soil_mask = _category_mask(data_df['Soil_Type'], soil_type)
+    district_rows = np.flatnonzero(district_mask)
+    soil_rows = np.flatnonzero(soil_mask)
+    if not len(district_rows) and not len(soil_rows):
+        return None
+
+    index = _profile_index(data_df)
+    if len(district_rows):
+        # Standardizing is linear, so the district's mean row comes from its running sums
+        means = _district_means(data_df)
+        codes = np.unique(index["district_codes"][district_rows])
+        district_mean = means["sum"][codes].sum(axis=0) / means["count"][codes].sum()
+        query = (district_mean - index["mean"]) / index["scale"]
+    else:
+        query = index["X"][soil_rows].mean(axis=0)
+
+    soil_code = int(index["soil_codes"][soil_rows[0]]) if len(soil_rows) else None
+    distances, neighbour_rows = _query_profiles(index, soil_code, query, k)
+
+    # Aggregated profile: mean of the neighbours' numeric features; categories
+    # are the requested ones when known, else the neighbours' most common
+    district_codes = index["district_codes"]
+    soil_codes = index["soil_codes"]
+    district_code = district_codes[district_rows[0]] if len(district_rows) else _most_common(district_codes[neighbour_rows])
+    soil_code = soil_code if soil_code is not None else _most_common(soil_codes[neighbour_rows])
+
+    profile = dict(zip(index["numeric_columns"], index["numeric"][neighbour_rows].mean(axis=0).tolist()))
+    profile["District"] = index["districts"][district_code]
+    profile["Soil_Type"] = index["soils"][soil_code]
+
+    return {
+        "profile": profile,
+        "neighbours": [
+            {
+                "district": index["districts"][district_codes[row]],
+                "soil_type": index["soils"][soil_codes[row]],
+                "distance": round(float(distance), 4),
+            }
+            for row, distance in zip(neighbour_rows, distances)
+        ],
+    }
+
+
+def _most_common(codes):
+    """
+    Most frequent of `codes` (ordered nearest first); a tie goes to the nearest,
+    as Counter.most_common does for the data store, so both backends agree.
+    """
+    counts = np.bincount(codes)
+    return codes[np.argmax(counts[codes] == counts.max())]
+
+
+def _query_profiles(index, soil_code, query, k):
+    """
+    k nearest rows to `query` among the rows of `soil_code` (None = all rows):
+    the KD-tree over the rows it was built from, plus a brute-force pass over
+    rows ingested since. Returns (distances, row positions), nearest first.
+    """
+    distances, rows = [], []
+    tree_entry = index["trees"].get(soil_code)
+    if tree_entry is not None:
+        tree, tree_rows = tree_entry
+        d, positions = tree.query(query, k=min(k, len(tree_rows)))
+        distances.append(np.atleast_1d(d))
+        rows.append(tree_rows[np.atleast_1d(positions)])
+    pending = index["pending"].get(soil_code)
+    if pending is not None and len(pending):
+        distances.append(np.linalg.norm(index["X"][pending] - query, axis=1))
+        rows.append(pending)
+    distances, rows = np.concatenate(distances), np.concatenate(rows)
+    order = np.argsort(distances, kind="stable")[:k]
+    return distances[order], rows[order]
+
+
+def _district_means(data_df):
+    """
+    Per-district row count and sums of the profile features, indexed by
+    District category code (cached per frame); sum / count is the mean.
+    """
+    entry = frame_index(data_df)
+    means = entry.get("district_means")
+    if means is None:
+        means = entry["district_means"] = _grouped_sums(data_df, "District", PROFILE_FEATURES)
+    return means
+
+
+def _grouped_sums(data_df, column, features):
+    """{"count": rows per code, "sum": [codes x features] sums} for a categorical column."""
+    codes = data_df[column].cat.codes.to_numpy()
+    valid = codes >= 0
+    codes = codes[valid]
+    size = len(data_df[column].cat.categories)
+    values = data_df[features].to_numpy(dtype=np.float64)[valid]
+    return _read_only_values({
+        "count": np.bincount(codes, minlength=size).astype(np.float64),
+        "sum": np.stack([np.bincount(codes, weights=values[:, i], minlength=size)
+                         for i in range(len(features))], axis=1),
+    })
+
+
+def _merge_sums(old, new):
+    """Adds two per-code aggregates of the same layout; the shorter one is zero-padded."""
+    merged = {}
+    for key, value in old.items():
+        other = new[key]
+        size = max(len(value), len(other))
+        pad = lambda a: np.pad(a, [(0, size - len(a))] + [(0, 0)] * (a.ndim - 1))
+        merged[key] = pad(value) + pad(other)
+    return _read_only_values(merged)
+
+
+def _column_max(data_df, column):
+    """Maximum of a numeric column (cached per frame)."""
+    if isinstance(data_df, MainDataStore):
+        return data_df.column_max(column)
+    entry = frame_index(data_df)
+    maxima = entry.get("column_max")
+    if maxima is None:
+        numeric = [c for c in data_df.columns if pd.api.types.is_numeric_dtype(data_df[c])]
+        maxima = entry["column_max"] = {c: data_df[c].max().item() for c in numeric}
+    return maxima[column]
+
+
+def _matched_profile(data_df, district, soil_type):
+    """
+    Feature row for a district/soil pair: the first exact match, or an
+    approximate profile aggregated from the nearest known ones.
+    Returns (row dict or None, approximation dict).
+    """
+    if isinstance(data_df, MainDataStore):
+        row = data_df.match(district, soil_type)
+        if row is not None:
+            return row, {}
+        nearest = data_df.nearest_profiles(district, soil_type)
+    else:
+        match = _match_district_soil(data_df, district, soil_type)
+        if not match.empty:
+            return _row_to_dict(match.iloc[0]), {}
+        nearest = _nearest_profiles(data_df, district, soil_type)
+    if nearest is None:
+        return None, {}
+    return nearest["profile"], {"approximate": True, "neighbours": nearest["neighbours"]}
+
 # --------------------
 # Data & Model Loading
 # --------------------
@@ -51,13 +504,32 @@ def load_data():
         # Load both dataframes
         df1 = pd.read_csv(file1_path)
         df2 = pd.read_csv(file2_path)
+        frames = [df1, df2]
+        
+        # Rows added through ingest_rows() since the CSVs were last rebuilt
+        ingested, ingest_offset = read_ingest_store()
+        if ingested is not None:
+            frames.append(ingested)
         
         # Concatenate them into a single dataframe
-        combined_df = pd.concat([df1, df2], ignore_index=True)
+        combined_df = pd.concat(frames, ignore_index=True)
         
         # Rename a column to match the expected format for your model
         combined_df = combined_df.rename(columns={'Major_Crops': 'crop'})
-        
+
+        # Compact dtypes and drop columns no analysis path reads
+        combined_df = compact_frame(combined_df, MAIN_DATA_COLUMNS, label="Main dataset")
+
+        # How much of the ingest store this frame holds, for sync_ingested()
+        frame_index(combined_df)["ingest"] = {"offset": ingest_offset,
+                                              "rows": 0 if ingested is None else len(ingested)}
+
+        # Build the derived indexes up front rather than on the first request
+        _profile_index(combined_df)
+        _crop_spread(combined_df)
+        _district_means(combined_df)
+        _column_max(combined_df, "Crop_Production_Rate_Yearly")
+
         return combined_df
     except FileNotFoundError as e:
         print(f"Error: Dataset file not found: {e}.")
@@ -82,6 +554,11 @@ def load_agri_ml_regional_data():
         
         # Combine both regional datasets
         combined_regional_df = pd.concat([df_punjab, df_tn], ignore_index=True)
+
+        # Compact dtypes and keep only the columns the agri_ml path reads
+        categorical_cols, numeric_cols = _regional_data_columns()
+        keep_columns = None if numeric_cols is None else categorical_cols + numeric_cols
+        combined_regional_df = compact_frame(combined_regional_df, keep_columns, label="Regional dataset")
         
         print(f"✓ Agri ML regional data loaded: {len(combined_regional_df)} rows (Punjab + TN)")
         return combined_regional_df
@@ -93,55 +570,1419 @@ def load_agri_ml_regional_data():
         return None
 
 
-def load_models():
-    """Loads all available pre-trained models from the local directory."""
-    models = {
-        "sklearn": {"preprocessor": None, "clf": None, "reg": None},
-        "agri_ml": None,
-        "keras_cnn": None
+# --------------------
+# Regional Data Shards
+# --------------------
+# One shard per state file (models/agri_ml_model/data/expanded_<state>_dataset.csv).
+# A streaming scan at startup reads only the columns needed for routing and for
+# the dataset-wide normalizers of the agri_ml scores; shard frames are loaded on
+# first use and evicted least-recently-used beyond REGIONAL_CACHE_MB.
+REGIONAL_DATA_DIR = os.path.join(MODELS_DIR, "agri_ml_model", "data")
+REGIONAL_CACHE_MB = float(os.environ.get("AGRONITY_REGIONAL_CACHE_MB", "32"))
+REGIONAL_SCAN_CHUNKSIZE = 50000
+
+# Columns behind the agri_ml feasibility and productivity scores
+AGRI_SOIL_COLUMNS = ["pH_Level", "Organic_Matter_Percentage", "Clay_Percentage"]
+AGRI_RAIN_COLUMN = "Avg_Rainfall_mm"
+AGRI_NUTRIENT_COLUMNS = ["Nitrogen_kg_per_ha", "Phosphorus_kg_per_ha", "Potassium_kg_per_ha", "Organic_Matter_Percentage"]
+
+
+def _regional_shard_files():
+    """{state: csv path} for every regional shard file, sorted by state."""
+    files = {}
+    if os.path.isdir(REGIONAL_DATA_DIR):
+        for name in sorted(os.listdir(REGIONAL_DATA_DIR)):
+            match = re.fullmatch(r"expanded_(.+)_dataset\.csv", name)
+            if match:
+                files[match.group(1)] = os.path.join(REGIONAL_DATA_DIR, name)
+    return files
+
+
+REGIONAL_SHARD_FILES = _regional_shard_files()
+
+
+def _regional_aggregates(df):
+    """
+    Dataset-wide normalizers of the agri_ml scores over `df` (raw or compact):
+    max row-mean of the soil columns, max rainfall, and the nutrient row-sum
+    total and row count (their ratio is the dataset average).
+    """
+    soil_cols = [c for c in AGRI_SOIL_COLUMNS if c in df.columns]
+    nutrient_cols = [c for c in AGRI_NUTRIENT_COLUMNS if c in df.columns]
+    return {
+        "soil_max": float(df[soil_cols].mean(axis=1).max()) if soil_cols else None,
+        "rain_max": float(df[AGRI_RAIN_COLUMN].max()) if AGRI_RAIN_COLUMN in df.columns else None,
+        "nutrient_total": float(df[nutrient_cols].sum(axis=1).sum()) if nutrient_cols else 0.0,
+        "rows": len(df),
+    }
+
+
+def _merge_regional_aggregates(a, b):
+    merged = {"nutrient_total": a["nutrient_total"] + b["nutrient_total"], "rows": a["rows"] + b["rows"]}
+    for key in ("soil_max", "rain_max"):
+        values = [v for v in (a[key], b[key]) if v is not None]
+        merged[key] = max(values) if values else None
+    return merged
+
+
+class RegionalShards:
+    """Per-state regional frames behind a district routing table, loaded lazily with LRU eviction."""
+
+    def __init__(self, files=None, cache_mb=REGIONAL_CACHE_MB):
+        import threading
+        from collections import OrderedDict
+        self.files = dict(REGIONAL_SHARD_FILES if files is None else files)
+        self.cache_bytes = cache_mb * 1024 * 1024
+        self.routes = {}                 # lowercase district -> [state]
+        self.names = {}                  # column -> set of lowercase names
+        self.columns = []
+        self.aggregates = None
+        self._frames = OrderedDict()     # state -> compact frame, least recently used first
+        self._sizes = {}
+        self._loading = {}               # state -> Event set when its load in progress ends
+        self._group_sums = {}            # state -> per-district sums (see _shard_group_sums), kept after eviction
+        self._lock = threading.Lock()
+        self.loads = self.hits = self.evictions = 0
+        self._scan()
+
+    def _scan(self):
+        """Routing table, names and global aggregates from a column-subset streaming read."""
+        categorical_cols, numeric_cols = _regional_data_columns()
+        aggregates = None
+        for state, path in self.files.items():
+            header = pd.read_csv(path, nrows=0).columns
+            if not self.columns:
+                keep = None if numeric_cols is None else set(categorical_cols + numeric_cols)
+                self.columns = [c for c in header if keep is None or c in keep]
+            wanted = set(categorical_cols + AGRI_SOIL_COLUMNS + AGRI_NUTRIENT_COLUMNS + [AGRI_RAIN_COLUMN])
+            usecols = [c for c in header if c in wanted]
+            for chunk in pd.read_csv(path, usecols=usecols, chunksize=REGIONAL_SCAN_CHUNKSIZE):
+                chunk_aggregates = _regional_aggregates(chunk)
+                aggregates = chunk_aggregates if aggregates is None else _merge_regional_aggregates(aggregates, chunk_aggregates)
+                for column in categorical_cols:
+                    if column not in chunk.columns:
+                        continue
+                    values = chunk[column].dropna().unique()
+                    _vocabulary_dtype(CATEGORY_VOCABULARY[column], values)  # resolver learns the names
+                    self.names.setdefault(column, set()).update(str(v).lower() for v in values)
+                    if column == "District":
+                        for value in values:
+                            states = self.routes.setdefault(str(value).lower(), [])
+                            if state not in states:
+                                states.append(state)
+        self.aggregates = aggregates
+        print(f"✓ Regional shards: {len(self.files)} states, {len(self.routes)} districts routed")
+
+    def __len__(self):
+        return self.aggregates["rows"] if self.aggregates else 0
+
+    def contains(self, column, value):
+        """True if `value` (case-insensitive) occurs in `column` of any shard."""
+        return str(value).lower() in self.names.get(column, ())
+
+    def states_for(self, district):
+        return self.routes.get(str(district).lower(), [])
+
+    def shard(self, state):
+        """
+        Compact frame of one state, loaded on first use. The file is read
+        outside the cache lock, so a cold load only blocks the threads that
+        need the same state; they wait for it instead of reading it again.
+        """
+        import threading
+        while True:
+            with self._lock:
+                frame = self._frames.get(state)
+                if frame is not None:
+                    self._frames.move_to_end(state)
+                    self.hits += 1
+                    return frame
+                loading = self._loading.get(state)
+                if loading is None:
+                    loading = self._loading[state] = threading.Event()
+                    break  # this thread loads it
+            loading.wait()
+
+        try:
+            categorical_cols, numeric_cols = _regional_data_columns()
+            keep_columns = None if numeric_cols is None else categorical_cols + numeric_cols
+            frame = compact_frame(pd.read_csv(self.files[state]), keep_columns, label=f"Regional shard {state}")
+            group_sums = self._group_sums.get(state) or _shard_group_sums(frame)
+            with self._lock:
+                self._frames[state] = frame
+                self._sizes[state] = int(frame.memory_usage(deep=True).sum())
+                self._group_sums[state] = group_sums
+                self.loads += 1
+                while len(self._frames) > 1 and sum(self._sizes[s] for s in self._frames) > self.cache_bytes:
+                    evicted, _ = self._frames.popitem(last=False)
+                    del self._sizes[evicted]
+                    self.evictions += 1
+                    print(f"✓ Evicted regional shard {evicted}")
+            return frame
+        finally:
+            with self._lock:
+                del self._loading[state]
+            loading.set()
+
+    def district_sums(self, columns, crop_type=None):
+        """
+        (sums, non-null counts, row counts) of `columns` per district over every
+        shard, like RegionalDataStore.district_sums. Built from the group sums
+        each shard computed when it was loaded, so evicted shards are not reloaded.
+        """
+        parts = []
+        for state in self.files:
+            if state not in self._group_sums:
+                self.shard(state)
+            by_district, by_crop = self._group_sums[state]
+            if crop_type is None:
+                sums, counts, rows = by_district
+            else:
+                sums, counts, rows = by_crop
+                match = sums.index.get_level_values(1).str.lower() == str(crop_type).lower()
+                sums, counts, rows = (part[match].groupby(level=0).sum() for part in (sums, counts, rows))
+            parts.append((sums[columns], counts[columns], rows))
+        return _combine_group_sums(parts)
+
+    def shard_for(self, district):
+        """Rows of the shard(s) owning `district`, or None if no shard knows it."""
+        states = self.states_for(district)
+        if not states:
+            return None
+        frames = [self.shard(state) for state in states]
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "states": list(self.files),
+                "resident": list(self._frames),
+                "resident_mb": round(sum(self._sizes.values()) / (1024 * 1024), 2),
+                "cache_mb": round(self.cache_bytes / (1024 * 1024), 2),
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+            }
+
+
+def load_regional_shards():
+    """Routing table and global aggregates for the regional data; shards load on demand."""
+    try:
+        if not REGIONAL_SHARD_FILES:
+            print(f"⚠ Agri ML regional datasets not found in {REGIONAL_DATA_DIR}")
+            return None
+        return RegionalShards()
+    except Exception as e:
+        print(f"⚠ Error scanning agri_ml regional data: {e}")
+        return None
+
+
+# --------------------
+# Embedded Data Store
+# --------------------
+# Optional backend (AGRONITY_DATA_BACKEND=sqlite) serving the analysis lookups
+# from one read-only SQLite file instead of in-memory frames, so the dataset
+# size no longer sets every worker's RAM. The file is rebuilt from the CSVs
+# whenever they change. District, Soil_Type and crop names are matched on
+# indexed lowercase "<column>_key" columns.
+DATA_BACKEND = os.environ.get("AGRONITY_DATA_BACKEND", "pandas")
+DATA_DB_FILE = os.environ.get("AGRONITY_DATA_DB", os.path.join(MODEL_DIR, "agronity_data.sqlite3"))
+DATA_DB_SCHEMA = 2  # bump when tables or meta change, so existing files are rebuilt
+MAIN_DATA_FILES = [os.path.join(MODEL_DIR, "sihdatasets.csv"), os.path.join(MODEL_DIR, "corrected_soil_dataset.csv")]
+MAIN_NUMERIC_COLUMNS = [c for c in MAIN_DATA_COLUMNS if c not in CATEGORY_VOCABULARY]
+MAIN_KEY_COLUMNS = ["District", "Soil_Type", "crop"]
+
+
+def _add_key_columns(frame, columns):
+    """Adds the lowercase "<column>_key" match columns to a CSV chunk."""
+    for column in columns:
+        frame[f"{column}_key"] = frame[column].map(lambda v: v.lower() if isinstance(v, str) else None)
+    return frame
+
+
+def _data_store_signature():
+    sources = MAIN_DATA_FILES + [INGEST_FILE] + list(REGIONAL_SHARD_FILES.values())
+    return _files_digest(sources, salt=f"schema:{DATA_DB_SCHEMA};")
+
+
+def build_data_store(path=DATA_DB_FILE, signature=None):
+    """
+    Builds the database from the CSVs in one chunked pass, collecting the
+    names and dataset-wide aggregates along the way.
+    """
+    names = {column: set() for column in MAIN_KEY_COLUMNS}
+    maxima = {}
+    profile_sum = np.zeros(len(PROFILE_FEATURES))
+    profile_sumsq = np.zeros(len(PROFILE_FEATURES))
+    spread = dict.fromkeys(["count", "price_sum", "price_sumsq", "yield_sum", "yield_sumsq"], 0.0)
+    rows = 0
+
+    with DatabaseBuilder(path) as db:
+        sources = list(MAIN_DATA_FILES)
+        if os.path.exists(INGEST_FILE) and os.path.getsize(INGEST_FILE) > 0:
+            sources.append(INGEST_FILE)
+        for source in sources:
+            for chunk in pd.read_csv(source, usecols=INGEST_COLUMNS, chunksize=REGIONAL_SCAN_CHUNKSIZE):
+                chunk = chunk.rename(columns={"Major_Crops": "crop"})[MAIN_DATA_COLUMNS]
+                for column in MAIN_KEY_COLUMNS:
+                    names[column].update(chunk[column].dropna().astype(str))
+                for column in MAIN_NUMERIC_COLUMNS:
+                    value = float(chunk[column].max())
+                    maxima[column] = max(maxima.get(column, value), value)
+                features = chunk[PROFILE_FEATURES].to_numpy(dtype=np.float64)
+                profile_sum += features.sum(axis=0)
+                profile_sumsq += (features * features).sum(axis=0)
+                for name, column in (("price", "Mandi_Price_Rupees_per_kg"), ("yield", "Crop_Production_Rate_Yearly")):
+                    values = chunk[column].to_numpy(dtype=np.float64)
+                    spread[name + "_sum"] += values.sum()
+                    spread[name + "_sumsq"] += (values * values).sum()
+                spread["count"] += len(chunk)
+                rows += len(chunk)
+                db.append("main", _add_key_columns(chunk, MAIN_KEY_COLUMNS),
+                          text_columns=MAIN_KEY_COLUMNS + [f"{c}_key" for c in MAIN_KEY_COLUMNS])
+
+        categorical_cols, numeric_cols = _regional_data_columns()
+        regional_names = {column: set() for column in categorical_cols}
+        regional_columns, aggregates, regional_rows = None, None, 0
+        routes = {}  # lowercase district -> [state]
+        for state, source in REGIONAL_SHARD_FILES.items():
+            header = pd.read_csv(source, nrows=0).columns
+            keep = None if numeric_cols is None else set(categorical_cols + numeric_cols)
+            columns = [c for c in header if keep is None or c in keep]
+            regional_columns = regional_columns or columns
+            for chunk in pd.read_csv(source, usecols=columns, chunksize=REGIONAL_SCAN_CHUNKSIZE):
+                chunk_aggregates = _regional_aggregates(chunk)
+                aggregates = chunk_aggregates if aggregates is None else _merge_regional_aggregates(aggregates, chunk_aggregates)
+                for column in categorical_cols:
+                    if column in chunk.columns:
+                        regional_names[column].update(chunk[column].dropna().astype(str))
+                for district in chunk["District"].dropna().astype(str).str.lower().unique():
+                    states = routes.setdefault(district, [])
+                    if state not in states:
+                        states.append(state)
+                chunk = _add_key_columns(chunk.reindex(columns=regional_columns), categorical_cols)
+                chunk["state"] = state
+                regional_rows += len(chunk)
+                db.append("regional", chunk,
+                          text_columns=categorical_cols + [f"{c}_key" for c in categorical_cols] + ["state"])
+
+        db.index("main", ["District_key", "Soil_Type_key"])
+        db.index("main", ["Soil_Type_key"])
+        db.index("main", ["crop_key"])
+        if regional_rows:
+            db.index("regional", ["District_key", "Major_Crops_key"])
+            db.index("regional", ["Soil_Type_key"])
+
+        mean = profile_sum / rows
+        scale = np.sqrt(np.maximum(profile_sumsq / rows - mean * mean, 0.0))
+        scale[scale == 0] = 1.0
+        db.set_meta("signature", signature or _data_store_signature())
+        db.set_meta("main_rows", rows)
+        db.set_meta("main_names", {column: sorted(values) for column, values in names.items()})
+        db.set_meta("main_max", maxima)
+        db.set_meta("main_profile", {"mean": mean.tolist(), "scale": scale.tolist()})
+        db.set_meta("main_spread", spread)
+        db.set_meta("regional_rows", regional_rows)
+        db.set_meta("regional_columns", regional_columns or [])
+        db.set_meta("regional_names", {column: sorted(values) for column, values in regional_names.items()})
+        db.set_meta("regional_aggregates", aggregates)
+        db.set_meta("regional_routes", routes)
+    print(f"✓ Data store built: {rows} main rows, {regional_rows} regional rows → {path}")
+
+
+class MainDataStore:
+    """The main dataset in the embedded database, standing in for data_df in the analysis paths."""
+
+    columns = MAIN_DATA_COLUMNS
+    _COLUMNS_SQL = ", ".join(f'"{c}"' for c in MAIN_DATA_COLUMNS)
+    _FIRST_SQL = f"SELECT {_COLUMNS_SQL} FROM main ORDER BY rowid LIMIT 1"
+    _MATCH_SQL = (f"SELECT {_COLUMNS_SQL} FROM main WHERE District_key = ? AND Soil_Type_key = ? "
+                  "ORDER BY rowid LIMIT 1")
+    _PROFILE_AVG = ", ".join(f'AVG("{c}")' for c in PROFILE_FEATURES)
+    _DISTRICT_PROFILE_SQL = f"SELECT MIN(District), COUNT(*), {_PROFILE_AVG} FROM main WHERE District_key = ?"
+    _SOIL_PROFILE_SQL = f"SELECT MIN(Soil_Type), COUNT(*), {_PROFILE_AVG} FROM main WHERE Soil_Type_key = ?"
+    _CROP_SPREAD_SQL = (
+        'SELECT COUNT(*) AS count, '
+        'SUM("Mandi_Price_Rupees_per_kg") AS price_sum, '
+        'SUM("Mandi_Price_Rupees_per_kg" * "Mandi_Price_Rupees_per_kg") AS price_sumsq, '
+        'SUM("Crop_Production_Rate_Yearly") AS yield_sum, '
+        'SUM("Crop_Production_Rate_Yearly" * "Crop_Production_Rate_Yearly") AS yield_sumsq '
+        'FROM main WHERE crop_key = ?'
+    )
+    _CROP_MEANS_SQL = ('SELECT COUNT(*) AS count, AVG("Crop_Production_Rate_Yearly") AS production, '
+                       'AVG("Mandi_Price_Rupees_per_kg") AS price FROM main WHERE crop_key = ?')
+
+    @classmethod
+    def _nearest_sql(cls, by_soil):
+        # Squared standardized distance: each feature contributes ((value - center) / scale)^2
+        terms = ", ".join(f'("{c}" - ?) * ? AS d{i}' for i, c in enumerate(PROFILE_FEATURES))
+        distance = " + ".join(f"d{i} * d{i}" for i in range(len(PROFILE_FEATURES)))
+        where = "WHERE Soil_Type_key = ?" if by_soil else ""
+        return (f"SELECT {cls._COLUMNS_SQL}, {distance} AS distance FROM "
+                f"(SELECT rowid, *, {terms} FROM main {where}) ORDER BY distance, rowid LIMIT ?")
+
+    def __init__(self, db):
+        self.db = db
+        main_names = db.meta("main_names")
+        for column, values in main_names.items():
+            _vocabulary_dtype(CATEGORY_VOCABULARY[column], pd.Series(values, dtype=object))  # resolver learns the names
+        self.names = {column: {v.lower() for v in values} for column, values in main_names.items()}
+        self.maxima = db.meta("main_max")
+        profile = db.meta("main_profile")
+        self.profile_mean = np.array(profile["mean"])
+        self.profile_scale = np.array(profile["scale"])
+        self._nearest_by_soil_sql = self._nearest_sql(True)
+        self._nearest_all_sql = self._nearest_sql(False)
+
+    def __len__(self):
+        return self.db.meta("main_rows", 0)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def contains(self, column, value):
+        """True if `value` (case-insensitive) occurs in `column`."""
+        return str(value).lower() in self.names.get(column, ())
+
+    def first_row(self):
+        row = self.db.row(self._FIRST_SQL)
+        return dict(row) if row is not None else None
+
+    def match(self, district, soil_type):
+        """First row for a district/soil pair, as a dict, or None."""
+        row = self.db.row(self._MATCH_SQL, (str(district).lower(), str(soil_type).lower()))
+        return dict(row) if row is not None else None
+
+    def nearest_profiles(self, district, soil_type, k=NEAREST_PROFILES):
+        """Same result as _nearest_profiles(), searched by an ordered query over the indexed soil rows."""
+        district_row = self.db.row(self._DISTRICT_PROFILE_SQL, (str(district).lower(),))
+        soil_row = self.db.row(self._SOIL_PROFILE_SQL, (str(soil_type).lower(),))
+        if not district_row[1] and not soil_row[1]:
+            return None
+
+        # The query point is the district's (else the soil's) mean profile
+        center = np.array(tuple(district_row if district_row[1] else soil_row)[2:], dtype=np.float64)
+        params = [x for pair in zip(center.tolist(), (1 / self.profile_scale).tolist()) for x in pair]
+        if soil_row[1]:
+            rows = self.db.rows(self._nearest_by_soil_sql, params + [str(soil_type).lower(), k])
+        else:
+            rows = self.db.rows(self._nearest_all_sql, params + [k])
+
+        from collections import Counter
+        profile = {c: float(np.mean([row[c] for row in rows])) for c in MAIN_NUMERIC_COLUMNS}
+        profile["District"] = district_row[0] if district_row[1] else Counter(r["District"] for r in rows).most_common(1)[0][0]
+        profile["Soil_Type"] = soil_row[0] if soil_row[1] else Counter(r["Soil_Type"] for r in rows).most_common(1)[0][0]
+        return {
+            "profile": profile,
+            "neighbours": [
+                {"district": row["District"], "soil_type": row["Soil_Type"],
+                 "distance": round(float(np.sqrt(row["distance"])), 4)}
+                for row in rows
+            ],
+        }
+
+    def column_max(self, column):
+        return self.maxima[column]
+
+    def crop_spread(self, crop_type):
+        """Count/sum/sum of squares of price and yield for a crop, or the whole dataset's below 2 rows."""
+        row = self.db.row(self._CROP_SPREAD_SQL, (str(crop_type).lower(),))
+        if row["count"] >= 2:
+            return dict(row)
+        return self.db.meta("main_spread")
+
+    def crop_means(self, crop_type):
+        """(rows, mean yearly production, mean mandi price) for a crop."""
+        row = self.db.row(self._CROP_MEANS_SQL, (str(crop_type).lower(),))
+        return row["count"], row["production"] or 0, row["price"] or 0
+
+
+class RegionalDataStore:
+    """The regional (agri_ml) data in the embedded database, standing in for the regional shards."""
+
+    def __init__(self, db):
+        self.db = db
+        self.columns = db.meta("regional_columns")
+        self.aggregates = db.meta("regional_aggregates")
+        self.routes = db.meta("regional_routes", {})
+        regional_names = db.meta("regional_names")
+        for column, values in regional_names.items():
+            _vocabulary_dtype(CATEGORY_VOCABULARY[column], pd.Series(values, dtype=object))
+        self.names = {column: {v.lower() for v in values} for column, values in regional_names.items()}
+
+    def __len__(self):
+        return self.db.meta("regional_rows", 0)
+
+    def contains(self, column, value):
+        return str(value).lower() in self.names.get(column, ())
+
+    def states_for(self, district):
+        return self.routes.get(str(district).lower(), [])
+
+    def district_sums(self, columns, crop_type=None):
+        """Per-district sums and non-null counts of `columns` (and row counts) in one GROUP BY."""
+        selects = ", ".join(f'TOTAL("{c}"), COUNT("{c}")' for c in columns)
+        where, params = ("WHERE Major_Crops_key = ?", (str(crop_type).lower(),)) if crop_type is not None else ("", ())
+        result = self.db.rows(f"SELECT MIN(District), COUNT(*), {selects} FROM regional {where} GROUP BY District_key",
+                              params)
+        names = [row[0] for row in result]
+        sums = pd.DataFrame([tuple(row)[2::2] for row in result], index=names, columns=columns, dtype=np.float64)
+        counts = pd.DataFrame([tuple(row)[3::2] for row in result], index=names, columns=columns, dtype=np.float64)
+        return sums, counts, pd.Series([row[1] for row in result], index=names, dtype=np.int64)
+
+    def district_means(self, district, crop_type, numeric_cols):
+        """
+        Mean of `numeric_cols` over the rows of a district and crop, or of the
+        whole district when the crop has none there. None if the district is unknown.
+        """
+        averages = ", ".join(f'AVG("{c}")' for c in numeric_cols)
+        district_key = str(district).lower()
+        row = self.db.row(f"SELECT COUNT(*), {averages} FROM regional WHERE District_key = ? AND Major_Crops_key = ?",
+                          (district_key, str(crop_type).lower()))
+        if not row[0]:
+            row = self.db.row(f"SELECT COUNT(*), {averages} FROM regional WHERE District_key = ?", (district_key,))
+        if not row[0]:
+            return None
+        return pd.Series(tuple(row)[1:], index=numeric_cols, dtype=np.float64)
+
+    def stats(self):
+        return {"backend": "sqlite", "path": self.db.path, "rows": len(self),
+                "file_mb": round(self.db.size_bytes() / (1024 * 1024), 2)}
+
+
+def load_data_store(path=DATA_DB_FILE):
+    """
+    (main store, regional store or None) over the database file, rebuilt
+    first if it is missing or older than its sources. None on failure.
+    """
+    import sqlite3
+    try:
+        signature = _data_store_signature()
+        try:
+            db = ReadOnlyDatabase(path) if os.path.exists(path) else None
+        except sqlite3.DatabaseError:
+            db = None
+        if db is None or db.meta("signature") != signature:
+            build_data_store(path, signature)
+            db = ReadOnlyDatabase(path)
+        main = MainDataStore(db)
+        regional = RegionalDataStore(db) if db.meta("regional_rows") else None
+        print(f"✓ Data store opened read-only: {len(main)} main rows, "
+              f"{len(regional) if regional else 0} regional rows ({db.size_bytes() / 1e6:.1f} MB)")
+        return main, regional
+    except Exception as e:
+        print(f"⚠ Error loading the data store: {e}")
+        return None
+
+
+# Memory priority and declared budget (MB) per loaded component. Components at
+# REQUIRED_PRIORITY always load; the rest are skipped when the process budget
+# (AGRONITY_MEMORY_BUDGET_MB) cannot hold them next to higher-priority ones.
+MEMORY_COMPONENTS = {
+    "sklearn": {"priority": 100, "budget_mb": 120},  # includes the sklearn/scipy imports
+    "data_df": {"priority": 100, "budget_mb": 25},
+    "tensorflow": {"priority": 60, "budget_mb": None},
+    "keras_cnn": {"priority": 50, "budget_mb": 150},
+    "agri_ml_data_df": {"priority": 30, "budget_mb": REGIONAL_CACHE_MB + 8},  # shard cache + routing scan
+    "agri_ml": {"priority": 20, "budget_mb": 600},
+}
+
+
+def load_models(ledger=None, keras=True):
+    """
+    Loads all available pre-trained models from the local directory.
+    `ledger` (a MemoryLedger) measures each model and may skip optional ones.
+    With keras=False the Keras entries stay None (see load_keras_models).
+    """
+    ledger = ledger if ledger is not None else MemoryLedger(MEMORY_COMPONENTS)
+    models = {
+        "sklearn": {"preprocessor": None, "clf": None, "reg": None},
+        "agri_ml": None,
+        "keras_cnn": None,
+        "keras_infer": None,
+        "image_cache": None,
+        "image_breaker": None,
+        "explainers": {}  # explanation state for these models (see _explainer_state)
+    }
+    
+    # Load existing joblib models (sklearn)
+    ledger.admit("sklearn")
+    try:
+        models["sklearn"]["preprocessor"] = joblib.load(os.path.join(MODEL_DIR, "preprocessor.joblib"))
+        models["sklearn"]["clf"] = joblib.load(os.path.join(MODEL_DIR, "feasibility_clf.joblib"))
+        models["sklearn"]["reg"] = joblib.load(os.path.join(MODEL_DIR, "yield_reg.joblib"))
+        print("✓ Sklearn models loaded successfully")
+    except FileNotFoundError:
+        print("⚠ Sklearn model files not found")
+    except Exception as e:
+        print(f"⚠ Error loading sklearn models: {e}")
+    ledger.record("sklearn", models["sklearn"] if models["sklearn"]["clf"] is not None else None)
+    
+    # ---- DISABLE AGRI MODEL ON RENDER ----
+    print("⚠ agri_model disabled on Render to prevent backend crash")
+    models["agri_ml"] = None
+    ledger.skip("agri_ml", "disabled on Render to prevent backend crash")
+    
+    # Load Keras CNN model for image classification (unless a forking server defers it to its workers)
+    if keras:
+        load_keras_models(models, ledger)
+    
+    return models
+
+
+def import_frameworks(ledger=None):
+    """
+    Imports Keras and TensorFlow once and records what the import cost in
+    `ledger`. Returns True if both are available.
+    """
+    global keras, tf, KERAS_AVAILABLE, TF_AVAILABLE, FRAMEWORK_IMPORT_BYTES
+    if not (KERAS_AVAILABLE and TF_AVAILABLE):
+        return False
+    with _FRAMEWORK_LOCK:
+        if keras is None or tf is None:
+            if ledger is not None and not ledger.admit("tensorflow"):
+                return False
+            before = rss_bytes()
+            try:
+                import keras
+                import tensorflow as tf
+            except ImportError as e:
+                print(f"⚠ Could not import TensorFlow/Keras: {e}")
+                KERAS_AVAILABLE = TF_AVAILABLE = False
+                return False
+            FRAMEWORK_IMPORT_BYTES = rss_bytes() - before
+    if ledger is not None:
+        ledger.record("tensorflow", tf, rss_delta=FRAMEWORK_IMPORT_BYTES, size=FRAMEWORK_IMPORT_BYTES)
+    return True
+
+
+def load_keras_models(models, ledger=None):
+    """
+    Loads the Keras CNN, its compiled inference function, diagnosis cache and
+    circuit breaker into `models`. Separate from load_models because TensorFlow's
+    runtime does not survive a fork: a preforking server loads this per worker.
+    """
+    ledger = ledger if ledger is not None else MemoryLedger(MEMORY_COMPONENTS)
+    if not import_frameworks(ledger):
+        installed = KERAS_AVAILABLE and TF_AVAILABLE
+        ledger.skip("keras_cnn", "TensorFlow/Keras not installed" if not installed else "TensorFlow was not loaded")
+        return models
+    if ledger.admit("keras_cnn"):
+        try:
+            keras_path = os.path.join(MODELS_DIR, "modelskeras_model")
+            model_file = os.path.join(keras_path, "model.weights.h5")
+            config_file = os.path.join(keras_path, "config.json")
+            
+            if os.path.exists(config_file) and os.path.exists(model_file):
+                configure_tf_threads()
+                
+                # Load model architecture from config
+                with open(config_file, 'r') as f:
+                    import json
+                    config = json.load(f)
+                
+                keras_model = keras.Sequential.from_config(config['config'])
+                keras_model.load_weights(model_file)
+                models["keras_cnn"] = keras_model
+                # Compiled, warmed-up inference function used instead of predict()
+                models["keras_infer"] = CompiledCNN(keras_model)
+                # Diagnoses are only valid for this model, so the cache lives and dies with it
+                models["image_cache"] = PerceptualCache()
+                # Stops calling the model while it keeps failing (see analyze_image)
+                models["image_breaker"] = CircuitBreaker()
+                print("✓ Keras CNN model loaded successfully")
+        except Exception as e:
+            print(f"⚠ Error loading keras model: {e}")
+        ledger.record("keras_cnn", models["keras_cnn"])
+    return models
+
+# --------------------
+# Compiled CNN Inference
+# --------------------
+# keras' predict() builds a data pipeline and step function on every call,
+# which dominates the cost of scoring one photo. CompiledCNN traces the model
+# once into a tf.function with a fixed float32 [N, H, W, 3] signature.
+CNN_XLA = os.environ.get("AGRONITY_TF_XLA", "0") == "1"
+CNN_WARMUP_BATCH_SIZES = (1, 32)  # with XLA, batches are padded up to one of these
+
+
+def _tf_thread_counts():
+    """(intra_op, inter_op) threads: the CPUs shared by the worker processes."""
+    intra = int(os.environ.get("AGRONITY_TF_INTRA_OP_THREADS", "0"))
+    inter = int(os.environ.get("AGRONITY_TF_INTER_OP_THREADS", "0"))
+    if intra <= 0:
+        workers = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+        intra = max(1, (os.cpu_count() or 1) // workers)
+    return intra, inter if inter > 0 else 1
+
+
+def configure_tf_threads():
+    """Sizes TensorFlow's thread pools to this worker (only possible before TF first runs)."""
+    intra, inter = _tf_thread_counts()
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+    except RuntimeError:
+        # Already initialized (e.g. on a hot reload); the first setting stays
+        return
+    print(f"✓ TensorFlow threads: intra_op={intra}, inter_op={inter}")
+
+
+def configure_native_threads():
+    """Limits the BLAS/OpenMP pools used by numpy and sklearn to this worker's share of the CPUs."""
+    if not THREADPOOLCTL_AVAILABLE:
+        return
+    intra, _ = _tf_thread_counts()
+    threadpool_limits(limits=intra)
+
+
+class CompiledCNN:
+    """Graph-compiled inference wrapper around a Keras model, warmed up at load."""
+
+    def __init__(self, keras_model, jit_compile=CNN_XLA, warmup_batch_sizes=CNN_WARMUP_BATCH_SIZES):
+        self.jit_compile = jit_compile
+        self.batch_sizes = tuple(sorted(warmup_batch_sizes))
+        self._fn = tf.function(
+            lambda images: keras_model(images, training=False),
+            input_signature=[tf.TensorSpec([None, *IMAGE_SIZE, 3], tf.float32)],
+            jit_compile=jit_compile,
+        )
+        for n in self.batch_sizes:
+            self._fn(tf.zeros((n, *IMAGE_SIZE, 3), tf.float32))
+
+    def __call__(self, batch):
+        """Scores a float [N, H, W, 3] batch; returns an [N, outputs] numpy array."""
+        batch = np.asarray(batch, dtype=np.float32)
+        n = len(batch)
+        if not self.jit_compile:
+            return self._fn(batch).numpy()
+        # XLA compiles per input shape, so pad to a warmed-up size instead of compiling a new one
+        outputs = []
+        largest = self.batch_sizes[-1]
+        for start in range(0, n, largest):
+            chunk = batch[start:start + largest]
+            size = next(b for b in self.batch_sizes if b >= len(chunk))
+            if size > len(chunk):
+                chunk = np.concatenate([chunk, np.zeros((size - len(chunk), *chunk.shape[1:]), np.float32)])
+            outputs.append(self._fn(chunk).numpy()[:min(largest, n - start)])
+        return np.concatenate(outputs)
+
+
+def cnn_predict(models, batch):
+    """CNN scores for a float [N, H, W, 3] batch, through the compiled path when loaded."""
+    if models.get("keras_infer") is not None:
+        return models["keras_infer"](batch)
+    return models["keras_cnn"].predict(batch, verbose=0)
+
+# --------------------
+# Dataset Ingest
+# --------------------
+# New survey rows are validated, appended to an append-only CSV (read back by
+# load_data) and merged into a new copy of the in-memory frame. Aggregates and
+# indexes derived from the old frame are carried over and updated with the new
+# rows only; nothing is re-parsed or rebuilt from scratch. Column and index
+# arrays live in append buffers with spare capacity, so a batch costs time in
+# proportion to its own rows. Each frame records how far into the CSV it
+# reaches, so processes sharing the file (gunicorn workers) pick up rows
+# ingested elsewhere with sync_ingested().
+INGEST_FILE = os.environ.get("AGRONITY_INGEST_FILE", os.path.join(MODEL_DIR, "ingested_rows.csv"))
+INGEST_MAX_ROWS = 5000
+INGEST_MAX_ERRORS = 50
+# Allowed ranges for numeric columns; any other numeric column must be >= 0
+INGEST_RANGES = {"pH_Level": (0, 14), "Avg_Temperature_C": (-50, 60)}
+# Rows searched brute force next to the KD-trees before they are rebuilt. The
+# feature standardization is kept until then too, so neighbour distances can
+# differ from a fresh load's in the last digits.
+PROFILE_PENDING_MAX = 1000
+PROFILE_PENDING_FRACTION = 0.1
+# A full append buffer is reallocated this many times larger
+BUFFER_GROWTH = 2.0
+
+# Column names as they appear in the source CSVs (crop is "Major_Crops" there)
+INGEST_COLUMNS = ["Major_Crops" if c == "crop" else c for c in MAIN_DATA_COLUMNS]
+_INGEST_CATEGORICAL = ["District", "Soil_Type", "Major_Crops"]
+
+
+def validate_ingest_rows(rows, max_rows=INGEST_MAX_ROWS):
+    """
+    Checks new dataset rows (list of dicts or a DataFrame) against the main
+    dataset schema. Returns (frame in source-CSV column layout, errors).
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    if "crop" in df.columns and "Major_Crops" not in df.columns:
+        df = df.rename(columns={"crop": "Major_Crops"})
+
+    missing = [c for c in INGEST_COLUMNS if c not in df.columns]
+    if missing:
+        return None, [{"error": f"missing columns: {', '.join(missing)}"}]
+    if df.empty:
+        return None, [{"error": "no rows"}]
+    if max_rows is not None and len(df) > max_rows:
+        return None, [{"error": f"at most {max_rows} rows per ingest ({len(df)} given)"}]
+
+    errors = []
+    frame = {}
+    for column in INGEST_COLUMNS:
+        series = df[column].reset_index(drop=True)
+        if column in _INGEST_CATEGORICAL:
+            values = series.astype("string").str.strip()
+            bad = values.isna() | (values == "")
+            message = "must be a non-empty name"
+        else:
+            values = pd.to_numeric(series, errors="coerce").astype(np.float64)
+            low, high = INGEST_RANGES.get(column, (0, np.inf))
+            bad = ~np.isfinite(values) | (values < low) | (values > high)
+            message = f"must be a number in [{low}, {high}]"
+        for row in np.flatnonzero(bad.to_numpy())[:INGEST_MAX_ERRORS - len(errors)]:
+            errors.append({"row": int(row), "column": column, "value": str(series.iloc[row]), "error": message})
+        if column in _INGEST_CATEGORICAL:
+            values = values.astype(object)
+        elif not bad.any() and np.all(np.mod(values, 1) == 0):
+            values = values.astype(np.int64)  # stored as 34592, not 34592.0, so reloads keep int columns
+        frame[column] = values
+    if errors:
+        return None, errors
+    return pd.DataFrame(frame), []
+
+
+@contextmanager
+def _store_lock(store_path, shared=False):
+    """Holds the ingest store's lock file: exclusively to append, shared to read."""
+    with open(f"{store_path}.lock", "a") as lock:
+        if FCNTL_AVAILABLE:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _append_to_store(frame, store_path):
+    """Appends validated rows to the append-only CSV, durably and in one write. Returns (start, end) offsets."""
+    with _store_lock(store_path):
+        start = os.path.getsize(store_path) if os.path.exists(store_path) else 0
+        data = frame.to_csv(header=start == 0, index=False, lineterminator="\n").encode("utf-8")
+        with open(store_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    return start, start + len(data)
+
+
+def read_ingest_store(store_path=None, offset=0):
+    """
+    Rows appended to the ingest store after byte `offset`. Returns (frame in
+    source-CSV column layout or None, offset just past the last row read).
+    """
+    store_path = store_path or INGEST_FILE
+    if not os.path.exists(store_path) or os.path.getsize(store_path) <= offset:
+        return None, offset
+    with _store_lock(store_path, shared=True):
+        with open(store_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return None, offset
+    if offset == 0:
+        frame = pd.read_csv(io.BytesIO(data[:end]))  # starts with the header
+    else:
+        frame = pd.read_csv(io.BytesIO(data[:end]), header=None, names=INGEST_COLUMNS)
+    return (frame if len(frame) else None), offset + end
+
+
+def _ingest_dtype(current, values):
+    """dtype for a numeric column after `values` are appended (widened only if needed)."""
+    if pd.api.types.is_integer_dtype(current) and np.all(np.mod(values, 1) == 0):
+        bound = int(np.abs(values).max())
+        return np.promote_types(current, np.min_scalar_type(-bound))
+    return np.promote_types(current, np.float64)
+
+
+class _AppendBuffer:
+    """
+    Array with spare capacity behind the columns of successive frames, each
+    viewing a prefix of it. Appending to the longest prefix fills the spare
+    rows in place; the rows are copied into a new buffer (BUFFER_GROWTH times
+    the size) only when it is full, the dtype widens, or the append starts
+    from a shorter prefix. Rows inside a prefix are never written.
+    """
+
+    def __init__(self, values, capacity=0, dtype=None):
+        values = np.asarray(values)
+        self.data = np.empty((max(capacity, len(values)),) + values.shape[1:], dtype=dtype or values.dtype)
+        self.data[:len(values)] = values
+        self.size = len(values)
+        self._lock = threading.Lock()
+
+    def holds(self, view):
+        """True if `view` is a prefix of this buffer."""
+        return (len(view) <= self.size and view.dtype == self.data.dtype
+                and view.__array_interface__["data"][0] == self.data.__array_interface__["data"][0])
+
+    def append(self, view, values, dtype):
+        """(buffer, array): `view` (a prefix of this buffer) followed by `values`, and the buffer holding it."""
+        size, end = len(view), len(view) + len(values)
+        with self._lock:
+            if size == self.size and end <= len(self.data) and dtype == self.data.dtype:
+                self.data[size:end] = values
+                self.size = end
+                return self, self.data[:end]
+        buffer = _AppendBuffer(view, capacity=int(end * BUFFER_GROWTH), dtype=dtype)
+        return buffer.append(buffer.data[:size], values, dtype)
+
+
+def _appended(buffers, key, view, values, dtype=None):
+    """`view` followed by `values`, through the append buffer `buffers[key]` (replaced there when it moves)."""
+    values = np.asarray(values)
+    dtype = np.dtype(dtype) if dtype is not None else np.promote_types(view.dtype, values.dtype)
+    buffer = buffers.get(key)
+    if buffer is None or not buffer.holds(view):
+        buffer = _AppendBuffer(view, capacity=int((len(view) + len(values)) * BUFFER_GROWTH), dtype=dtype)
+        view = buffer.data[:len(view)]
+    buffers[key], result = buffer.append(view, values, dtype)
+    return result
+
+
+def _append_rows(data_df, frame):
+    """New frame: `data_df` followed by the validated rows, in the same compact layout."""
+    frame = frame.rename(columns={"Major_Crops": "crop"})
+    buffers = dict(frame_index(data_df).get("column_buffers", {}))
+    columns = {}
+    for column in data_df.columns:
+        old, values = data_df[column], frame[column]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            # Vocabularies are append-only, so existing codes stay valid under the grown dtype
+            dtype = _vocabulary_dtype(CATEGORY_VOCABULARY[column], values)
+            codes = pd.Categorical(values, dtype=dtype).codes
+            codes = _appended(buffers, column, old.array.codes, codes)
+            columns[column] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+        else:
+            values = values.to_numpy(dtype=np.float64)
+            dtype = _ingest_dtype(old.dtype, values)
+            columns[column] = _appended(buffers, column, old.to_numpy(), values.astype(dtype), dtype)
+    new_df = pd.DataFrame(columns, copy=False)  # views of the buffers, not copies
+    frame_index(new_df)["column_buffers"] = buffers
+    return new_df
+
+
+def _extend_profile_index(index, new_df, start):
+    """Profile index for `new_df` from the index of its first `start` rows, or None to rebuild."""
+    added = new_df.iloc[start:]
+    X_added = (added[PROFILE_FEATURES].to_numpy(dtype=np.float64) - index["mean"]) / index["scale"]
+    new_rows = np.arange(start, len(new_df))
+    soil_added = added["Soil_Type"].cat.codes.to_numpy()
+    buffers = dict(index.get("buffers", {}))
+
+    pending = dict(index["pending"])
+    pending[None] = _appended(buffers, ("pending", None), pending.get(None, new_rows[:0]), new_rows)
+    for code in np.unique(soil_added[soil_added >= 0]):
+        code = int(code)
+        pending[code] = _appended(buffers, ("pending", code), pending.get(code, new_rows[:0]),
+                                  new_rows[soil_added == code])
+    if len(pending[None]) > max(PROFILE_PENDING_MAX, PROFILE_PENDING_FRACTION * start):
+        return None
+
+    numeric_added = added[index["numeric_columns"]].to_numpy(dtype=np.float64)
+    _read_only_values(pending)
+    return _read_only_values({
+        **index,
+        "X": _appended(buffers, "X", index["X"], X_added),
+        "pending": pending,
+        "numeric": _appended(buffers, "numeric", index["numeric"], numeric_added),
+        "district_codes": _appended(buffers, "district_codes", index["district_codes"],
+                                    added["District"].cat.codes.to_numpy()),
+        "soil_codes": _appended(buffers, "soil_codes", index["soil_codes"], soil_added),
+        "districts": np.asarray(new_df["District"].cat.categories, dtype=object),
+        "soils": np.asarray(new_df["Soil_Type"].cat.categories, dtype=object),
+        "buffers": buffers,  # append buffers behind the arrays above
+    })
+
+
+def _carry_frame_index(old_df, new_df):
+    """Derives the cached structures of `new_df` (= old_df + appended rows) incrementally."""
+    old = _FRAME_INDEXES.get(id(old_df), {})
+    entry = frame_index(new_df)
+    start = len(old_df)
+    added = new_df.iloc[start:]
+
+    if "crop_spread" in old:
+        entry["crop_spread"] = _merge_sums(old["crop_spread"], _compute_crop_spread(added))
+    if "district_means" in old:
+        entry["district_means"] = _merge_sums(old["district_means"],
+                                              _grouped_sums(added, "District", PROFILE_FEATURES))
+    if "column_max" in old:
+        entry["column_max"] = {c: max(v, added[c].max().item()) for c, v in old["column_max"].items()}
+    if "profiles" in old:
+        profiles = _extend_profile_index(old["profiles"], new_df, start)
+        if profiles is None:
+            _profile_index(new_df)  # too many rows outside the trees: rebuild them now
+        else:
+            entry["profiles"] = profiles
+
+
+def ingest_state(data_df):
+    """{"offset", "rows"}: how far into the ingest store `data_df` reaches, and how many rows it took from it."""
+    return frame_index(data_df).get("ingest", {"offset": 0, "rows": 0})
+
+
+def ingest_pending(data_df, store_path=None):
+    """True if the ingest store has rows `data_df` does not hold yet (one stat call)."""
+    if data_df is None or isinstance(data_df, MainDataStore):
+        return False
+    try:
+        return os.path.getsize(store_path or INGEST_FILE) > ingest_state(data_df)["offset"]
+    except OSError:
+        return False
+
+
+def sync_ingested(data_df, store_path=None):
+    """
+    `data_df` followed by the rows appended to the ingest store since it was
+    built, by this process or another one, or None if there are none.
+    """
+    state = ingest_state(data_df)
+    rows, offset = read_ingest_store(store_path, state["offset"])
+    if rows is None:
+        return None
+    frame, errors = validate_ingest_rows(rows, max_rows=None)
+    if errors:
+        raise ValueError(f"invalid rows in the ingest store after byte {state['offset']}: {errors[0]}")
+    return _extend_frame(data_df, frame, offset)
+
+
+def _extend_frame(data_df, frame, offset):
+    """`data_df` followed by validated store rows that end at byte `offset` of the store."""
+    new_df = _append_rows(data_df, frame)
+    _carry_frame_index(data_df, new_df)
+    frame_index(new_df)["ingest"] = {"offset": offset, "rows": ingest_state(data_df)["rows"] + len(frame)}
+    return new_df
+
+
+def ingest_rows(data_df, rows, store_path=None):
+    """
+    Validates `rows`, appends them to the ingest store and returns
+    (new data_df or None, summary). The new frame also holds rows other
+    processes ingested since `data_df` was built, in store order. `data_df`
+    itself is not modified, so requests still holding it are unaffected.
+    """
+    if isinstance(data_df, MainDataStore):
+        return None, {"accepted": 0, "errors": [{"error": "the sqlite data backend is read-only; "
+                                                          f"append rows to {INGEST_FILE} and reload instead"}]}
+    frame, errors = validate_ingest_rows(rows)
+    if errors:
+        return None, {"accepted": 0, "errors": errors}
+
+    start, end = _append_to_store(frame, store_path or INGEST_FILE)
+    if start == ingest_state(data_df)["offset"]:
+        new_df = _extend_frame(data_df, frame, end)  # no rows from other processes in between
+    else:
+        new_df = sync_ingested(data_df, store_path)
+    return new_df, {"accepted": len(frame), "rows": len(new_df), "errors": []}
+
+# --------------------
+# Runtime Snapshots
+# --------------------
+# Every file whose change should trigger a reload of the serving snapshot.
+ARTIFACT_FILES = [
+    os.path.join(MODEL_DIR, "preprocessor.joblib"),
+    os.path.join(MODEL_DIR, "feasibility_clf.joblib"),
+    os.path.join(MODEL_DIR, "yield_reg.joblib"),
+    os.path.join(MODELS_DIR, "modelskeras_model", "config.json"),
+    os.path.join(MODELS_DIR, "modelskeras_model", "model.weights.h5"),
+    os.path.join(MODEL_DIR, "sihdatasets.csv"),
+    os.path.join(MODEL_DIR, "corrected_soil_dataset.csv"),
+    *REGIONAL_SHARD_FILES.values(),
+]
+
+
+def _files_digest(paths, salt=""):
+    """SHA-1 hex digest of the size and mtime of every file in `paths`."""
+    import hashlib
+    digest = hashlib.sha1(salt.encode())
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        except OSError:
+            digest.update(f"{path}:missing;".encode())
+    return digest.hexdigest()
+
+
+def artifact_version():
+    """Short identifier derived from the size and mtime of every artifact file."""
+    return _files_digest(ARTIFACT_FILES)[:12]
+
+
+def load_runtime(defer_keras=False):
+    """
+    Loads models and datasets into a single snapshot dict.
+
+    The snapshot is never mutated after it is built; a reload builds a new one
+    and the server swaps its reference, so requests holding the old snapshot
+    finish on the old version. With defer_keras the Keras CNN is left for
+    attach_keras, which a preforking server calls in each worker.
+    """
+    version = artifact_version()  # taken first, so edits made during the load trigger another reload
+    ledger = MemoryLedger.from_env(MEMORY_COMPONENTS)
+    models = load_models(ledger, keras=not defer_keras)
+    if defer_keras:
+        # The modules are imported here, so the forked workers share them; the CNN is loaded per worker
+        import_frameworks(ledger)
+        ledger.skip("keras_cnn", "deferred to the worker processes")
+    if DATA_BACKEND == "sqlite":
+        data_df, agri_ml_data_df = ledger.load("data_df", load_data_store) or (None, None)
+        ledger.skip("agri_ml_data_df", "served from the data store")
+    else:
+        data_df = ledger.load("data_df", load_data)
+        agri_ml_data_df = ledger.load("agri_ml_data_df", load_regional_shards)
+    return {
+        "version": version,
+        "loaded_at": time.time(),
+        "models": models,
+        "data_df": data_df,
+        "agri_ml_data_df": agri_ml_data_df,
+        # Rows of the ingest store held by data_df: the same in every process serving the store
+        "data_revision": ingest_state(data_df)["rows"] if data_df is not None else 0,
+        "memory": ledger.report(),
+    }
+
+
+def attach_keras(runtime):
+    """New snapshot with the Keras CNN loaded in this process (the rest is shared with `runtime`)."""
+    ledger = MemoryLedger.from_env(MEMORY_COMPONENTS)
+    models = load_keras_models(dict(runtime["models"]), ledger)
+    memory = runtime["memory"]
+    memory = {**memory, "components": {**memory["components"], **ledger.report()["components"]}}
+    return {**runtime, "models": models, "memory": memory}
+
+
+def validate_runtime(runtime, current=None):
+    """
+    Smoke-tests a freshly loaded snapshot before it is swapped in.
+    Returns a list of problems (empty if the snapshot is usable). Components
+    available in `current` must still be available and working in `runtime`.
+    """
+    problems = []
+    models = runtime["models"]
+    data_df = runtime["data_df"]
+    current_models = current["models"] if current else None
+
+    if data_df is None or data_df.empty:
+        return ["main dataset failed to load"]
+    if current is not None and current["agri_ml_data_df"] is not None and runtime["agri_ml_data_df"] is None:
+        problems.append("regional dataset failed to load")
+
+    sklearn_loaded = all(v is not None for v in models["sklearn"].values())
+    if sklearn_loaded:
+        sample = data_df.first_row() if isinstance(data_df, MainDataStore) else data_df.iloc[0]
+        try:
+            result = analyze_feasibility(models, data_df, str(sample["crop"]), str(sample["District"]),
+                                         1, str(sample["Soil_Type"]), use_model="sklearn")
+            if "error" in result:
+                problems.append(f"sklearn smoke prediction failed: {result['error']}")
+        except Exception as e:
+            problems.append(f"sklearn smoke prediction raised: {e}")
+    elif current_models is not None and all(v is not None for v in current_models["sklearn"].values()):
+        problems.append("sklearn models failed to load")
+
+    if models["keras_cnn"] is not None:
+        try:
+            prediction = cnn_predict(models, np.zeros((1, *IMAGE_SIZE, 3), dtype=np.float32))
+            if not np.all(np.isfinite(prediction)):
+                problems.append("keras smoke prediction returned non-finite values")
+        except Exception as e:
+            problems.append(f"keras smoke prediction raised: {e}")
+    elif current_models is not None and current_models["keras_cnn"] is not None:
+        problems.append("keras CNN failed to load")
+
+    return problems
+
+# --------------------
+# Profit Model
+# --------------------
+# Adjustment factors applied to the model's yield prediction
+MARKETING_LOSSES_FACTOR = 0.90     # ~10% reduction due to transport, commission, wastage
+YIELD_REALIZATION_FACTOR = 0.80    # ~20% reduction due to field losses, pests, etc.
+DEFAULT_COST_PER_HA = 30000        # average cost of cultivation per hectare in INR
+ANNUAL_REVENUE_GROWTH = 1.05       # assumed 5% annual growth for revenue projections
+ACRES_TO_HA = 0.4047
+
+
+def estimate_profit(expected_yield_tpha, price_per_kg, area_ha, cost_per_ha=DEFAULT_COST_PER_HA,
+                    marketing_factor=MARKETING_LOSSES_FACTOR, realization_factor=YIELD_REALIZATION_FACTOR):
+    """
+    Revenue and profit for a predicted yield. Works element-wise on numpy
+    arrays as well as on scalars.
+    """
+    # Price per ton after accounting for marketing losses
+    price_per_ton = price_per_kg * 10 * marketing_factor
+
+    # Effective yield (tons/ha) after accounting for field realities
+    effective_yield_tpha = expected_yield_tpha * realization_factor
+
+    # Total revenue = effective yield × price × area
+    total_revenue = effective_yield_tpha * price_per_ton * area_ha
+    total_cost = cost_per_ha * area_ha
+
+    return {
+        "total_revenue": total_revenue,
+        "total_cost": total_cost,
+        "profit": total_revenue - total_cost,
+        "revenue_1yr": total_revenue * ANNUAL_REVENUE_GROWTH,
+        "revenue_2yr": total_revenue * ANNUAL_REVENUE_GROWTH ** 2,
+    }
+
+
+# Risk mode: scenario sampling around the deterministic estimate.
+# Mandi price and yield spreads come from the dataset (per crop); the
+# marketing loss and cultivation cost spreads are assumptions.
+RISK_SIMULATIONS = 5000
+MARKETING_LOSSES_RANGE = (0.85, 0.95)   # triangular around MARKETING_LOSSES_FACTOR
+COST_PER_HA_CV = 0.15                   # coefficient of variation of cultivation cost
+RISK_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _crop_spread(data_df):
+    """
+    Per-crop count/sum/sum of squares of mandi price and yearly production,
+    indexed by crop category code (cached per frame).
+    """
+    entry = frame_index(data_df)
+    spread = entry.get("crop_spread")
+    if spread is None:
+        spread = entry["crop_spread"] = _compute_crop_spread(data_df)
+    return spread
+
+
+def _compute_crop_spread(data_df):
+    codes = data_df["crop"].cat.codes.to_numpy()
+    valid = codes >= 0
+    codes = codes[valid]
+    size = len(data_df["crop"].cat.categories)
+    spread = {"count": np.bincount(codes, minlength=size).astype(np.float64)}
+    for name, column in (("price", "Mandi_Price_Rupees_per_kg"), ("yield", "Crop_Production_Rate_Yearly")):
+        values = data_df[column].to_numpy(dtype=np.float64)[valid]
+        spread[name + "_sum"] = np.bincount(codes, weights=values, minlength=size)
+        spread[name + "_sumsq"] = np.bincount(codes, weights=values * values, minlength=size)
+    return _read_only_values(spread)
+
+
+def _coefficients_of_variation(data_df, crop_type):
+    """(price CV, yield CV) for a crop, or over the whole dataset if it has too few rows."""
+    if isinstance(data_df, MainDataStore):
+        pick = data_df.crop_spread(crop_type).__getitem__
+    else:
+        spread = _crop_spread(data_df)
+        codes = [c for c in _VOCABULARY_CODES["crop"].get(str(crop_type).lower(), []) if c < len(spread["count"])]
+        if codes and spread["count"][codes].sum() >= 2:
+            pick = lambda key: spread[key][codes].sum()
+        else:
+            pick = lambda key: spread[key].sum()
+
+    count = pick("count")
+    cvs = []
+    for name in ("price", "yield"):
+        mean = pick(name + "_sum") / count
+        variance = max(pick(name + "_sumsq") / count - mean * mean, 0.0)
+        cvs.append(float(np.sqrt(variance) / mean) if mean > 0 else 0.0)
+    return tuple(cvs)
+
+
+def _lognormal_multiplier(rng, cv, size):
+    """Mean-one lognormal samples with the given coefficient of variation."""
+    sigma = np.sqrt(np.log1p(cv * cv))
+    return rng.lognormal(-0.5 * sigma * sigma, sigma, size)
+
+
+def simulate_profit(data_df, crop_type, expected_yield_tpha, price_per_kg, area_ha,
+                    cost_per_ha=DEFAULT_COST_PER_HA, n=RISK_SIMULATIONS, seed=None):
+    """
+    Monte Carlo profit distribution in one vectorized pass over `n` scenarios
+    of mandi price, yield realization, marketing loss and cultivation cost.
+    The seed defaults to a hash of the inputs so identical requests get
+    identical answers.
+    """
+    import zlib
+    if seed is None:
+        seed = zlib.crc32(f"{crop_type}|{expected_yield_tpha:.6f}|{price_per_kg}|{area_ha:.6f}|{cost_per_ha}".encode())
+    rng = np.random.default_rng(seed)
+    price_cv, yield_cv = _coefficients_of_variation(data_df, crop_type)
+
+    prices = price_per_kg * _lognormal_multiplier(rng, price_cv, n)
+    realization = np.clip(YIELD_REALIZATION_FACTOR * _lognormal_multiplier(rng, yield_cv, n), 0.0, 1.0)
+    low, high = MARKETING_LOSSES_RANGE
+    marketing = rng.triangular(low, MARKETING_LOSSES_FACTOR, high, n)
+    costs = np.maximum(rng.normal(cost_per_ha, cost_per_ha * COST_PER_HA_CV, n), 0.0)
+
+    profits = estimate_profit(expected_yield_tpha, prices, area_ha, costs, marketing, realization)["profit"]
+    percentiles = np.percentile(profits, RISK_PERCENTILES)
+    return {
+        "simulations": n,
+        "expected_profit_rs": float(profits.mean()),
+        "profit_std_rs": float(profits.std()),
+        "profit_percentiles_rs": {f"p{p}": float(v) for p, v in zip(RISK_PERCENTILES, percentiles)},
+        "probability_of_loss": float((profits < 0).mean()),
+        "price_cv": price_cv,
+        "yield_cv": yield_cv,
+    }
+
+
+def _sklearn_input_row(matched_row, crop_type, area_size):
+    """Builds the preprocessor input for a crop on a matched dataset row."""
+    return {
+        "crop": crop_type.lower(),
+        "district": matched_row["District"],
+        "soil_type": matched_row["Soil_Type"],
+        "area_ha": float(area_size) * ACRES_TO_HA,  # Convert acres to hectares
+        "avg_rain": matched_row["Avg_Rainfall_mm"],
+        "temp": matched_row["Avg_Temperature_C"],
+        "Fertilizer_Usage_kg_per_ha": matched_row["Fertilizer_Usage_kg_per_ha"],
+        "pH_Level": matched_row["pH_Level"],
+        "Phosphorus_kg_per_ha": matched_row["Phosphorus_kg_per_ha"],
+        "Potassium_kg_per_ha": matched_row["Potassium_kg_per_ha"],
+        "Nitrogen_kg_per_ha": matched_row["Nitrogen_kg_per_ha"],
+        "Organic_Matter_Percentage": matched_row["Organic_Matter_Percentage"],
+        "Electrical_Conductivity_dS_per_m": matched_row["Electrical_Conductivity_dS_per_m"],
+        "Cation_Exchange_Capacity_meq_per_100g": matched_row["Cation_Exchange_Capacity_meq_per_100g"],
+        "Zinc_ppm": matched_row["Zinc_ppm"],
+        "Iron_ppm": matched_row["Iron_ppm"],
+        "Manganese_ppm": matched_row["Manganese_ppm"],
+        "Copper_ppm": matched_row["Copper_ppm"],
+    }
+
+
+def _preprocessor_categories(preprocessor, column):
+    """Categories the preprocessor's one-hot encoder knows for `column`."""
+    for name, transformer, columns in preprocessor.transformers_:
+        if column in list(columns) and hasattr(transformer, "named_steps"):
+            encoder = transformer.named_steps.get("onehot")
+            if encoder is not None:
+                return list(encoder.categories_[list(columns).index(column)])
+    return []
+
+# --------------------
+# Prediction Explanations
+# --------------------
+# Per-feature contributions of the tree models to one prediction (see tree_explain.py),
+# reported against the original inputs rather than the preprocessed columns.
+EXPLANATION_REASONS = 3  # infeasible results name up to this many features that lowered the probability
+
+
+def _explainer_state(models):
+    """
+    Explanation state of a models snapshot (tree explainers, the preprocessor's
+    feature groups), built on first use and replaced with the models on reload.
+    """
+    return models.setdefault("explainers", {})
+
+
+def _tree_explainer(models, name):
+    """
+    TreeExplainer for the model `name` ("clf", "reg" or "agri_ml") of `models`,
+    built once per snapshot (None for unsupported models).
+    """
+    state = _explainer_state(models)
+    if name not in state:
+        model = models["agri_ml"]["model"] if name == "agri_ml" else models["sklearn"][name]
+        try:
+            state[name] = TreeExplainer(model)
+        except (ValueError, AttributeError) as e:
+            print(f"⚠ No explanations for {type(model).__name__}: {e}")
+            state[name] = None
+    return state[name]
+
+
+def _preprocessor_feature_groups(models):
+    """
+    (input column names, input column of every output column) for the fitted
+    ColumnTransformer of `models`, so all one-hot columns of e.g. "crop" map
+    back to "crop". Built once per snapshot.
+    """
+    state = _explainer_state(models)
+    if "feature_groups" not in state:
+        state["feature_groups"] = _feature_groups(models["sklearn"]["preprocessor"])
+    return state["feature_groups"]
+
+
+def _feature_groups(preprocessor):
+    names, owner = [], []
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or len(columns) == 0:
+            continue
+        columns = [preprocessor.feature_names_in_[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+        encoder = transformer.named_steps.get("onehot") if hasattr(transformer, "named_steps") else None
+        for i, column in enumerate(columns):
+            width = 1
+            if encoder is not None:
+                dropped = encoder.drop_idx_ is not None and encoder.drop_idx_[i] is not None
+                width = len(encoder.categories_[i]) - int(dropped)
+            owner += [len(names)] * width
+            names.append(column)
+    if len(owner) != len(preprocessor.get_feature_names_out()):
+        # Unrecognized encoder layout: report the preprocessed columns themselves
+        names = list(preprocessor.get_feature_names_out())
+        owner = list(range(len(names)))
+    return names, _read_only(np.array(owner))
+
+
+def _display_value(value):
+    """Input value as shown in explanations (rounded to 6 significant digits)."""
+    if isinstance(value, (float, np.floating)):
+        return float(np.format_float_positional(value, precision=6, unique=True, trim="-"))
+    return value
+
+
+def _explain_row(explainer, X_row, groups, inputs):
+    """Contributions of each input to the explained model's prediction for one row, largest first."""
+    if explainer is None:
+        return None
+    base, contributions = explainer.explain(X_row)
+    names, owner = groups
+    totals = np.bincount(owner, weights=contributions[0], minlength=len(names))
+    return {
+        "units": explainer.units,
+        "base": float(base[0]),
+        "prediction": float(base[0] + totals.sum()),
+        "contributions": [{"feature": names[i], "value": _display_value(inputs.get(names[i])), "contribution": float(totals[i])}
+                          for i in np.argsort(-np.abs(totals), kind="stable")],
     }
-    
-    # Load existing joblib models (sklearn)
-    try:
-        models["sklearn"]["preprocessor"] = joblib.load(os.path.join(MODEL_DIR, "preprocessor.joblib"))
-        models["sklearn"]["clf"] = joblib.load(os.path.join(MODEL_DIR, "feasibility_clf.joblib"))
-        models["sklearn"]["reg"] = joblib.load(os.path.join(MODEL_DIR, "yield_reg.joblib"))
-        print("✓ Sklearn models loaded successfully")
-    except FileNotFoundError:
-        print("⚠ Sklearn model files not found")
-    except Exception as e:
-        print(f"⚠ Error loading sklearn models: {e}")
-    
-    # ---- DISABLE AGRI MODEL ON RENDER ----
-    print("⚠ agri_model disabled on Render to prevent backend crash")
-    models["agri_ml"] = None
-    
-    # Load Keras CNN model for image classification
-    if KERAS_AVAILABLE and TF_AVAILABLE:
-        try:
-            keras_path = os.path.join(MODELS_DIR, "modelskeras_model")
-            model_file = os.path.join(keras_path, "model.weights.h5")
-            config_file = os.path.join(keras_path, "config.json")
-            
-            if os.path.exists(config_file) and os.path.exists(model_file):
-                # Load model architecture from config
-                with open(config_file, 'r') as f:
-                    import json
-                    config = json.load(f)
-                
-                keras_model = keras.Sequential.from_config(config['config'])
-                keras_model.load_weights(model_file)
-                models["keras_cnn"] = keras_model
-                print("✓ Keras CNN model loaded successfully")
-        except Exception as e:
-            print(f"⚠ Error loading keras model: {e}")
-    
-    return models
+
+
+def _explanation_reasons(explanation):
+    """Readable reasons from the features that lowered the feasibility most."""
+    if explanation is None:
+        return []
+    scale, unit = (100, " points") if explanation["units"] == "probability" else (1, "")
+    negative = [c for c in explanation["contributions"] if c["contribution"] < 0][:EXPLANATION_REASONS]
+    return [f"{c['feature']} = {c['value']} lowers the feasibility {explanation['units'].replace('_', '-')} "
+            f"by {-c['contribution'] * scale:.1f}{unit}" for c in negative]
+
+
+def _explain_agri_ml(models, inputs):
+    """
+    Contributions of the categorical inputs to the agri_ml forest's predicted mean
+    of the numeric columns. Inputs the request does not give (or with unknown
+    values) are averaged over, and listed under "marginalized".
+    """
+    model, encoders = models["agri_ml"]["model"], models["agri_ml"]["encoders"]
+    features = list(getattr(model, "feature_names_in_", encoders))
+    known = {f: inputs[f] for f in features if f in encoders and inputs.get(f) in set(encoders[f].classes_)}
+    X_row = np.array([[encoders[f].transform([known[f]])[0] if f in known else np.nan for f in features]],
+                     dtype=np.float32)
+    explanation = _explain_row(_tree_explainer(models, "agri_ml"), X_row, (features, np.arange(len(features))), known)
+    if explanation is not None:
+        explanation["marginalized"] = [f for f in features if f not in known]
+    return explanation
+
 
 # --------------------
 # Analysis Functions
 # --------------------
-def analyze_feasibility(models, data_df, crop_type, district, area_size, soil_type, use_model="sklearn"):
+def analyze_feasibility(models, data_df, crop_type, district, area_size, soil_type, use_model="sklearn", risk=False,
+                        explain=False):
     """
     Analyzes the feasibility and potential profit using loaded data.
     
@@ -153,17 +1994,32 @@ def analyze_feasibility(models, data_df, crop_type, district, area_size, soil_ty
     - area_size: Area in acres
     - soil_type: Soil type
     - use_model: Which model to use ("sklearn", "agri_ml")
+    - risk: Add a Monte Carlo profit distribution to feasible sklearn results
+    - explain: Add per-feature contributions of the tree models to the prediction.
+      agri_ml results are explained only when its forest is loaded; load_models
+      keeps agri_ml disabled for now, so use_model="agri_ml" answers with an
+      error before any explanation is built.
     """
     
     if use_model == "sklearn":
-        return _analyze_feasibility_sklearn(models, data_df, crop_type, district, area_size, soil_type)
+        inputs = {"District": district, "Soil_Type": soil_type, "crop": crop_type}
+        values, resolved = _resolve_inputs(data_df, inputs)
+        result = _analyze_feasibility_sklearn(models, data_df, values["crop"], values["District"], area_size, values["Soil_Type"],
+                                              risk=risk, explain=explain)
     elif use_model == "agri_ml":
-        return _analyze_feasibility_agri_ml(models, data_df, crop_type, district, area_size, soil_type)
+        inputs = {"District": district, "Major_Crops": crop_type}
+        values, resolved = _resolve_inputs(data_df, inputs)
+        result = _analyze_feasibility_agri_ml(models, data_df, values["Major_Crops"], values["District"], area_size, soil_type,
+                                              explain=explain)
     else:
         return {"feasible": False, "error": f"Unknown model type: {use_model}"}
 
+    if resolved:
+        result["resolved_inputs"] = resolved
+    return result
+
 
-def _analyze_feasibility_sklearn(models, data_df, crop_type, district, area_size, soil_type):
+def _analyze_feasibility_sklearn(models, data_df, crop_type, district, area_size, soil_type, risk=False, explain=False):
     """Analyze feasibility using sklearn models (original implementation)."""
     preprocessor = models["sklearn"]["preprocessor"]
     clf = models["sklearn"]["clf"]
@@ -175,40 +2031,18 @@ def _analyze_feasibility_sklearn(models, data_df, crop_type, district, area_size
             "error": "Sklearn models not loaded"
         }
     
-    # Find the row that matches the user's inputs for district and soil type
-    match = data_df[(data_df['District'].str.lower() == district.lower()) & 
-                    (data_df['Soil_Type'].str.lower() == soil_type.lower())]
+    # Find the row that matches the user's inputs for district and soil type,
+    # or approximate it from the nearest known profiles
+    matched_row, approximation = _matched_profile(data_df, district, soil_type)
 
-    if match.empty:
+    if matched_row is None:
         return {
             "feasible": False,
             "reasons": [f"No data found for the combination of '{district}' and '{soil_type}'. Please check your spelling or try a different combination."]
         }
     
-    # Extract all the required feature values from the found row
-    matched_row = match.iloc[0].to_dict()
-    
     # 2. Create the input DataFrame for the model
-    input_data = {
-        "crop": crop_type.lower(),
-        "district": matched_row["District"],
-        "soil_type": matched_row["Soil_Type"],
-        "area_ha": float(area_size) * 0.4047,  # Convert acres to hectares
-        "avg_rain": matched_row["Avg_Rainfall_mm"],
-        "temp": matched_row["Avg_Temperature_C"],
-        "Fertilizer_Usage_kg_per_ha": matched_row["Fertilizer_Usage_kg_per_ha"],
-        "pH_Level": matched_row["pH_Level"],
-        "Phosphorus_kg_per_ha": matched_row["Phosphorus_kg_per_ha"],
-        "Potassium_kg_per_ha": matched_row["Potassium_kg_per_ha"],
-        "Nitrogen_kg_per_ha": matched_row["Nitrogen_kg_per_ha"],
-        "Organic_Matter_Percentage": matched_row["Organic_Matter_Percentage"],
-        "Electrical_Conductivity_dS_per_m": matched_row["Electrical_Conductivity_dS_per_m"],
-        "Cation_Exchange_Capacity_meq_per_100g": matched_row["Cation_Exchange_Capacity_meq_per_100g"],
-        "Zinc_ppm": matched_row["Zinc_ppm"],
-        "Iron_ppm": matched_row["Iron_ppm"],
-        "Manganese_ppm": matched_row["Manganese_ppm"],
-        "Copper_ppm": matched_row["Copper_ppm"],
-    }
+    input_data = _sklearn_input_row(matched_row, crop_type, area_size)
     
     input_df = pd.DataFrame([input_data])
     
@@ -224,6 +2058,13 @@ def _analyze_feasibility_sklearn(models, data_df, crop_type, district, area_size
     feasibility_prob = clf.predict_proba(X_input)[0, 1]
     is_feasible = bool(clf.predict(X_input)[0])
 
+    explanation = None
+    if explain:
+        groups = _preprocessor_feature_groups(models)
+        explanation = {"feasibility": _explain_row(_tree_explainer(models, "clf"), X_input, groups, input_data)}
+        if is_feasible:
+            explanation["yield"] = _explain_row(_tree_explainer(models, "reg"), X_input, groups, input_data)
+
     if is_feasible:
         # Predict yield and calculate profit
         modal_price_per_quintal = matched_row["Mandi_Price_Rupees_per_kg"]
@@ -232,59 +2073,53 @@ def _analyze_feasibility_sklearn(models, data_df, crop_type, district, area_size
         # To avoid negative yields from the regressor
         expected_yield_tpha = max(0, expected_yield_tpha)
         
-       # More realistic profit calculation
-
-        # Adjustment factors
-        MARKETING_LOSSES_FACTOR = 0.90     # ~10% reduction due to transport, commission, wastage
-        YIELD_REALIZATION_FACTOR = 0.80    # ~20% reduction due to field losses, pests, etc.
-        DEFAULT_COST_PER_HA = 30000        # average cost of cultivation per hectare in INR
-        
-        # Price per ton after accounting for marketing losses
-        price_per_ton = modal_price_per_quintal * 10 * MARKETING_LOSSES_FACTOR
-        
-        # Effective yield (tons/ha) after accounting for field realities
-        effective_yield_tpha = expected_yield_tpha * YIELD_REALIZATION_FACTOR
-        
-        # Total revenue = effective yield × price × area
-        total_revenue = effective_yield_tpha * price_per_ton * input_data["area_ha"]
-        
-        # Total cost (use provided cost_per_ha if available, else fallback to default)
+        # More realistic profit calculation (field losses, marketing losses, cultivation cost)
         cost_per_ha = input_data.get("cost_per_ha", DEFAULT_COST_PER_HA)
-        total_cost = cost_per_ha * input_data["area_ha"]
-        
-        # Final profit
-        profit = total_revenue - total_cost
+        estimate = estimate_profit(expected_yield_tpha, modal_price_per_quintal, input_data["area_ha"], cost_per_ha)
+        total_revenue = estimate["total_revenue"]
+        profit = estimate["profit"]
            
         # We use a known high-end yield for percentage calculation.
-        max_yield_ref = data_df["Crop_Production_Rate_Yearly"].max() 
+        max_yield_ref = _column_max(data_df, "Crop_Production_Rate_Yearly") 
         yield_percentage = (expected_yield_tpha / max_yield_ref) * 100
         
-        # Future revenue projections (assuming 5% annual growth)
-        revenue_1yr = total_revenue * 1.05
-        revenue_2yr = total_revenue * (1.05)**2
-        
-        return {
+        result = {
             "feasible": True,
             "probability": feasibility_prob,
             "expected_yield_tpha": expected_yield_tpha,
             "yield_percentage": yield_percentage,
             "profit_rs": profit,
             "total_revenue_rs": total_revenue,
-            "revenue_1yr_rs": revenue_1yr,
-            "revenue_2yr_rs": revenue_2yr,
+            "revenue_1yr_rs": estimate["revenue_1yr"],
+            "revenue_2yr_rs": estimate["revenue_2yr"],
             "mandi_price_rs_per_quintal": modal_price_per_quintal,
-            "model_used": "sklearn"
+            "model_used": "sklearn",
+            **approximation
         }
+        
+        # Optional profit distribution under price/yield/cost uncertainty
+        if risk:
+            result["risk"] = simulate_profit(data_df, crop_type, expected_yield_tpha, modal_price_per_quintal,
+                                             input_data["area_ha"], cost_per_ha)
+        if explanation is not None:
+            result["explanation"] = explanation
+        return result
     else:
         # State reasons for unsuitability (a general message as the model's logic is complex)
         reasons = ["Based on the trained model, the combination of factors is not optimal for this crop in this area."]
-        return {
+        result = {
             "feasible": False,
-            "reasons": reasons
+            "reasons": reasons,
+            **approximation
         }
+        if explanation is not None:
+            # Name the inputs that pulled the prediction down
+            reasons += _explanation_reasons(explanation["feasibility"])
+            result["explanation"] = explanation
+        return result
 
 
-def _analyze_feasibility_agri_ml(models, data_df, crop_type, district, area_size, soil_type):
+def _analyze_feasibility_agri_ml(models, data_df, crop_type, district, area_size, soil_type, explain=False):
     """Analyze feasibility using agri_ml Random Forest model with regional data."""
     if models["agri_ml"] is None:
         return {"feasible": False, "error": "Agri ML model not loaded"}
@@ -294,71 +2129,513 @@ def _analyze_feasibility_agri_ml(models, data_df, crop_type, district, area_size
     encoders = agri_ml["encoders"]
     numeric_cols = agri_ml["numeric_cols"]
     
-    # First, try to find exact match for district + crop
-    match = data_df[(data_df['District'].str.lower() == district.lower()) &
-                    (data_df['Major_Crops'].str.lower() == crop_type.lower())]
+    # Route to the shard owning the district; scores are normalized over all shards
+    if isinstance(data_df, RegionalDataStore):
+        aggregates = data_df.aggregates
+    elif isinstance(data_df, RegionalShards):
+        aggregates = data_df.aggregates
+        data_df = data_df.shard_for(district)
+        if data_df is None:
+            return {
+                "feasible": False,
+                "reasons": [f"No data found for district '{district}' in regional database"]
+            }
+    else:
+        aggregates = _regional_aggregates(data_df)
     
-    # If no exact match, try just district
-    if match.empty:
-        match = data_df[(data_df['District'].str.lower() == district.lower())]
+    if isinstance(data_df, RegionalDataStore):
+        # District + crop, else district only, as indexed aggregate queries
+        mean_numeric = data_df.district_means(district, crop_type, numeric_cols)
+    else:
+        # First, try to find exact match for district + crop
+        district_mask = _category_mask(data_df['District'], district)
+        match = data_df[district_mask & _category_mask(data_df['Major_Crops'], crop_type)]
+        
+        # If no exact match, try just district
+        if match.empty:
+            match = data_df[district_mask]
+        
+        # Get mean numeric values for the matched data
+        mean_numeric = match[numeric_cols].mean() if not match.empty else None
     
-    if match.empty:
+    if mean_numeric is None:
         return {
             "feasible": False,
             "reasons": [f"No data found for district '{district}' in regional database"]
         }
     
-    # Get mean numeric values for the matched data
-    mean_numeric = match[numeric_cols].mean()
-    
-    # Calculate feasibility and productivity scores
-    soil_cols = [c for c in ["pH_Level", "Organic_Matter_Percentage", "Clay_Percentage"] if c in mean_numeric.index]
-    rain_col = "Avg_Rainfall_mm"
+    scores = _agri_ml_scores(mean_numeric.to_frame().T, aggregates).iloc[0]
+    result = {
+        "feasible": bool(scores["feasible"]),
+        "feasibility_score": float(scores["feasibility_score"]),
+        "productivity_score": float(scores["productivity_score"]),
+        "profit_loss_percent": float(scores["profit_loss_percent"]),
+        "model_used": "agri_ml"
+    }
+    if explain and model is not None:
+        result["explanation"] = {"regional_mean": _explain_agri_ml(
+            models, {"District": district, "Major_Crops": crop_type, "Soil_Type": soil_type})}
+    return result
+
+
+def _agri_ml_scores(means, aggregates):
+    """
+    agri_ml feasibility, productivity and profit/loss scores for every row of
+    `means` (one row of mean regional values per district), vectorized.
+    Scores are normalized by the dataset-wide `aggregates`.
+    """
+    # Feasibility: soil (pH, organic matter, clay) and rainfall relative to their dataset maxima
+    soil_cols = [c for c in AGRI_SOIL_COLUMNS if c in means.columns]
+    rain_col = AGRI_RAIN_COLUMN
     
-    soil_score = mean_numeric[soil_cols].mean() if soil_cols else 0
-    rain_score = mean_numeric[rain_col] if rain_col in mean_numeric.index else 0
+    soil_score = means[soil_cols].mean(axis=1) if soil_cols else 0
+    rain_score = means[rain_col] if rain_col in means.columns else 0
     
-    soil_max = data_df[soil_cols].mean(axis=1).max() if soil_cols else 1
-    rain_max = data_df[rain_col].max() if rain_col in data_df.columns else 1
+    soil_max = aggregates["soil_max"] if soil_cols else 1
+    rain_max = aggregates["rain_max"] if aggregates["rain_max"] is not None else 1
     
-    feasibility_score = ((soil_score / soil_max) + (rain_score / rain_max)) / 2 * 100 if soil_max > 0 and rain_max > 0 else 0
+    if soil_max > 0 and rain_max > 0:
+        feasibility_score = ((soil_score / soil_max) + (rain_score / rain_max)) / 2 * 100
+    else:
+        feasibility_score = 0
     
-    # Productivity score
-    nutrient_cols = [c for c in [
-        "Nitrogen_kg_per_ha",
-        "Phosphorus_kg_per_ha",
-        "Potassium_kg_per_ha",
-        "Organic_Matter_Percentage"
-    ] if c in mean_numeric.index]
+    # Productivity: N/P/K/organic matter relative to the dataset average
+    nutrient_cols = [c for c in AGRI_NUTRIENT_COLUMNS if c in means.columns]
     
-    nutrient_score = mean_numeric[nutrient_cols].sum() if nutrient_cols else 0
-    dataset_avg = data_df[nutrient_cols].sum(axis=1).mean() if nutrient_cols else 1
+    nutrient_score = means[nutrient_cols].sum(axis=1) if nutrient_cols else 0
+    dataset_avg = aggregates["nutrient_total"] / aggregates["rows"] if nutrient_cols else 1
     
     productivity_score = (nutrient_score / dataset_avg) * 100 if dataset_avg > 0 else 0
     
-    profit_loss = (feasibility_score * productivity_score) / 100 - 100
-    is_feasible = feasibility_score > 50 and productivity_score > 50
-    
+    scores = pd.DataFrame(index=means.index)
+    scores["feasibility_score"] = np.asarray(feasibility_score, dtype=np.float64) * np.ones(len(means))
+    scores["productivity_score"] = np.asarray(productivity_score, dtype=np.float64) * np.ones(len(means))
+    scores["profit_loss_percent"] = scores["feasibility_score"] * scores["productivity_score"] / 100 - 100
+    scores["feasible"] = (scores["feasibility_score"] > 50) & (scores["productivity_score"] > 50)
+    return scores
+
+
+def _agri_ml_numeric_cols(models):
+    """Numeric columns of the agri_ml model, or those it was trained on (columns.json) when it is not loaded."""
+    if models["agri_ml"] is not None:
+        return models["agri_ml"]["numeric_cols"]
+    return _regional_data_columns()[1]
+
+
+def _district_group_sums(frame, columns, crop_type=None):
+    """
+    Per-district row counts, and sums and non-null counts of `columns`, over
+    the district's rows of `crop_type` (all rows when None), in one groupby.
+    """
+    if crop_type is not None:
+        frame = frame[_category_mask(frame["Major_Crops"], crop_type)]
+    grouped = frame.groupby("District", observed=True)
+    sums, counts, rows = grouped[columns].sum(), grouped[columns].count(), grouped.size()
+    for result in (sums, counts, rows):
+        result.index = result.index.astype(str)
+    return sums, counts, rows
+
+
+def _shard_group_sums(frame):
+    """
+    Group sums of every numeric column of a regional frame: per district, and
+    per district and crop, each as (sums, non-null counts, row counts).
+    """
+    numeric = [c for c in frame.columns if c not in CATEGORY_VOCABULARY]
+    grouped = frame.groupby(["District", "Major_Crops"], observed=True)
+    by_crop = grouped[numeric].sum(), grouped[numeric].count(), grouped.size()
+    for result in by_crop:
+        result.index = result.index.set_levels([level.astype(str) for level in result.index.levels])
+    return _district_group_sums(frame, numeric), by_crop
+
+
+def _combine_group_sums(parts):
+    """Adds per-district sums from several shards (a district may span shards)."""
+    sums, counts, rows = zip(*parts)
+    combine = lambda frames: pd.concat(frames).groupby(level=0).sum()
+    return combine(sums), combine(counts), combine(rows)
+
+
+def _regional_district_means(data_df, columns, crop_type=None):
+    """(per-district mean frame, row counts) over the regional data, whatever its backend."""
+    if isinstance(data_df, (RegionalDataStore, RegionalShards)):
+        sums, counts, rows = data_df.district_sums(columns, crop_type)
+    else:
+        sums, counts, rows = _district_group_sums(data_df, columns, crop_type)
+    return sums / counts.where(counts > 0), rows
+
+
+def rank_districts(models, data_df, crop_type=None):
+    """
+    agri_ml scores of every district in the regional data, computed in one
+    grouped pass instead of one _analyze_feasibility_agri_ml call per district.
+
+    With `crop_type`, a district is scored on its rows of that crop, or on all
+    its rows when it has none (as the single-district analysis does), which
+    `crop_matched` reports. Cached per regional dataset object, i.e. per
+    loaded dataset version.
+    """
+    numeric_cols = _agri_ml_numeric_cols(models)
+    if numeric_cols is None:
+        return {"error": "The agri_ml columns (models/agri_ml_model/model/columns.json) are not available"}
+
+    resolved = {}
+    if crop_type:
+        values, resolved = _resolve_inputs(data_df, {"Major_Crops": crop_type})
+        crop_type = values["Major_Crops"]
+        if "Major_Crops" in resolved and not resolved["Major_Crops"]["match"]:
+            return {"error": f"Unknown crop: {crop_type}", "resolved_inputs": resolved}
+
+    cache = frame_index(data_df).setdefault("rankings", {})
+    key = str(crop_type).lower() if crop_type else None
+    rankings = cache.get(key)
+    if rankings is None:
+        columns = [c for c in dict.fromkeys(AGRI_SOIL_COLUMNS + [AGRI_RAIN_COLUMN] + AGRI_NUTRIENT_COLUMNS)
+                   if c in numeric_cols]
+        means, rows = _regional_district_means(data_df, columns)
+        matched = pd.Series(False, index=means.index)
+        if crop_type:
+            crop_means, crop_rows = _regional_district_means(data_df, columns, crop_type)
+            means.loc[crop_means.index] = crop_means
+            rows.loc[crop_rows.index] = crop_rows
+            matched.loc[crop_means.index] = True
+        aggregates = data_df.aggregates if not isinstance(data_df, pd.DataFrame) else _regional_aggregates(data_df)
+        scores = _agri_ml_scores(means, aggregates)
+
+        rankings = []
+        for district, score in scores.iterrows():
+            entry = {
+                "district": district,
+                "rows": int(rows[district]),
+                "feasible": bool(score["feasible"]),
+                "feasibility_score": float(score["feasibility_score"]),
+                "productivity_score": float(score["productivity_score"]),
+                "profit_loss_percent": float(score["profit_loss_percent"]),
+            }
+            if not isinstance(data_df, pd.DataFrame):
+                entry["states"] = data_df.states_for(district)
+            if crop_type:
+                entry["crop_matched"] = bool(matched[district])
+            rankings.append(entry)
+        cache[key] = rankings
+
+    return {"crop": crop_type, "districts": rankings, "resolved_inputs": resolved, "model_used": "agri_ml"}
+
+def recommend_crops(models, data_df, district, area_size, soil_type, top_k=5, rank_by="profit"):
+    """
+    Scores every crop the sklearn preprocessor knows for one district/soil/area
+    in a single batched transform + predict, and returns the top_k crops.
+
+    Feasible crops are ranked first, by `rank_by` ("profit" or "probability").
+    Each entry carries the same figures /analyze would return for that crop.
+    """
+    preprocessor = models["sklearn"]["preprocessor"]
+    clf = models["sklearn"]["clf"]
+    reg = models["sklearn"]["reg"]
+
+    if preprocessor is None or clf is None or reg is None:
+        return {"error": "Sklearn models not loaded"}
+    if rank_by not in ("profit", "probability"):
+        return {"error": f"Unknown ranking: {rank_by}. Use 'profit' or 'probability'."}
+
+    values, resolved = _resolve_inputs(data_df, {"District": district, "Soil_Type": soil_type})
+    matched_row, approximation = _matched_profile(data_df, values["District"], values["Soil_Type"])
+    if matched_row is None:
+        return {
+            "recommendations": [],
+            "resolved_inputs": resolved,
+            "reasons": [f"No data found for the combination of '{district}' and '{soil_type}'. Please check your spelling or try a different combination."]
+        }
+
+    crops = _preprocessor_categories(preprocessor, "crop")
+    if not crops:
+        return {"error": "The sklearn preprocessor does not expose a crop vocabulary"}
+
+    # One row per candidate crop, identical apart from the crop column
+    base_row = _sklearn_input_row(matched_row, crops[0], area_size)
+    input_df = pd.DataFrame([base_row] * len(crops))
+    input_df["crop"] = crops
+
+    X_input = preprocessor.transform(input_df)
+    probabilities = clf.predict_proba(X_input)[:, 1]
+    feasible = clf.predict(X_input).astype(bool)
+    expected_yield = np.maximum(0, reg.predict(X_input))
+
+    price = matched_row["Mandi_Price_Rupees_per_kg"]
+    estimate = estimate_profit(expected_yield, price, base_row["area_ha"])
+    max_yield_ref = _column_max(data_df, "Crop_Production_Rate_Yearly")
+
+    # Feasible crops first, ranked by the requested key; infeasible ones by probability
+    key = estimate["profit"] if rank_by == "profit" else probabilities
+    key = np.where(feasible, key, 0)
+    order = np.lexsort((-probabilities, -key, ~feasible))[:max(1, int(top_k))]
+
+    recommendations = []
+    for i in order:
+        entry = {
+            "crop": crops[i],
+            "feasible": bool(feasible[i]),
+            "probability": float(probabilities[i]),
+        }
+        if feasible[i]:
+            entry.update({
+                "expected_yield_tpha": float(expected_yield[i]),
+                "yield_percentage": float(expected_yield[i] / max_yield_ref * 100),
+                "profit_rs": float(estimate["profit"][i]),
+                "total_revenue_rs": float(estimate["total_revenue"][i]),
+                "revenue_1yr_rs": float(estimate["revenue_1yr"][i]),
+                "revenue_2yr_rs": float(estimate["revenue_2yr"][i]),
+            })
+        recommendations.append(entry)
+
     return {
-        "feasible": is_feasible,
-        "feasibility_score": float(feasibility_score),
-        "productivity_score": float(productivity_score),
-        "profit_loss_percent": float(profit_loss),
-        "model_used": "agri_ml"
+        "district": matched_row["District"],
+        "soil_type": matched_row["Soil_Type"],
+        "area_ha": base_row["area_ha"],
+        "mandi_price_rs_per_quintal": price,
+        "ranked_by": rank_by,
+        "crops_scored": len(crops),
+        "recommendations": recommendations,
+        "resolved_inputs": resolved,
+        "model_used": "sklearn",
+        **approximation
+    }
+
+
+# Parameters /whatif can sweep: request name -> (model input column, unit conversion)
+WHATIF_PARAMETERS = {
+    "area": ("area_ha", ACRES_TO_HA),  # given in acres like /analyze
+    "fertilizer": ("Fertilizer_Usage_kg_per_ha", 1.0),
+    "rainfall": ("avg_rain", 1.0),
+    "temperature": ("temp", 1.0),
+    "ph": ("pH_Level", 1.0),
+    "nitrogen": ("Nitrogen_kg_per_ha", 1.0),
+    "phosphorus": ("Phosphorus_kg_per_ha", 1.0),
+    "potassium": ("Potassium_kg_per_ha", 1.0),
+    "organic_matter": ("Organic_Matter_Percentage", 1.0),
+}
+WHATIF_MAX_PARAMETERS = 2
+WHATIF_MAX_STEPS = 50
+
+
+def _sweep_values(spec):
+    """Values for one swept parameter: a list, or {"start", "stop", "steps"}."""
+    if isinstance(spec, dict):
+        steps = int(spec.get("steps", 10))
+        if not 1 <= steps <= WHATIF_MAX_STEPS:
+            raise ValueError(f"steps must be between 1 and {WHATIF_MAX_STEPS}")
+        return np.linspace(float(spec["start"]), float(spec["stop"]), steps)
+    values = np.asarray(spec, dtype=np.float64).ravel()
+    if not 1 <= len(values) <= WHATIF_MAX_STEPS:
+        raise ValueError(f"a sweep needs between 1 and {WHATIF_MAX_STEPS} values")
+    return values
+
+
+def whatif_sweep(models, data_df, crop_type, district, area_size, soil_type, sweeps):
+    """
+    Response surface of feasibility, yield and profit over a grid of one or
+    two perturbed inputs, scored in a single batched transform + predict.
+
+    `sweeps` maps a parameter name from WHATIF_PARAMETERS to a list of values
+    or a {"start", "stop", "steps"} range. All other inputs come from the
+    matched dataset row, exactly as in /analyze. Arrays in the result have
+    one axis per swept parameter, in the order given.
+    """
+    preprocessor = models["sklearn"]["preprocessor"]
+    clf = models["sklearn"]["clf"]
+    reg = models["sklearn"]["reg"]
+
+    if preprocessor is None or clf is None or reg is None:
+        return {"error": "Sklearn models not loaded"}
+    if not isinstance(sweeps, dict) or not 1 <= len(sweeps) <= WHATIF_MAX_PARAMETERS:
+        return {"error": f"Provide 1 to {WHATIF_MAX_PARAMETERS} parameters to sweep"}
+    unknown = [name for name in sweeps if name not in WHATIF_PARAMETERS]
+    if unknown:
+        return {"error": f"Cannot sweep {unknown}. Choose from {sorted(WHATIF_PARAMETERS)}"}
+    try:
+        axes = {name: _sweep_values(spec) for name, spec in sweeps.items()}
+    except (KeyError, TypeError, ValueError) as e:
+        return {"error": f"Invalid sweep: {e}"}
+
+    values, resolved = _resolve_inputs(data_df, {"District": district, "Soil_Type": soil_type, "crop": crop_type})
+    matched_row, approximation = _matched_profile(data_df, values["District"], values["Soil_Type"])
+    if matched_row is None:
+        return {
+            "error": f"No data found for the combination of '{district}' and '{soil_type}'. Please check your spelling or try a different combination.",
+            "resolved_inputs": resolved
+        }
+
+    # Full grid of perturbed rows around the matched one
+    base_row = _sklearn_input_row(matched_row, values["crop"], area_size)
+    grid = np.meshgrid(*axes.values(), indexing="ij")
+    shape = grid[0].shape
+    input_df = pd.DataFrame([base_row] * grid[0].size)
+    for name, column_values in zip(axes, grid):
+        column, factor = WHATIF_PARAMETERS[name]
+        input_df[column] = column_values.ravel() * factor
+
+    X_input = preprocessor.transform(input_df)
+    probabilities = clf.predict_proba(X_input)[:, 1]
+    feasible = clf.predict(X_input).astype(bool)
+    expected_yield = np.maximum(0, reg.predict(X_input))
+    estimate = estimate_profit(expected_yield, matched_row["Mandi_Price_Rupees_per_kg"], input_df["area_ha"].to_numpy())
+
+    return {
+        "crop": values["crop"],
+        "district": matched_row["District"],
+        "soil_type": matched_row["Soil_Type"],
+        "parameters": list(axes),
+        "values": {name: axis.tolist() for name, axis in axes.items()},
+        "shape": list(shape),
+        "feasible": feasible.reshape(shape).tolist(),
+        "probability": probabilities.reshape(shape).tolist(),
+        "expected_yield_tpha": expected_yield.reshape(shape).tolist(),
+        "profit_rs": estimate["profit"].reshape(shape).tolist(),
+        "total_revenue_rs": estimate["total_revenue"].reshape(shape).tolist(),
+        "resolved_inputs": resolved,
+        "model_used": "sklearn",
+        **approximation
     }
 
+
+# Input columns expected by score_feasibility_batch (same names as the /analyze payload)
+BATCH_INPUT_COLUMNS = ["crop", "district", "area", "soil"]
+
+
+def score_feasibility_batch(models, data_df, requests):
+    """
+    Scores a DataFrame of (crop, district, area, soil) rows with the sklearn
+    models in one batched transform + predict.
+
+    Each distinct district/soil pair and crop is looked up (and, if needed,
+    resolved or approximated) once, as /analyze would. Returns a DataFrame
+    aligned with `requests` holding the /analyze figures plus a `status`
+    column ("ok", "no_data", "invalid_area" or "error").
+    """
+    preprocessor = models["sklearn"]["preprocessor"]
+    clf = models["sklearn"]["clf"]
+    reg = models["sklearn"]["reg"]
+    if preprocessor is None or clf is None or reg is None:
+        raise RuntimeError("Sklearn models not loaded")
+
+    n = len(requests)
+    out = pd.DataFrame(index=requests.index)
+    out["status"] = "ok"
+    out["feasible"] = False
+    out["approximate"] = False
+    for column in ("probability", "expected_yield_tpha", "yield_percentage", "profit_rs",
+                   "total_revenue_rs", "revenue_1yr_rs", "revenue_2yr_rs", "mandi_price_rs_per_quintal"):
+        out[column] = np.nan
+
+    crops = requests["crop"].astype(str).str.strip()
+    districts = requests["district"].astype(str).str.strip()
+    soils = requests["soil"].astype(str).str.strip()
+    area_ha = pd.to_numeric(requests["area"], errors="coerce").to_numpy(dtype=np.float64) * ACRES_TO_HA
+
+    # Look up each distinct district/soil pair and crop once
+    pair_codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([districts, soils]))
+    profiles, approximate = [], []
+    for district, soil in pairs:
+        values, _ = _resolve_inputs(data_df, {"District": district, "Soil_Type": soil})
+        profile, approximation = _matched_profile(data_df, values["District"], values["Soil_Type"])
+        profiles.append(profile)
+        approximate.append(bool(approximation))
+    crop_codes, crop_names = pd.factorize(crops)
+    resolved_crops = np.array([_resolve_inputs(data_df, {"crop": c})[0]["crop"].lower() for c in crop_names], dtype=object)
+
+    has_profile = np.array([p is not None for p in profiles], dtype=bool)[pair_codes]
+    valid_area = np.isfinite(area_ha) & (area_ha > 0)
+    out.loc[~has_profile, "status"] = "no_data"
+    out.loc[has_profile & ~valid_area, "status"] = "invalid_area"
+    rows = np.flatnonzero(has_profile & valid_area)
+    if not len(rows):
+        return out
+
+    # One feature row per request, built from the per-pair profiles
+    pair_rows = pd.DataFrame([_sklearn_input_row(p, "", 1) if p is not None else {} for p in profiles])
+    input_df = pair_rows.iloc[pair_codes[rows]].reset_index(drop=True)
+    input_df["crop"] = resolved_crops[crop_codes[rows]]
+    input_df["area_ha"] = area_ha[rows]
+    prices = np.array([p["Mandi_Price_Rupees_per_kg"] if p is not None else np.nan for p in profiles])[pair_codes[rows]]
+
+    try:
+        X_input = preprocessor.transform(input_df)
+    except ValueError:
+        out.iloc[rows, out.columns.get_loc("status")] = "error"
+        return out
+    probabilities = clf.predict_proba(X_input)[:, 1]
+    feasible = clf.predict(X_input).astype(bool)
+    expected_yield = np.maximum(0, reg.predict(X_input))
+    estimate = estimate_profit(expected_yield, prices, input_df["area_ha"].to_numpy())
+    max_yield_ref = _column_max(data_df, "Crop_Production_Rate_Yearly")
+
+    def put(column, values):
+        out.iloc[rows, out.columns.get_loc(column)] = values
+
+    put("feasible", feasible)
+    put("approximate", np.array(approximate, dtype=bool)[pair_codes[rows]])
+    put("probability", probabilities)
+    # Yield and profit figures are only reported for feasible rows, as in /analyze
+    for column, values in (("expected_yield_tpha", expected_yield),
+                           ("yield_percentage", expected_yield / max_yield_ref * 100),
+                           ("profit_rs", estimate["profit"]),
+                           ("total_revenue_rs", estimate["total_revenue"]),
+                           ("revenue_1yr_rs", estimate["revenue_1yr"]),
+                           ("revenue_2yr_rs", estimate["revenue_2yr"]),
+                           ("mandi_price_rs_per_quintal", prices)):
+        put(column, np.where(feasible, values, np.nan))
+    return out
+
+
+# --------------------
+# Image Analysis
+# --------------------
+IMAGE_SIZE = (128, 128)  # CNN input resolution
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+UPLOADS_DIR = os.path.join(MODEL_DIR, "uploads")
+WARNING_INTERVAL_SECONDS = 60.0  # repeated CNN failure warnings are printed at most this often
+
+_warning_lock = threading.Lock()
+_last_warning = {"at": None, "suppressed": 0}
+
+
+def _warn_cnn_failure(error):
+    """Prints the CNN fallback warning, at most once per WARNING_INTERVAL_SECONDS."""
+    now = time.monotonic()
+    with _warning_lock:
+        if _last_warning["at"] is not None and now - _last_warning["at"] < WARNING_INTERVAL_SECONDS:
+            _last_warning["suppressed"] += 1
+            return
+        suppressed = _last_warning["suppressed"]
+        _last_warning.update(at=now, suppressed=0)
+    note = f" ({suppressed} similar warnings suppressed)" if suppressed else ""
+    print(f"⚠ Keras CNN analysis failed: {error}. Using rule-based detection instead.{note}")
+
+
 def analyze_image(models, data_df, filename):
     """
     Analyzes the image based on filename and Keras model if available.
     Falls back to rule-based matching if model is unavailable or image not found.
     """
-    # Try to use Keras model first (only if model is loaded)
-    if models["keras_cnn"] is not None:
+    # Try to use Keras model first (only if model is loaded, the photo was uploaded and the breaker is not open)
+    breaker = models.get("image_breaker")
+    if (models["keras_cnn"] is not None and os.path.isfile(os.path.join(UPLOADS_DIR, filename))
+            and (breaker is None or breaker.allow())):
         try:
-            return _analyze_image_keras(models, filename)
+            result = _analyze_image_keras(models, filename)
         except Exception as e:
+            if breaker is not None:
+                # A photo removed since the check above says nothing about the model's health
+                if isinstance(e, FileNotFoundError):
+                    breaker.release()
+                else:
+                    breaker.failure(e)
             # Log the error but continue to fallback
-            print(f"⚠ Keras CNN analysis failed: {str(e)}. Using rule-based detection instead.")
+            _warn_cnn_failure(e)
+        else:
+            if breaker is not None:
+                breaker.success()
+            return result
     
     # Fallback to rule-based matching (analyzes based on filename)
     result = _analyze_image_ruleset(data_df, filename)
@@ -367,46 +2644,80 @@ def analyze_image(models, data_df, filename):
     return result
 
 
+def load_image_array(img_path, draft=False):
+    """
+    Decodes an image file into the CNN input layout: float RGB in [0, 1], IMAGE_SIZE.
+    With draft=True, JPEGs are decoded at a reduced scale first (much faster for large photos).
+    """
+    if PIL_AVAILABLE:
+        with Image.open(img_path) as img:
+            if draft:
+                img.draft('RGB', IMAGE_SIZE)
+            img = img.convert('RGB')
+            img = img.resize(IMAGE_SIZE)
+            img_array = np.array(img) / 255.0
+    else:
+        img_array = cv2.imread(img_path)
+        if img_array is None:
+            raise ValueError(f"Could not decode image: {img_path}")
+        img_array = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
+        img_array = cv2.resize(img_array, IMAGE_SIZE)
+        img_array = img_array / 255.0
+    return img_array
+
+
+def _keras_result(confidence):
+    """Builds the image analysis response for one CNN confidence score."""
+    # Determine if crop is healthy
+    is_healthy = confidence > 0.5
+    
+    return {
+        "status": "success",
+        "model_used": "keras_cnn",
+        "confidence": confidence,
+        "is_healthy": is_healthy,
+        "diagnosis": "Plant appears healthy" if is_healthy else "Plant shows signs of disease"
+    }
+
+
+def classify_image_arrays(models, img_arrays):
+    """Runs the CNN once over a batch of decoded images; returns one result per image."""
+    batch = np.asarray(img_arrays, dtype=np.float32)
+    prediction = cnn_predict(models, batch)
+    return [_keras_result(float(p[0])) for p in np.asarray(prediction)]
+
+
 def _analyze_image_keras(models, filename):
     """Analyze image using Keras CNN model."""
-    keras_model = models["keras_cnn"]
-    
     # Load the image
-    img_path = os.path.join(MODEL_DIR, "uploads", filename)
+    img_path = os.path.join(UPLOADS_DIR, filename)
     
     if not os.path.exists(img_path):
         # If file doesn't exist, raise exception to trigger fallback
         raise FileNotFoundError(f"Image file not found: {filename}")
     
     # Load and preprocess image
-    if PIL_AVAILABLE:
-        img = Image.open(img_path)
-        img = img.convert('RGB')
-        img = img.resize((128, 128))
-        img_array = np.array(img) / 255.0
-    else:
-        img_array = cv2.imread(img_path)
-        img_array = cv2.cvtColor(img_array, cv2.COLOR_BGR2RGB)
-        img_array = cv2.resize(img_array, (128, 128))
-        img_array = img_array / 255.0
+    img_array = load_image_array(img_path)
+    
+    # Re-sent photos (recompressed or slightly cropped) reuse the stored diagnosis
+    cache = models.get("image_cache")
+    if cache is not None:
+        key = dhash(img_array)
+        cached = cache.lookup(key)
+        if cached is not None:
+            return {**cached, "cached": True}
     
     # Add batch dimension
     img_array = np.expand_dims(img_array, axis=0)
     
     # Make prediction
-    prediction = keras_model.predict(img_array, verbose=0)
+    prediction = cnn_predict(models, img_array)
     confidence = float(prediction[0][0])
     
-    # Determine if crop is healthy
-    is_healthy = confidence > 0.5
-    
-    return {
-        "status": "success",
-        "model_used": "keras_cnn",
-        "confidence": confidence,
-        "is_healthy": is_healthy,
-        "diagnosis": "Plant appears healthy" if is_healthy else "Plant shows signs of disease"
-    }
+    result = _keras_result(confidence)
+    if cache is not None:
+        cache.store(key, result)
+    return result
 
 
 def _analyze_image_ruleset(data_df, filename):
@@ -414,20 +2725,7 @@ def _analyze_image_ruleset(data_df, filename):
     filename_lower = filename.lower()
     
     # Comprehensive crop detection mapping
-    crop_mappings = {
-        "rice": ["rice", "paddy", "धान", "நெல்"],
-        "wheat": ["wheat", "गेहूं", "கோதுமை"],
-        "tomato": ["tomato", "टमाटर", "தக்காளி"],
-        "cotton": ["cotton", "कपास", "棉"],
-        "groundnut": ["groundnut", "mungfali", "गंडु", "கடலை"],
-        "sugarcane": ["sugarcane", "गन्ना", "கரும்பு"],
-        "maize": ["maize", "corn", "मक्का", "玉米"],
-        "chilli": ["chilli", "pepper", "मिर्च", "மிளகாய்"],
-        "soybean": ["soybean", "सोयाबीन", "சோயாபீன்"],
-        "mustard": ["mustard", "सरसों", "芥末"],
-        "potato": ["potato", "आलू", "உருளை"],
-        "onion": ["onion", "प्याज", "வெங்காயம்"]
-    }
+    crop_mappings = CROP_KEYWORDS
     
     # Find matching crop
     detected_crop = None
@@ -436,6 +2734,19 @@ def _analyze_image_ruleset(data_df, filename):
             detected_crop = crop.capitalize()
             break
     
+    # Otherwise accept a close misspelling of a keyword (e.g. "tomatto_leaf.jpg")
+    resolved = {}
+    if not detected_crop:
+        stem = os.path.splitext(filename_lower)[0]
+        for token in re.split(r"[^a-z]+", stem):
+            if len(token) < 4:
+                continue
+            resolution = NAME_RESOLVER.resolve("image_crop", token, min_score=IMAGE_KEYWORD_MIN_SCORE)
+            if resolution["match"]:
+                detected_crop = resolution["match"].capitalize()
+                resolved["crop"] = {"input": token, "match": resolution["match"], "alternatives": []}
+                break
+    
     if not detected_crop:
         return {
             "status": "error",
@@ -443,12 +2754,18 @@ def _analyze_image_ruleset(data_df, filename):
             "suggested_crops": list(crop_mappings.keys())
         }
     
-    # Get crop data from dataset
-    crop_data = data_df[data_df['crop'].str.lower() == detected_crop.lower()]
+    # Get crop statistics from dataset
+    if isinstance(data_df, MainDataStore):
+        crop_rows, avg_production, avg_mandi_price = data_df.crop_means(detected_crop)
+    else:
+        crop_data = data_df[_category_mask(data_df['crop'], detected_crop)]
+        crop_rows = len(crop_data)
+        avg_production = crop_data['Crop_Production_Rate_Yearly'].mean() if 'Crop_Production_Rate_Yearly' in crop_data.columns else 0
+        avg_mandi_price = crop_data['Mandi_Price_Rupees_per_kg'].mean() if 'Mandi_Price_Rupees_per_kg' in crop_data.columns else 0
     
-    if crop_data.empty:
+    if not crop_rows:
         # Return basic info even if no dataset match
-        return {
+        result = {
             "status": "success",
             "model_used": "ruleset",
             "crop": detected_crop,
@@ -456,10 +2773,9 @@ def _analyze_image_ruleset(data_df, filename):
             "avg_production": "Data not available",
             "mandi_price": "Check local mandi rates"
         }
-    
-    # Get statistics from dataset
-    avg_production = crop_data['Crop_Production_Rate_Yearly'].mean() if 'Crop_Production_Rate_Yearly' in crop_data.columns else 0
-    avg_mandi_price = crop_data['Mandi_Price_Rupees_per_kg'].mean() if 'Mandi_Price_Rupees_per_kg' in crop_data.columns else 0
+        if resolved:
+            result["resolved_inputs"] = resolved
+        return result
     
     # Health assessment based on image characteristics (heuristic)
     # In real scenario, Keras model would do this
@@ -473,7 +2789,7 @@ def _analyze_image_ruleset(data_df, filename):
         disease_risk = "High"
         confidence = 0.75
     
-    return {
+    result = {
         "status": "success",
         "model_used": "ruleset_enhanced",
         "crop": detected_crop,
@@ -484,6 +2800,9 @@ def _analyze_image_ruleset(data_df, filename):
         "mandi_price": f"₹{avg_mandi_price:.2f}/kg" if avg_mandi_price > 0 else "Check local market",
         "recommendations": get_crop_recommendations(detected_crop)
     }
+    if resolved:
+        result["resolved_inputs"] = resolved
+    return result
 
 
 def get_crop_recommendations(crop):
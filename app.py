@@ -1,39 +1,256 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, abort, g
 from flask_cors import CORS
+import hmac
+import io
 import os
+import signal
+import threading
+import time
+import pandas as pd
 import agronity_test as ag
-import numpy as _np # Import numpy at the top for the helper function
-
-# Small helper to convert numpy types to Python native types
-def to_py(obj):
-    if isinstance(obj, dict):
-        return {k: to_py(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [to_py(i) for i in obj]
-    if _np is not None:
-        if isinstance(obj, _np.generic):
-            return obj.item()
-        if isinstance(obj, _np.ndarray):
-            return obj.tolist()
-    return obj
+from static_assets import ASSET_DIRS, ASSET_FILES, AssetStore
+import jobs
+from request_log import RequestLog
+from memory_budget import sharing
+from json_provider import NumpyJSONProvider
 
 # App setup
-app = Flask(__name__, static_folder='.')
+# No Flask static folder: only the whitelisted assets in static_assets.py are served
+app = Flask(__name__, static_folder=None)
+# Responses carry numpy values straight from the analyses; the provider encodes them natively
+app.json = NumpyJSONProvider(app)
 CORS(app)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+assets = AssetStore(BASE_DIR)
 
-# Load models and data at startup
-models = ag.load_models()  # Now loads all available models
-data_df = ag.load_data()
-agri_ml_data_df = ag.load_agri_ml_regional_data()  # Load regional data for agri_ml model
+# Set by gunicorn.conf.py: the master loads the app once and forks the workers, which
+# then load the Keras CNN and start their threads in init_worker()
+PRELOAD = os.environ.get("AGRONITY_PRELOAD", "0") == "1"
+
+# Load models and data at startup.
+# `runtime` is one immutable snapshot {"version", "models", "data_df", "agri_ml_data_df" (regional shards), ...}.
+# Handlers read it once per request; a reload swaps the whole reference at once.
+runtime = ag.load_runtime(defer_keras=PRELOAD)
+
+# Admin token for /admin/* endpoints (admin endpoints are disabled when unset)
+ADMIN_TOKEN = os.environ.get("AGRONITY_ADMIN_TOKEN")
+# Seconds between artifact checks by the file watcher (0 disables it)
+WATCH_INTERVAL = float(os.environ.get("AGRONITY_WATCH_INTERVAL", "0"))
+
+# Background job database and worker threads for POST /jobs
+JOBS_DB = os.environ.get("AGRONITY_JOBS_DB", os.path.join(BASE_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("AGRONITY_JOB_WORKERS", "2"))
+JOB_KINDS = ("feasibility", "image")
+
+# Analysis requests and their outcomes are appended to this JSONL file by a background thread
+# (empty disables it); it is rotated at AGRONITY_REQUEST_LOG_MAX_MB, gzip-compressed if requested
+REQUEST_LOG = os.environ.get("AGRONITY_REQUEST_LOG", os.path.join(BASE_DIR, "logs", "requests.jsonl"))
+REQUEST_LOG_MAX_MB = float(os.environ.get("AGRONITY_REQUEST_LOG_MAX_MB", "50"))
+REQUEST_LOG_BACKUPS = int(os.environ.get("AGRONITY_REQUEST_LOG_BACKUPS", "5"))
+REQUEST_LOG_COMPRESS = os.environ.get("AGRONITY_REQUEST_LOG_COMPRESS", "0") == "1"
+LOGGED_ENDPOINTS = {"analyze", "recommend", "whatif", "rankings", "analyze_image", "submit_job"}
+
+_reload_lock = threading.Lock()
+_reload_status = {"in_progress": False, "last_attempt": None, "last_error": None}
+
+
+def reload_runtime():
+    """Loads a new snapshot, validates it and swaps it in. Returns True on success."""
+    global runtime
+    if not _reload_lock.acquire(blocking=False):
+        return False  # a reload is already running
+    try:
+        _reload_status.update(in_progress=True, last_attempt=time.time())
+        current = runtime
+        candidate = ag.load_runtime(defer_keras=PRELOAD)
+        problems = ag.validate_runtime(candidate, current)
+        if problems:
+            _reload_status["last_error"] = "; ".join(problems)
+            print(f"⚠ Reload rejected, keeping version {current['version']}: {_reload_status['last_error']}")
+            return False
+        runtime = candidate  # atomic reference swap
+        _reload_status["last_error"] = None
+        print(f"✓ Reloaded artifacts: version {current['version']} → {candidate['version']}")
+        return True
+    except Exception as e:
+        _reload_status["last_error"] = str(e)
+        print(f"⚠ Reload failed: {e}")
+        return False
+    finally:
+        _reload_status["in_progress"] = False
+        _reload_lock.release()
+
+
+_sync_status = {"last_error": None}
+
+
+def sync_ingested_rows():
+    """
+    Swaps in rows appended to the ingest store by other processes (gunicorn
+    workers share the store), so every worker answers from the same data.
+    """
+    global runtime
+    if not ag.ingest_pending(runtime["data_df"]) or not _reload_lock.acquire(timeout=5):
+        return
+    try:
+        rt = runtime
+        data_df = ag.sync_ingested(rt["data_df"])
+        if data_df is not None:
+            runtime = {**rt, "data_df": data_df, "data_revision": ag.ingest_state(data_df)["rows"]}
+        _sync_status["last_error"] = None
+    except Exception as e:
+        if str(e) != _sync_status["last_error"]:  # printed once per distinct error, not per request
+            print(f"⚠ Could not sync ingested rows: {e}")
+        _sync_status["last_error"] = str(e)
+    finally:
+        _reload_lock.release()
+
+
+def _watch_artifacts(on_change):
+    """Polls the artifact files and calls `on_change` when their version changes."""
+    attempted = runtime["version"]
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        version = ag.artifact_version()
+        if version != attempted and version != runtime["version"]:
+            attempted = version
+            on_change()
+
+
+def start_watcher(on_change=None):
+    """
+    Starts the artifact watcher when enabled. By default a change reloads this
+    process; the gunicorn master passes a callback that re-forks its workers instead.
+    """
+    if WATCH_INTERVAL > 0:
+        threading.Thread(target=_watch_artifacts, args=(on_change or reload_runtime,), name="artifact-watcher",
+                         daemon=True).start()
+
+
+def _flag(payload, name):
+    """Optional boolean field: JSON true or false (absent means false). Raises ValueError for anything else."""
+    value = payload.get(name, False)
+    if not isinstance(value, bool):
+        raise ValueError(f"{name} must be true or false")
+    return value
+
+
+def _run_job_tasks(kind, tasks):
+    """Runs one chunk of job tasks on the current snapshot; a failing task yields an error entry."""
+    sync_ingested_rows()
+    rt = runtime
+    models, data_df, agri_ml_data_df = rt["models"], rt["data_df"], rt["agri_ml_data_df"]
+    results = []
+    for task in tasks:
+        try:
+            if kind == "feasibility":
+                missing = [k for k in ("crop", "district", "area", "soil") if not task.get(k)]
+                if missing:
+                    results.append({"error": f"Missing required fields: {', '.join(missing)}"})
+                    continue
+                try:
+                    risk, explain = _flag(task, "risk"), _flag(task, "explain")
+                except ValueError as e:
+                    results.append({"error": str(e)})
+                    continue
+                model_type = task.get("model", "sklearn")
+                analysis_data = agri_ml_data_df if (model_type == "agri_ml" and agri_ml_data_df is not None) else data_df
+                result = ag.analyze_feasibility(models, analysis_data, task["crop"], task["district"], task["area"],
+                                                task["soil"], use_model=model_type, risk=risk, explain=explain)
+            else:
+                if not task.get("filename"):
+                    results.append({"error": "Missing required field: filename"})
+                    continue
+                result = ag.analyze_image(models, data_df, task["filename"])
+            results.append(result)
+        except Exception as e:
+            results.append({"error": f"Server error during analysis: {str(e)}"})
+    return results
+
+
+job_store = jobs.JobStore(JOBS_DB, dumps=app.json.dumps)
+job_runner = jobs.JobRunner(job_store, _run_job_tasks, workers=JOB_WORKERS)
+
+request_log = None
+if REQUEST_LOG:
+    request_log = RequestLog(REQUEST_LOG, max_bytes=int(REQUEST_LOG_MAX_MB * 1024 * 1024), backups=REQUEST_LOG_BACKUPS,
+                             compress=REQUEST_LOG_COMPRESS, dumps=app.json.dumps, loads=app.json.loads)
+
+
+def prepare_worker():
+    """Sizes the native thread pools and loads the Keras CNN if it was deferred (TensorFlow does not survive a fork)."""
+    global runtime
+    ag.configure_native_threads()
+    if PRELOAD and runtime["models"]["keras_cnn"] is None:
+        runtime = ag.attach_keras(runtime)
+
+
+# pid of the gunicorn master this worker was forked from (None when not preforked)
+master_pid = None
+
+
+def init_worker(master=None):
+    """
+    Per-process setup: prepare_worker() plus the background threads, which do
+    not survive a fork. Under gunicorn the artifact watcher runs in the master
+    (see gunicorn.conf.py), so artifact changes are reloaded once, there;
+    `master` is its pid, the only process /admin/reload signals.
+    """
+    global master_pid
+    master_pid = master
+    prepare_worker()
+    job_runner.ensure_started()
+    if request_log is not None:
+        request_log.ensure_started()
+    if not PRELOAD:
+        start_watcher()
+
+
+if not PRELOAD:
+    init_worker()
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+    sync_ingested_rows()
+
+@app.after_request
+def _log_request(response):
+    """Queues the analysis request and its response for the request log (never blocks)."""
+    if request_log is not None and request.endpoint in LOGGED_ENDPOINTS:
+        payload = request.get_json(silent=True) if request.method == "POST" else request.args.to_dict()
+        request_log.log({
+            "ts": round(time.time(), 3),
+            "pid": os.getpid(),
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "ms": round((time.perf_counter() - g.started) * 1000, 3),
+            "request": payload,
+            "body": response.get_data() if response.is_json else None,
+        })
+    return response
 
 @app.route('/')
 def root():
     # serve the HTML page
-    return send_from_directory('.', 'sih.html')
+    return assets.response('sih.html', request)
+
+def static_asset(filename, directory=None):
+    response = assets.response(f"{directory}/{filename}" if directory else filename, request)
+    if response is None:
+        abort(404)
+    return response
+
+# Routes only for the whitelisted asset paths, so other methods on the API endpoints still get 405
+for _name in ASSET_FILES:
+    app.add_url_rule(f"/{_name}", "static_asset", static_asset, defaults={"filename": _name})
+for _directory in ASSET_DIRS:
+    app.add_url_rule(f"/{_directory}/<path:filename>", "static_asset", static_asset, defaults={"directory": _directory})
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
+    rt = runtime
+    models, data_df, agri_ml_data_df = rt["models"], rt["data_df"], rt["agri_ml_data_df"]
     if data_df is None:
         return jsonify({"error": "Data not loaded on server. Check server logs."}), 500
 
@@ -46,6 +263,11 @@ def analyze():
     area = payload.get('area')
     soil = payload.get('soil')
     model_type = payload.get('model', 'sklearn')  # Allow user to specify which model to use
+    try:
+        risk = _flag(payload, 'risk')  # Add a Monte Carlo profit distribution
+        explain = _flag(payload, 'explain')  # Add per-feature contributions to the prediction
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     if not all([crop, district, area, soil]):
         return jsonify({"error": "Missing required fields: crop, district, area, soil"}), 400
@@ -54,15 +276,130 @@ def analyze():
         # Call analysis function with model selection
         # Pass agri_ml_data_df for agri_ml model, otherwise use default data_df
         analysis_data = agri_ml_data_df if (model_type == "agri_ml" and agri_ml_data_df is not None) else data_df
-        result = ag.analyze_feasibility(models, analysis_data, crop, district, area, soil, use_model=model_type)
-        result = to_py(result)
+        result = ag.analyze_feasibility(models, analysis_data, crop, district, area, soil, use_model=model_type, risk=risk,
+                                         explain=explain)
         return jsonify(result)
     except Exception as e:
         # Return a helpful message — check server logs for traceback
         return jsonify({"error": f"Server error during analysis: {str(e)}"}), 500
 
+@app.route('/recommend', methods=['POST'])
+def recommend():
+    """Rank every known crop for a district, soil and area in one batched prediction."""
+    rt = runtime
+    models, data_df = rt["models"], rt["data_df"]
+    if data_df is None:
+        return jsonify({"error": "Data not loaded on server. Check server logs."}), 500
+
+    payload = request.get_json(silent=True)
+    if not payload:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    district = payload.get('district')
+    area = payload.get('area')
+    soil = payload.get('soil')
+    rank_by = payload.get('rank_by', 'profit')
+
+    if not all([district, area, soil]):
+        return jsonify({"error": "Missing required fields: district, area, soil"}), 400
+    top_k = payload.get('top_k', 5)
+    if isinstance(top_k, bool) or not isinstance(top_k, int):
+        return jsonify({"error": "top_k must be an integer"}), 400
+
+    try:
+        result = ag.recommend_crops(models, data_df, district, area, soil, top_k=top_k, rank_by=rank_by)
+        if "error" in result:
+            return jsonify(result), 400
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": f"Server error during recommendation: {str(e)}"}), 500
+
+@app.route('/whatif', methods=['POST'])
+def whatif():
+    """Sweep one or two inputs over ranges and return the response surface."""
+    rt = runtime
+    models, data_df = rt["models"], rt["data_df"]
+    if data_df is None:
+        return jsonify({"error": "Data not loaded on server. Check server logs."}), 500
+
+    payload = request.get_json(silent=True)
+    if not payload:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    crop = payload.get('crop')
+    district = payload.get('district')
+    area = payload.get('area')
+    soil = payload.get('soil')
+    sweep = payload.get('sweep')
+
+    if not all([crop, district, area, soil, sweep]):
+        return jsonify({"error": "Missing required fields: crop, district, area, soil, sweep"}), 400
+
+    try:
+        result = ag.whatif_sweep(models, data_df, crop, district, area, soil, sweep)
+        if "error" in result:
+            return jsonify(result), 400
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": f"Server error during what-if analysis: {str(e)}"}), 500
+
+# Sort keys accepted by /rankings (default descending, except the district name)
+RANKING_SORT_KEYS = ("feasibility_score", "productivity_score", "profit_loss_percent", "district")
+RANKINGS_PAGE_MAX = 500
+
+@app.route('/rankings', methods=['GET'])
+def rankings():
+    """
+    agri_ml scores for every regional district, computed in one grouped pass.
+    Query: crop, state, sort, order (asc|desc), offset, limit.
+    """
+    rt = runtime
+    agri_ml_data_df = rt["agri_ml_data_df"]
+    if agri_ml_data_df is None:
+        return jsonify({"error": "Regional data not loaded on server."}), 500
+
+    crop = request.args.get('crop') or None
+    state = request.args.get('state')
+    sort_key = request.args.get('sort', 'profit_loss_percent')
+    if sort_key not in RANKING_SORT_KEYS:
+        return jsonify({"error": f"sort must be one of: {', '.join(RANKING_SORT_KEYS)}"}), 400
+    order = request.args.get('order', 'asc' if sort_key == 'district' else 'desc')
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(RANKINGS_PAGE_MAX, max(1, int(request.args.get('limit', 50))))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    try:
+        result = ag.rank_districts(rt["models"], agri_ml_data_df, crop)
+        if "error" in result:
+            return jsonify(result), 400
+        districts = result["districts"]
+        if state:
+            districts = [d for d in districts if state.lower() in (s.lower() for s in d.get("states", []))]
+        districts = sorted(districts, key=lambda d: d[sort_key], reverse=(order == "desc"))
+        return jsonify({
+            "crop": result["crop"],
+            "state": state,
+            "version": rt["version"],
+            "sort": sort_key,
+            "order": order,
+            "total": len(districts),
+            "offset": offset,
+            "limit": limit,
+            "districts": districts[offset:offset + limit],
+            "resolved_inputs": result["resolved_inputs"],
+            "model_used": result["model_used"],
+        })
+    except Exception as e:
+        return jsonify({"error": f"Server error during ranking: {str(e)}"}), 500
+
 @app.route('/analyze_image', methods=['POST'])
 def analyze_image():
+    rt = runtime
+    models, data_df = rt["models"], rt["data_df"]
     if data_df is None:
         return jsonify({"error": "Dataset not loaded on server."}), 500
     
@@ -78,9 +415,63 @@ def analyze_image():
     except Exception as e:
         return jsonify({"error": f"Server error during image analysis: {str(e)}"}), 500
 
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a bulk analysis: {"kind": "feasibility" | "image", "tasks": [...]}.
+    Feasibility tasks take the /analyze fields, image tasks {"filename"}.
+    """
+    payload = request.get_json(silent=True)
+    if not payload:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    kind = payload.get("kind")
+    tasks = payload.get("tasks")
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"kind must be one of: {', '.join(JOB_KINDS)}"}), 400
+    if not isinstance(tasks, list) or not tasks or not all(isinstance(t, dict) for t in tasks):
+        return jsonify({"error": "tasks must be a non-empty list of objects"}), 400
+    if len(tasks) > jobs.JOB_MAX_TASKS:
+        return jsonify({"error": f"At most {jobs.JOB_MAX_TASKS} tasks per job"}), 400
+
+    job_runner.ensure_started()
+    job_id = job_store.submit(kind, tasks)
+    job_runner.notify()
+    return jsonify({"job_id": job_id, "status": "queued", "total": len(tasks), "url": f"/jobs/{job_id}"}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status and progress, plus one page of results (?offset=0&limit=100)."""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = min(jobs.RESULTS_PAGE_MAX, max(1, int(request.args.get("limit", 100))))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    results = job_store.results(job_id, offset, limit)
+    next_offset = offset + len(results)
+    return jsonify({
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "total": job["total"],
+        "completed": job["completed"],
+        "progress": round(job["completed"] / job["total"], 4) if job["total"] else 1.0,
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "results": results,
+        "next_offset": next_offset if next_offset < job["completed"] else None,
+    })
+
 @app.route('/models', methods=['GET'])
 def get_available_models():
     """Return information about available models."""
+    rt = runtime
+    models = rt["models"]
     available_models = {
         "sklearn": models["sklearn"]["preprocessor"] is not None,
         "agri_ml": models["agri_ml"] is not None,
@@ -88,15 +479,98 @@ def get_available_models():
     }
     return jsonify({
         "available_models": available_models,
+        "version": rt["version"],
+        "loaded_at": rt["loaded_at"],
+        "data_revision": rt["data_revision"],
+        "data_rows": len(rt["data_df"]) if rt["data_df"] is not None else 0,
+        "data_backend": "sqlite" if isinstance(rt["data_df"], ag.MainDataStore) else "pandas",
+        "reload": dict(_reload_status),
+        "image_cache": models["image_cache"].stats() if models["image_cache"] is not None else None,
+        "image_breaker": models["image_breaker"].stats() if models["image_breaker"] is not None else None,
+        "request_log": request_log.stats() if request_log is not None else None,
+        "regional_shards": rt["agri_ml_data_df"].stats() if rt["agri_ml_data_df"] is not None else None,
+        "memory": {**rt["memory"], "rss_mb": round(ag.rss_bytes() / (1024 * 1024), 2),
+                   "process": {"pid": os.getpid(), **(sharing() or {})}},
         "message": "Available models loaded"
     })
 
+def _admin_error():
+    """Error response when the request may not use the admin endpoints, else None."""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled (set AGRONITY_ADMIN_TOKEN)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Invalid admin token"}), 401
+    return None
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Reload models and datasets in the background and swap them in once validated.
+    Under gunicorn the master reloads and replaces every worker (see gunicorn.conf.py).
+    """
+    error = _admin_error()
+    if error:
+        return error
+    if _reload_status["in_progress"]:
+        return jsonify({"status": "already_running", "version": runtime["version"]}), 409
+    if PRELOAD:
+        # Only the gunicorn master we were forked from, and only while it is still our parent
+        if master_pid is None or os.getppid() != master_pid:
+            return jsonify({"error": "No gunicorn master to reload (AGRONITY_PRELOAD is set outside gunicorn)"}), 503
+        # The master replaces this worker once it has reloaded, so the flag is never cleared here
+        _reload_status.update(in_progress=True, last_attempt=time.time())
+        os.kill(master_pid, signal.SIGHUP)
+        return jsonify({"status": "started", "scope": "all workers", "version": runtime["version"]}), 202
+
+    threading.Thread(target=reload_runtime, name="artifact-reload", daemon=True).start()
+    return jsonify({"status": "started", "version": runtime["version"]}), 202
+
+
+@app.route('/admin/ingest', methods=['POST'])
+def admin_ingest():
+    """
+    Append new dataset rows without a reload: JSON {"rows": [...]} or a CSV body
+    with the dataset's columns. Rows are validated, persisted to the ingest store
+    and merged into a new snapshot with incrementally updated indexes. Other
+    processes serving the same store pick them up before their next request.
+    """
+    global runtime
+    error = _admin_error()
+    if error:
+        return error
+
+    if request.mimetype == "text/csv":
+        try:
+            rows = pd.read_csv(io.StringIO(request.get_data(as_text=True)))
+        except Exception as e:
+            return jsonify({"error": f"Could not parse CSV: {e}"}), 400
+    else:
+        payload = request.get_json(silent=True)
+        if not payload or not isinstance(payload.get("rows"), list):
+            return jsonify({"error": "Expected JSON {\"rows\": [...]} or a text/csv body"}), 400
+        rows = payload["rows"]
+
+    # Serialized with reloads, so an ingest cannot be lost to a concurrent swap
+    if not _reload_lock.acquire(timeout=30):
+        return jsonify({"error": "A reload is in progress, retry shortly"}), 409
+    try:
+        rt = runtime
+        if rt["data_df"] is None:
+            return jsonify({"error": "Dataset not loaded on server."}), 500
+        data_df, summary = ag.ingest_rows(rt["data_df"], rows)
+        if data_df is None:
+            return jsonify({"error": "Validation failed", **summary}), 400
+        runtime = {**rt, "data_df": data_df, "data_revision": ag.ingest_state(data_df)["rows"]}  # atomic reference swap
+    finally:
+        _reload_lock.release()
+    return jsonify({"status": "ingested", "data_revision": runtime["data_revision"], **summary})
+
 
 if __name__ == '__main__':
     print("Starting AgroNity backend on http://127.0.0.1:5000")
-    print("Available models information:")
-    print(f"  - Sklearn models: {models['sklearn']['preprocessor'] is not None}")
-    print(f"  - Agri ML model: {models['agri_ml'] is not None}")
-    print(f"  - Keras CNN model: {models['keras_cnn'] is not None}")
+    print(f"Available models information (version {runtime['version']}):")
+    print(f"  - Sklearn models: {runtime['models']['sklearn']['preprocessor'] is not None}")
+    print(f"  - Agri ML model: {runtime['models']['agri_ml'] is not None}")
+    print(f"  - Keras CNN model: {runtime['models']['keras_cnn'] is not None}")
     app.run()
 
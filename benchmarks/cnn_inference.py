@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+CNN inference latency: keras predict() vs the compiled CompiledCNN path.
+
+Times single-image and batched scoring both ways on the image model. If the
+trained weights are not present, the architecture from config.json is used
+with its initial weights (latency does not depend on the weight values).
+
+Usage:
+    python benchmarks/cnn_inference.py
+    python benchmarks/cnn_inference.py --batch-size 64 --repeats 50 --xla
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import agronity_test as ag  # noqa: E402
+
+
+def _load_keras_model():
+    keras_path = os.path.join(ag.MODELS_DIR, "modelskeras_model")
+    with open(os.path.join(keras_path, "config.json")) as f:
+        config = json.load(f)
+    ag.configure_tf_threads()
+    model = ag.keras.Sequential.from_config(config["config"])
+    weights = os.path.join(keras_path, "model.weights.h5")
+    if os.path.exists(weights):
+        model.load_weights(weights)
+    else:
+        print("⚠ model.weights.h5 not found, timing the untrained architecture")
+    return model
+
+
+def _time_ms(fn, batch, repeats):
+    fn(batch)  # exclude one-off setup from the timings
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(batch)
+        samples.append((time.perf_counter() - started) * 1000)
+    return float(np.median(samples)), float(np.percentile(samples, 90))
+
+
+def run(batch_size=32, repeats=30, xla=False):
+    """Returns {case: {"p50_ms", "p90_ms", "per_image_ms"}}."""
+    if not ag.import_frameworks():
+        raise SystemExit("TensorFlow/Keras are not installed")
+    model = _load_keras_model()
+
+    started = time.perf_counter()
+    compiled = ag.CompiledCNN(model, jit_compile=xla)
+    print(f"✓ Compiled and warmed up in {(time.perf_counter() - started) * 1000:.0f} ms (xla={xla})")
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for n in (1, batch_size):
+        batch = rng.random((n, *ag.IMAGE_SIZE, 3), dtype=np.float32)
+        for name, fn in (("predict", lambda b: model.predict(b, verbose=0)), ("compiled", compiled)):
+            p50, p90 = _time_ms(fn, batch, repeats)
+            results[f"{name}_batch{n}"] = {"p50_ms": round(p50, 3), "p90_ms": round(p90, 3),
+                                           "per_image_ms": round(p50 / n, 3)}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CNN inference paths.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--xla", action="store_true", help="compile the graph with XLA")
+    args = parser.parse_args(argv)
+
+    results = run(args.batch_size, args.repeats, args.xla)
+    print(f"\n{'case':<22}{'p50 ms':>10}{'p90 ms':>10}{'ms/image':>10}")
+    for case, r in results.items():
+        print(f"{case:<22}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['per_image_ms']:>10.2f}")
+    for n in (1, args.batch_size):
+        speedup = results[f"predict_batch{n}"]["p50_ms"] / results[f"compiled_batch{n}"]["p50_ms"]
+        print(f"batch {n}: compiled is {speedup:.1f}x faster than predict()")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks of the analysis library, compared against a stored baseline.
+
+Cases cover the loaders (cold: first call in a fresh process; warm: repeated
+calls in one process), analyze_feasibility with both models over sampled real
+district/soil/crop combinations, the tree attributions of both sklearn models
+on preprocessed rows, both image analysis paths over images/, and
+the JSON response for typical results (the app's provider, and Flask's stdlib
+encoder for reference). Each case records its timing distribution and its
+peak memory: the traced Python/numpy peak of one extra pass for warm cases,
+the peak RSS growth for cold ones.
+
+A case regresses when its median time (or --statistic, e.g. min_ms on a
+noisy shared host) or its peak memory exceeds the baseline
+(benchmarks/baseline.json) by more than the threshold. Timings only
+compare on the same machine and model files, so the environment is stored
+with the baseline and a mismatch turns regressions into warnings.
+
+Usage:
+    python benchmarks/library.py
+    python benchmarks/library.py --only feasibility_sklearn,json_response --threshold 0.1
+    python benchmarks/library.py --update-baseline
+"""
+import argparse
+import contextlib
+import functools
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import agronity_test as ag  # noqa: E402
+from memory_budget import rss_bytes  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+FEASIBILITY_SAMPLES = 40
+SAMPLE_SEED = 0
+# Differences below these are noise, whatever the ratio
+MIN_TIME_DELTA_MS = 0.05
+MIN_MEMORY_DELTA_KB = 64
+MEMORY_KEYS = ("peak_kb", "peak_rss_kb")
+MODEL_FILES = [
+    os.path.join(ROOT, "preprocessor.joblib"),
+    os.path.join(ROOT, "feasibility_clf.joblib"),
+    os.path.join(ROOT, "yield_reg.joblib"),
+    os.path.join(ag.MODELS_DIR, "modelskeras_model", "model.weights.h5"),
+]
+
+
+def _quiet(fn, *args, **kwargs):
+    """Calls fn with its progress prints suppressed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _distribution(samples_ms):
+    a = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(len(a)),
+        "min_ms": round(float(a.min()), 4),
+        "p50_ms": round(float(np.median(a)), 4),
+        "p90_ms": round(float(np.percentile(a, 90)), 4),
+        "p99_ms": round(float(np.percentile(a, 99)), 4),
+        "max_ms": round(float(a.max()), 4),
+        "mean_ms": round(float(a.mean()), 4),
+    }
+
+
+def _traced_peak_kb(call):
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _measure(calls, repeats):
+    """Times every call `repeats` times after one warm-up pass, then traces one more pass."""
+    for call in calls:
+        call()
+    samples = []
+    for _ in range(repeats):
+        for call in calls:
+            started = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - started) * 1000)
+    result = _distribution(samples)
+    result["peak_kb"] = round(max(_traced_peak_kb(call) for call in calls), 1)
+    return result
+
+
+def _cold(function_name, runs):
+    """Times the first call of an agronity_test loader, each run in a fresh interpreter."""
+    samples, peaks = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--cold-child", function_name],
+                             capture_output=True, text=True, check=True)
+        record = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(record["ms"])
+        peaks.append(record["peak_rss_kb"])
+    result = _distribution(samples)
+    result["peak_rss_kb"] = round(max(peaks), 1)
+    return result
+
+
+def _cold_child(function_name):
+    import resource
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    _quiet(getattr(ag, function_name))
+    elapsed = (time.perf_counter() - started) * 1000
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    print(json.dumps({"ms": elapsed, "peak_rss_kb": max(0, peak - rss_before) / 1024}))
+
+
+@functools.cache
+def _app():
+    """The app module with its serving snapshot; its job workers are disabled."""
+    os.environ.setdefault("AGRONITY_JOB_WORKERS", "0")
+    os.environ.setdefault("AGRONITY_JOBS_DB", os.path.join(tempfile.gettempdir(), "agronity-bench-jobs.sqlite3"))
+    os.environ["AGRONITY_WATCH_INTERVAL"] = "0"
+    return _quiet(importlib.import_module, "app")
+
+
+def _runtime():
+    return _app().runtime
+
+
+def _sklearn_loaded(models):
+    return all(v is not None for v in models["sklearn"].values())
+
+
+def _feasibility_combos(n=FEASIBILITY_SAMPLES):
+    """Real (crop, district, soil) combinations sampled from the main dataset."""
+    data_df = _runtime()["data_df"]
+    if not isinstance(data_df, pd.DataFrame):  # the data store backend: sample from the CSVs
+        data_df = _quiet(ag.load_data)
+    combos = data_df[["crop", "District", "Soil_Type"]].astype(str).drop_duplicates()
+    return list(combos.sample(n=min(n, len(combos)), random_state=SAMPLE_SEED).itertuples(index=False))
+
+
+def _regional_combos(n=FEASIBILITY_SAMPLES):
+    """Real (crop, district) combinations sampled from the regional datasets."""
+    regional = _quiet(ag.load_agri_ml_regional_data)
+    combos = regional[["Major_Crops", "District"]].astype(str).drop_duplicates()
+    return list(combos.sample(n=min(n, len(combos)), random_state=SAMPLE_SEED).itertuples(index=False))
+
+
+def _agri_ml_models(models):
+    """
+    Models for the agri_ml path. The path reads only the model's numeric
+    columns (its scores come from the regional data), so when the forest is
+    not loaded they are taken from its columns.json.
+    """
+    if models["agri_ml"] is not None:
+        return models
+    _, numeric_cols = ag._regional_data_columns()
+    if numeric_cols is None:
+        return None
+    return {**models, "agri_ml": {"model": None, "encoders": None, "numeric_cols": numeric_cols}}
+
+
+def _image_paths():
+    base = os.path.join(ROOT, "images")
+    return [os.path.join(base, name) for name in sorted(os.listdir(base))
+            if os.path.splitext(name)[1].lower() in ag.IMAGE_EXTENSIONS]
+
+
+def case_feasibility_sklearn(args):
+    rt = _runtime()
+    if not _sklearn_loaded(rt["models"]):
+        return {"skipped": "sklearn models not loaded"}
+    calls = [functools.partial(ag.analyze_feasibility, rt["models"], rt["data_df"], crop, district, 3, soil)
+             for crop, district, soil in _feasibility_combos()]
+    return _measure(calls, args.repeats)
+
+
+def case_feasibility_agri_ml(args):
+    rt = _runtime()
+    models = _agri_ml_models(rt["models"])
+    if models is None or rt["agri_ml_data_df"] is None:
+        return {"skipped": "regional data or agri_ml columns not available"}
+    calls = [functools.partial(ag.analyze_feasibility, models, rt["agri_ml_data_df"], crop, district, 3, "",
+                               use_model="agri_ml")
+             for crop, district in _regional_combos()]
+    return _measure(calls, args.repeats)
+
+
+def case_explain_sklearn(args):
+    rt = _runtime()
+    models, data_df = rt["models"], rt["data_df"]
+    if not _sklearn_loaded(models):
+        return {"skipped": "sklearn models not loaded"}
+    from tree_explain import TreeExplainer
+    sk = models["sklearn"]
+    explainers = [TreeExplainer(sk["clf"], cache_entries=0), TreeExplainer(sk["reg"], cache_entries=0)]
+    rows = []
+    for crop, district, soil in _feasibility_combos():
+        matched_row, _ = ag._matched_profile(data_df, district, soil)
+        if matched_row is not None:
+            rows.append(sk["preprocessor"].transform(pd.DataFrame([ag._sklearn_input_row(matched_row, crop, 3)])))
+    # One preprocessed row through both models, every call uncached
+    return _measure([functools.partial(explainer.explain, row) for row in rows for explainer in explainers], args.repeats)
+
+
+def case_image_keras(args):
+    rt = _runtime()
+    if rt["models"]["keras_cnn"] is None:
+        return {"skipped": "Keras CNN not loaded"}
+    models = {**rt["models"], "image_cache": None}  # every call runs the model
+    # An absolute path makes os.path.join() ignore the uploads directory
+    calls = [functools.partial(ag._analyze_image_keras, models, path) for path in _image_paths()]
+    return _measure(calls, args.repeats)
+
+
+def case_image_ruleset(args):
+    data_df = _runtime()["data_df"]
+    calls = [functools.partial(ag._analyze_image_ruleset, data_df, os.path.basename(path)) for path in _image_paths()]
+    return _measure(calls, args.repeats)
+
+
+@functools.cache
+def _typical_results():
+    """Feasibility (with risk), recommendation, what-if and image results, as returned to the app."""
+    rt = _runtime()
+    models, data_df = rt["models"], rt["data_df"]
+    results = []
+    for crop, district, soil in _feasibility_combos(5):
+        results.append(ag.analyze_feasibility(models, data_df, crop, district, 3, soil, risk=True))
+        results.append(ag.recommend_crops(models, data_df, district, 3, soil))
+        results.append(ag.whatif_sweep(models, data_df, crop, district, 3, soil,
+                                       {"fertilizer": {"start": 50, "stop": 250, "steps": 10},
+                                        "rainfall": {"start": 500, "stop": 1500, "steps": 10}}))
+    results += [ag._analyze_image_ruleset(data_df, os.path.basename(path)) for path in _image_paths()]
+    return results
+
+
+def _json_response_case(provider, args):
+    if not _sklearn_loaded(_runtime()["models"]):
+        return {"skipped": "sklearn models not loaded"}
+    return _measure([functools.partial(provider.response, result) for result in _typical_results()], args.repeats)
+
+
+def case_json_response(args):
+    return _json_response_case(_app().app.json, args)
+
+
+def case_json_response_stdlib(args):
+    from flask.json.provider import DefaultJSONProvider
+    import json_provider
+    provider = DefaultJSONProvider(_app().app)
+    provider.default = json_provider._default  # numpy values, as the app's provider without orjson
+    return _json_response_case(provider, args)
+
+
+CASES = {
+    "load_data_cold": lambda args: _cold("load_data", args.cold_runs),
+    "load_data_warm": lambda args: _measure([functools.partial(_quiet, ag.load_data)], args.load_repeats),
+    "load_agri_ml_regional_data_cold": lambda args: _cold("load_agri_ml_regional_data", args.cold_runs),
+    "load_agri_ml_regional_data_warm": lambda args: _measure(
+        [functools.partial(_quiet, ag.load_agri_ml_regional_data)], args.load_repeats),
+    "load_models_cold": lambda args: _cold("load_models", args.cold_runs),
+    "load_models_warm": lambda args: _measure([functools.partial(_quiet, ag.load_models)], args.load_repeats),
+    "feasibility_sklearn": case_feasibility_sklearn,
+    "feasibility_agri_ml": case_feasibility_agri_ml,
+    "explain_sklearn": case_explain_sklearn,
+    "image_keras": case_image_keras,
+    "image_ruleset": case_image_ruleset,
+    "json_response": case_json_response,
+    "json_response_stdlib": case_json_response_stdlib,
+}
+
+
+def _package_version(name):
+    """Installed version of a package, without importing it."""
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def environment():
+    """What the timings depend on; baselines only compare within one environment."""
+    import platform
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "tensorflow": _package_version("tensorflow") if ag.TF_AVAILABLE else None,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "data_backend": ag.DATA_BACKEND,
+        "model_files": {os.path.basename(p): os.path.getsize(p) if os.path.exists(p) else None for p in MODEL_FILES},
+    }
+
+
+def compare(results, baseline, threshold, memory_threshold, statistic="p50_ms"):
+    """Returns (rows for the report, list of regression messages)."""
+    rows, regressions = [], []
+    for name, current in results.items():
+        base = baseline.get("cases", {}).get(name) if baseline else None
+        if "skipped" in current:
+            rows.append((name, None, None, f"skipped: {current['skipped']}"))
+            continue
+        if base is None or "skipped" in base:
+            rows.append((name, current[statistic], None, "new"))
+            continue
+        status = "ok"
+        checks = [(statistic, threshold, MIN_TIME_DELTA_MS)]
+        checks += [(key, memory_threshold, MIN_MEMORY_DELTA_KB) for key in MEMORY_KEYS if key in current and key in base]
+        for key, limit, min_delta in checks:
+            if current[key] > base[key] * (1 + limit) and current[key] - base[key] > min_delta:
+                change = (current[key] / base[key] - 1) * 100 if base[key] else float("inf")
+                regressions.append(f"{name}: {key} {base[key]} → {current[key]} (+{change:.0f}%, limit +{limit * 100:.0f}%)")
+                status = "REGRESSION"
+        rows.append((name, current[statistic], base[statistic], status))
+    return rows, regressions
+
+
+def run(names, args):
+    results = {}
+    for name in names:
+        print(f"… {name}", flush=True)
+        results[name] = CASES[name](args)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis library against a stored baseline.")
+    parser.add_argument("--only", help=f"comma-separated cases (default: all of {', '.join(CASES)})")
+    parser.add_argument("--repeats", type=int, default=5, help="passes over the inputs of each analysis case")
+    parser.add_argument("--load-repeats", type=int, default=5, help="calls per warm loader case")
+    parser.add_argument("--cold-runs", type=int, default=3, help="fresh processes per cold loader case")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed median time increase as a fraction (default 0.25 = +25%%)")
+    parser.add_argument("--statistic", default="p50_ms",
+                        choices=["min_ms", "p50_ms", "p90_ms", "p99_ms", "mean_ms"],
+                        help="timing statistic compared with the baseline")
+    parser.add_argument("--memory-threshold", type=float, default=None,
+                        help="allowed peak memory increase (default: same as --threshold)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", help="also write this run's results as JSON")
+    parser.add_argument("--cold-child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.cold_child:
+        _cold_child(args.cold_child)
+        return 0
+
+    names = list(CASES) if not args.only else [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    run_record = {"recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(),
+                  "cases": run(names, args)}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run_record, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        # Cases not run this time keep their previous baseline
+        baseline = {**run_record, "cases": {**baseline.get("cases", {}), **run_record["cases"]}}
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✓ Baseline written to {args.baseline}")
+        return 0
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    memory_threshold = args.threshold if args.memory_threshold is None else args.memory_threshold
+    rows, regressions = compare(run_record["cases"], baseline, args.threshold, memory_threshold, args.statistic)
+
+    print(f"\n{'case':<34}{args.statistic.replace('_', ' '):>12}{'baseline':>12}{'change':>9}  status")
+    for name, value, base, status in rows:
+        change = f"{(value / base - 1) * 100:+.0f}%" if value is not None and base else ""
+        value_text = f"{value:.3f}" if value is not None else "-"
+        base_text = f"{base:.3f}" if base is not None else "-"
+        print(f"{name:<34}{value_text:>12}{base_text:>12}{change:>9}  {status}")
+
+    if baseline is None:
+        print(f"⚠ No baseline at {args.baseline}; record one with --update-baseline")
+        return 0
+    if baseline.get("environment") != run_record["environment"]:
+        print("⚠ Baseline was recorded in a different environment; regressions are reported, not enforced")
+        for message in regressions:
+            print(f"⚠ {message}")
+        return 0
+    for message in regressions:
+        print(f"✗ {message}")
+    if not regressions:
+        print(f"✓ No regressions beyond +{args.threshold * 100:.0f}% time / +{memory_threshold * 100:.0f}% memory")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
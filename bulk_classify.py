@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Bulk crop photo classification for a directory of field images.
+
+Walks a directory (e.g. images/), decodes and resizes photos in a thread pool
+and feeds the CNN in large batches, so decoding the next batch overlaps with
+inference on the current one. Each file gets one line in a JSONL report, in
+sorted path order; unreadable and unsupported files are reported in their
+place and never stall the pipeline. Without the Keras model, files are
+classified with the filename ruleset instead (the photo is still decoded to
+check it is readable).
+
+Usage:
+    python bulk_classify.py images/ -o report.jsonl
+    python bulk_classify.py photos/ -o report.jsonl --batch-size 64 --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import agronity_test as ag
+
+
+def find_images(root):
+    """All files under `root`, sorted; returns (images, skipped) by extension."""
+    images, skipped = [], []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.splitext(name)[1].lower() in ag.IMAGE_EXTENSIONS:
+                images.append(path)
+            else:
+                skipped.append(path)
+    return sorted(images), sorted(skipped)
+
+
+def _json_default(value):
+    """numpy scalars (e.g. dataset averages in ruleset results) → Python values."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _decode(path):
+    """Decode stage: (path, array, None), or (path, None, record) for a file that is not classified."""
+    if os.path.splitext(path)[1].lower() not in ag.IMAGE_EXTENSIONS:
+        return path, None, {"file": path, "status": "skipped", "error": "unsupported file extension"}
+    try:
+        return path, ag.load_image_array(path, draft=True), None
+    except Exception as e:
+        return path, None, {"file": path, "status": "unreadable", "error": f"{type(e).__name__}: {e}"}
+
+
+class _Classifier:
+    """Inference stage: batches decoded images through the CNN (or the ruleset)."""
+
+    def __init__(self, models, data_df, batch_size):
+        self.models = models
+        self.data_df = data_df
+        self.batch_size = batch_size
+        self.use_cnn = models["keras_cnn"] is not None
+        self.entries = []  # (path, decoded image, None) or (path, None, finished record), in input order
+        self.batch = []
+
+    def add(self, path, img_array=None, record=None):
+        """
+        Queues one decoded image, or the finished record of a file that is not
+        classified (kept in its place behind the queued images). Returns the
+        records ready to write, in input order.
+        """
+        self.entries.append((path, img_array, record))
+        if record is None:
+            self.batch.append((path, img_array))
+        if not self.batch or len(self.batch) >= self.batch_size:
+            return self.flush()
+        return []
+
+    def flush(self):
+        entries, batch, self.entries, self.batch = self.entries, self.batch, [], []
+        if not batch:
+            return [record for _, _, record in entries]
+        if self.use_cnn:
+            try:
+                results = ag.classify_image_arrays(self.models, [a for _, a in batch])
+            except Exception as e:
+                print(f"⚠ Keras CNN batch failed: {e}. Using rule-based detection instead.", file=sys.stderr)
+                self.use_cnn = False
+        if not self.use_cnn:
+            results = []
+            for path, _ in batch:
+                result = ag._analyze_image_ruleset(self.data_df, os.path.basename(path))
+                if result["status"] == "success":
+                    result["fallback"] = True
+                results.append(result)
+        results = iter(results)
+        return [record if record is not None else {"file": path, **next(results)} for path, _, record in entries]
+
+
+def run(root, output_path, batch_size=32, workers=None):
+    """Classifies every image under `root` into a JSONL report. Returns status counts."""
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    models = ag.load_models()
+    data_df = ag.load_data()
+    images, skipped = find_images(root)
+    files = sorted(images + skipped)
+    classifier = _Classifier(models, data_df, batch_size)
+    counts = {"classified": 0, "unreadable": 0, "skipped": len(skipped)}
+    started = time.perf_counter()
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        def write(records):
+            if not records:
+                return
+            for record in records:
+                out.write(json.dumps(record, default=_json_default) + "\n")
+                if record["status"] == "unreadable":
+                    counts["unreadable"] += 1
+                elif record["status"] != "skipped":
+                    counts["classified"] += 1
+            done = counts["classified"] + counts["unreadable"]
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            sys.stderr.write(f"\r  {done:,}/{len(images):,} images in {elapsed:.1f}s ({done / elapsed:,.1f} img/s)")
+            sys.stderr.flush()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Keep up to two batches decoding ahead of the one being classified
+            pending = deque()
+            paths = iter(files)
+            for path in paths:
+                pending.append(pool.submit(_decode, path))
+                if len(pending) >= 2 * batch_size:
+                    break
+            while pending:
+                path, img_array, record = pending.popleft().result()
+                next_path = next(paths, None)
+                if next_path is not None:
+                    pending.append(pool.submit(_decode, next_path))
+                write(classifier.add(path, img_array, record))
+            write(classifier.flush())
+    sys.stderr.write("\n")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify every crop photo in a directory.")
+    parser.add_argument("directory", help="directory of images (searched recursively)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL report path")
+    parser.add_argument("--batch-size", type=int, default=32, help="images per CNN batch (default: 32)")
+    parser.add_argument("--workers", type=int, default=None, help="decode threads (default: CPU count + 4)")
+    args = parser.parse_args(argv)
+
+    counts = run(args.directory, args.output, args.batch_size, args.workers)
+    print(f"✓ {counts['classified']} classified, {counts['unreadable']} unreadable, "
+          f"{counts['skipped']} skipped → {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Bulk feasibility scoring for large farmer CSVs.
+
+Reads (crop, district, area, soil) rows in chunks, scores the chunks in a
+pool of worker processes (each loads the sklearn models and dataset once) and
+streams the results to CSV or JSONL in input order. Memory stays bounded by
+chunk size x in-flight chunks, whatever the input size.
+
+Usage:
+    python bulk_score.py farmers.csv -o scored.csv
+    python bulk_score.py farmers.csv -o scored.jsonl --workers 4 --chunksize 5000
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import agronity_test as ag
+
+# Per-process state, filled once by _init_worker
+_worker = {}
+
+
+def _init_worker():
+    """Loads the sklearn models and the dataset once per worker process (scoring never uses the Keras CNN)."""
+    _worker["models"] = ag.load_models(keras=False)
+    _worker["data_df"] = ag.load_data()
+
+
+def _score_chunk(chunk):
+    """Scores one input chunk and returns it with the result columns appended."""
+    if not _worker:
+        _init_worker()
+    result = ag.score_feasibility_batch(_worker["models"], _worker["data_df"], chunk)
+    return pd.concat([chunk, result], axis=1)
+
+
+class _ResultWriter:
+    """Appends scored chunks to a CSV or JSONL file."""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.first = True
+        self.handle = open(path, "w", encoding="utf-8", newline="")
+
+    def write(self, frame):
+        if self.fmt == "jsonl":
+            self.handle.write(frame.to_json(orient="records", lines=True))
+            if len(frame):
+                self.handle.write("\n")
+        else:
+            frame.to_csv(self.handle, header=self.first, index=False)
+        self.first = False
+
+    def close(self):
+        self.handle.close()
+
+
+def _progress(rows, started):
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    sys.stderr.write(f"\r  {rows:,} rows scored in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    sys.stderr.flush()
+
+
+def run(input_path, output_path, fmt=None, chunksize=5000, workers=None):
+    """Scores `input_path` into `output_path`. Returns the number of rows written."""
+    fmt = fmt or ("jsonl" if output_path.endswith((".jsonl", ".json")) else "csv")
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    reader = pd.read_csv(input_path, chunksize=chunksize, dtype=str, keep_default_na=False)
+    writer = _ResultWriter(output_path, fmt)
+    started = time.perf_counter()
+    rows = 0
+
+    try:
+        if workers <= 0:
+            # In-process scoring (no pool), handy for debugging
+            for chunk in reader:
+                _check_columns(chunk)
+                writer.write(_score_chunk(chunk))
+                rows += len(chunk)
+                _progress(rows, started)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # Bounded window of in-flight chunks, drained in submission order
+                pending = deque()
+                for chunk in reader:
+                    _check_columns(chunk)
+                    pending.append(pool.submit(_score_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        rows += len(scored)
+                        _progress(rows, started)
+                while pending:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    rows += len(scored)
+                    _progress(rows, started)
+    finally:
+        writer.close()
+        sys.stderr.write("\n")
+    return rows
+
+
+def _check_columns(chunk):
+    missing = [c for c in ag.BATCH_INPUT_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise SystemExit(f"Input is missing required columns: {', '.join(missing)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of (crop, district, area, soil) rows.")
+    parser.add_argument("input", help="input CSV with crop, district, area (acres) and soil columns")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv or .jsonl)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="output format (default: from extension)")
+    parser.add_argument("--chunksize", type=int, default=5000, help="rows per chunk (default: 5000)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count, 0 = score in this process)")
+    args = parser.parse_args(argv)
+
+    print(f"Scoring {args.input} → {args.output}", file=sys.stderr)
+    rows = run(args.input, args.output, args.format, args.chunksize, args.workers)
+    print(f"✓ Wrote {rows:,} rows to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Circuit breaker for an optional, failure-prone code path (the Keras image model).
+
+While CLOSED every call goes through and its outcome is kept in a rolling
+window; once at least `min_calls` outcomes are recorded and the share of
+failures reaches `failure_rate`, the breaker OPENS and callers skip straight to
+their fallback. After `open_seconds` it turns HALF_OPEN and lets up to
+`probe_calls` requests through as probes: if they all succeed it closes again,
+and any probe failure re-opens it for another cooldown.
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+WINDOW_SIZE = 20          # most recent outcomes considered while closed
+MIN_CALLS = 5             # outcomes needed before the failure rate is trusted
+FAILURE_RATE = 0.5
+OPEN_SECONDS = 30.0       # cooldown before probing again
+PROBE_CALLS = 2           # successful probes needed to close
+
+
+class CircuitBreaker:
+    """
+    Thread-safe breaker. Callers ask `allow()` before the guarded call and then
+    report `success()`, `failure()`, or `release()` for outcomes that say
+    nothing about the guarded path's health (e.g. a bad input).
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE, min_calls=MIN_CALLS, failure_rate=FAILURE_RATE,
+                 open_seconds=OPEN_SECONDS, probe_calls=PROBE_CALLS, clock=time.monotonic):
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.probe_calls = probe_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)  # True = failure
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.transitions = {"opened": 0, "half_opened": 0, "closed": 0}
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def _transition(self, state):
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self.transitions["opened"] += 1
+        elif state == HALF_OPEN:
+            self.transitions["half_opened"] += 1
+        else:
+            self._outcomes.clear()
+            self.transitions["closed"] += 1
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def _refresh(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def allow(self):
+        """True if the guarded call may run now (a probe slot is taken when half-open)."""
+        with self._lock:
+            self._refresh()
+            if self._state == CLOSED:
+                self.calls += 1
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight + self._probe_successes < self.probe_calls:
+                self._probes_in_flight += 1
+                self.calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._probe_successes += 1
+                if self._probe_successes >= self.probe_calls:
+                    self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._outcomes.append(False)
+
+    def failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            if error is not None:
+                self.last_error = f"{type(error).__name__}: {error}"
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self._state == CLOSED:
+                self._outcomes.append(True)
+                failed = sum(self._outcomes)
+                if len(self._outcomes) >= self.min_calls and failed / len(self._outcomes) >= self.failure_rate:
+                    self._transition(OPEN)
+
+    def release(self):
+        """Ends an allowed call without counting it either way."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            window = len(self._outcomes)
+            return {
+                "state": self._state,
+                "transitions": dict(self.transitions),
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "window_failure_rate": round(sum(self._outcomes) / window, 4) if window else 0.0,
+                "failure_rate_threshold": self.failure_rate,
+                "open_seconds": self.open_seconds,
+                "retry_in_seconds": (round(max(0.0, self.open_seconds - (self._clock() - self._opened_at)), 2)
+                                     if self._state == OPEN else None),
+                "last_error": self.last_error,
+            }
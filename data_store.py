@@ -0,0 +1,127 @@
+"""
+Embedded SQLite database for the agricultural datasets.
+
+The database is built once from the CSVs into a single file and then only
+read. Every worker opens it read-only and immutable, so there is no locking
+and the pages live in the OS page cache (memory-mapped), shared by all
+processes instead of copied into each one's heap.
+
+Queries use fixed SQL text with `?` parameters; sqlite3 keeps the prepared
+statement of each distinct SQL string per connection, so a lookup is prepared
+once per thread and afterwards only re-bound and stepped.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+MMAP_BYTES = 256 * 1024 * 1024
+BUILD_BATCH_ROWS = 10000
+
+
+def _sql_value(value):
+    """Native Python value for sqlite3 (numpy scalars are not accepted; NaN becomes NULL)."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class DatabaseBuilder:
+    """
+    Writes a new database next to `path` and moves it into place on success,
+    so readers never see a half-built file.
+
+        with DatabaseBuilder(path) as db:
+            db.append("main", frame, text_columns=[...])
+            db.index("main", ["District_key", "Soil_Type_key"])
+            db.set_meta("rows", 123)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.conn = None
+        self._tables = {}  # table -> column list
+
+    def __enter__(self):
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        self.conn = sqlite3.connect(self.tmp_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("BEGIN")
+        self.conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.execute("COMMIT")
+                self.conn.execute("ANALYZE")
+        finally:
+            self.conn.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        return False
+
+    def append(self, table, frame, text_columns=()):
+        """Appends a DataFrame chunk; the table is created from the first chunk's columns."""
+        columns = self._tables.get(table)
+        if columns is None:
+            columns = self._tables[table] = list(frame.columns)
+            definitions = ", ".join(f'"{c}" {"TEXT" if c in text_columns else "NUMERIC"}' for c in columns)
+            self.conn.execute(f'CREATE TABLE "{table}" ({definitions})')
+        placeholders = ", ".join("?" for _ in columns)
+        names = ", ".join(f'"{c}"' for c in columns)
+        sql = f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})'
+        values = [frame[c].tolist() if c in frame.columns else [None] * len(frame) for c in columns]
+        for start in range(0, len(frame), BUILD_BATCH_ROWS):
+            batch = zip(*(v[start:start + BUILD_BATCH_ROWS] for v in values))
+            self.conn.executemany(sql, ([_sql_value(x) for x in row] for row in batch))
+
+    def index(self, table, columns):
+        name = f"{table}_{'_'.join(columns)}"
+        quoted = ", ".join(f'"{c}"' for c in columns)
+        self.conn.execute(f'CREATE INDEX "{name}" ON "{table}" ({quoted})')
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+
+class ReadOnlyDatabase:
+    """Read-only connections to a built database (one per thread, reopened after a fork)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._meta = {row["key"]: json.loads(row["value"])
+                      for row in self.rows("SELECT key, value FROM meta")}
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            uri = f"file:{self.path}?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only=1")
+            conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def rows(self, sql, params=()):
+        return self._connect().execute(sql, params).fetchall()
+
+    def row(self, sql, params=()):
+        return self._connect().execute(sql, params).fetchone()
+
+    def meta(self, key, default=None):
+        return self._meta.get(key, default)
+
+    def size_bytes(self):
+        return os.path.getsize(self.path)
@@ -0,0 +1,170 @@
+"""
+Gunicorn settings for the preforked serving mode (see Procfile).
+
+The master imports the app once (preload_app), so the models and datasets
+are loaded a single time and every worker shares those pages with it
+copy-on-write instead of loading its own copy. To keep them shared:
+
+- the garbage collector is off in the master, and everything it allocated is
+  frozen (gc.freeze) before each fork, so a worker's collections never write
+  to, and so copy, the master's object pages;
+- TensorFlow's runtime and thread pools do not survive a fork, so the Keras
+  CNN is not loaded in the master but in each worker (app.init_worker), after
+  sizing TensorFlow's and the BLAS/OpenMP thread pools to that worker's share
+  of the CPUs; the job and request log threads start there too;
+- the artifact watcher runs in the master only. A change (or POST /admin/reload)
+  sends the master a HUP: it reloads the snapshot once (on_reload), then
+  gunicorn forks fresh workers from it and retires the old ones, so a reload
+  never builds a private runtime in every worker.
+
+on_reload runs inside the arbiter's signal handling, so while the snapshot
+loads (a few seconds, logged) the master does not reap or respawn workers,
+check their timeouts or handle further signals; those are queued and handled
+afterwards. The running workers keep serving from the old snapshot meanwhile.
+test_gunicorn_reload.py exercises this path.
+
+Without WEB_CONCURRENCY the worker count is derived once the app is loaded:
+at most one per core, and only as many as fit in the memory limit next to the
+master, each needing the memory a worker does not share. That private memory
+is measured on a warm-up worker, forked and loaded like the real ones, when
+the limit has room for one next to the master; otherwise the static
+WORKER_PRIVATE_ESTIMATE_MB is used. Each worker logs its shared and private
+memory after start-up and at exit (also in /models).
+"""
+import gc
+import os
+import signal
+import time
+
+from memory_budget import MB, memory_limit_bytes, rss_bytes, sharing
+
+os.environ.setdefault("AGRONITY_PRELOAD", "1")
+
+preload_app = True
+# Workers load the Keras CNN before serving their first request
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+WORKERS_ENV = os.environ.get("WEB_CONCURRENCY")
+workers = int(WORKERS_ENV) if WORKERS_ENV else 1  # replaced in when_ready unless set
+# Memory a worker does not share with the master (0: measure it on a warm-up worker)
+WORKER_PRIVATE_MB = float(os.environ.get("AGRONITY_WORKER_PRIVATE_MB", "0"))
+MEMORY_HEADROOM = 0.9        # share of the memory limit the server may plan to use
+# Private memory of a worker (Keras CNN, TensorFlow runtime, heap), measured at
+# 190 MB; used when the limit has no room for a warm-up worker next to the master
+WORKER_PRIVATE_ESTIMATE_MB = 200
+
+# The objects created while loading live for the whole process; never scanning them keeps their pages shared
+gc.disable()
+
+
+def _cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _measure_worker_private_bytes():
+    """
+    Forks a warm-up worker that loads what a worker loads, runs the smoke
+    predictions a reload validates with and reports its private memory
+    through a pipe. Returns bytes, or None if it could not be measured.
+    """
+    import app
+    read_fd, write_fd = os.pipe()
+    gc.freeze()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            gc.enable()
+            app.prepare_worker()
+            app.ag.validate_runtime(app.runtime)
+            report = sharing()
+            if report is not None:
+                os.write(write_fd, str(report["private_mb"]).encode())
+        except Exception as e:
+            print(f"⚠ Warm-up worker failed: {e}")
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        reported = pipe.read()
+    os.waitpid(pid, 0)
+    return float(reported) * MB if reported else None
+
+
+def worker_count():
+    """(workers, reason): one per core, as many as fit next to the master's shared footprint."""
+    cores = _cores()
+    limit = memory_limit_bytes()
+    if not limit:
+        return cores, f"{cores} cores, memory limit unknown"
+    shared = rss_bytes()
+    headroom = limit * MEMORY_HEADROOM - shared
+    if WORKER_PRIVATE_MB > 0:
+        private, source = WORKER_PRIVATE_MB * MB, "set"
+    elif headroom < WORKER_PRIVATE_ESTIMATE_MB * MB:
+        # A warm-up worker would not fit either; measuring it could exceed the limit
+        private, source = WORKER_PRIVATE_ESTIMATE_MB * MB, "estimated"
+    else:
+        private, source = _measure_worker_private_bytes(), "measured"
+    if not private:
+        private, source = WORKER_PRIVATE_ESTIMATE_MB * MB, "estimated, measurement failed"
+    fit = int(headroom // private)
+    reason = (f"{cores} cores; {limit / MB:.0f} MB limit, {shared / MB:.0f} MB preloaded and shared, "
+              f"{private / MB:.0f} MB private per worker ({source}) → {max(fit, 0)} fit")
+    return max(1, min(cores, fit)), reason
+
+
+def when_ready(server):
+    """Runs in the master once the app is preloaded, before the first fork."""
+    if not WORKERS_ENV:
+        server.num_workers, reason = worker_count()
+        # TensorFlow's and the BLAS thread pools are sized from this in each worker
+        os.environ["WEB_CONCURRENCY"] = str(server.num_workers)
+        server.log.info("Workers: %d (%s)", server.num_workers, reason)
+    server.log.info("Master RSS after preload: %.1f MB", rss_bytes() / MB)
+    import app
+    app.start_watcher(lambda: os.kill(server.pid, signal.SIGHUP))
+
+
+def on_reload(server):
+    """
+    HUP (from the artifact watcher or /admin/reload): reloads the snapshot in
+    the master, before gunicorn forks the replacement workers from it. Blocks
+    the arbiter until the load is done (see above).
+    """
+    import app
+    started = time.monotonic()
+    gc.unfreeze()  # the replaced snapshot can be collected
+    app.reload_runtime()
+    gc.collect()
+    server.log.info("Master reload took %.1f s (workers were not managed meanwhile)", time.monotonic() - started)
+
+
+def pre_fork(server, worker):
+    # Moves everything allocated so far out of the collector's generations
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+    import app
+    app.init_worker(master=server.pid)
+
+
+def _log_sharing(worker, when):
+    report = sharing()
+    if report is not None:
+        worker.log.info("Worker %s memory %s: %.1f MB shared, %.1f MB private (RSS %.1f MB, PSS %.1f MB)",
+                        worker.pid, when, report["shared_mb"], report["private_mb"],
+                        report["rss_mb"], report["pss_mb"])
+
+
+def post_worker_init(worker):
+    _log_sharing(worker, "after start-up")
+
+
+def worker_exit(server, worker):
+    _log_sharing(worker, "at exit")
@@ -0,0 +1,122 @@
+"""
+Near-duplicate cache for crop photos.
+
+Farmers often re-send the same photo, recompressed by a messaging app or
+slightly cropped, so exact byte hashes rarely repeat. Each photo is reduced to
+a 64-bit difference hash (dHash) of a 9x8 grayscale thumbnail; photos whose
+hashes differ in at most `max_distance` bits reuse the stored diagnosis.
+
+Lookups use multi-index hashing: the hash is split into BANDS 16-bit bands,
+each with its own exact-match table. Two hashes within distance d differ by at
+most d // BANDS bits in at least one band, so each band is probed with every
+value within that radius and only those entries are compared bit by bit.
+"""
+import threading
+from collections import OrderedDict
+from itertools import combinations
+
+import numpy as np
+
+HASH_BITS = 64
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+MAX_DISTANCE = 6          # Hamming distance still treated as the same photo
+MAX_ENTRIES = 2048
+
+
+def dhash(img_array):
+    """64-bit difference hash of an RGB image array (H x W x 3, any value range)."""
+    gray = np.asarray(img_array, dtype=np.float32)
+    if gray.ndim == 3:
+        gray = gray @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    # Box-average down to 8 rows x 9 columns
+    rows = np.linspace(0, gray.shape[0], 9).astype(int)
+    cols = np.linspace(0, gray.shape[1], 10).astype(int)
+    thumb = np.add.reduceat(np.add.reduceat(gray, rows[:-1], axis=0), cols[:-1], axis=1)
+    thumb /= np.outer(np.diff(rows), np.diff(cols))
+    bits = thumb[:, 1:] > thumb[:, :-1]
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PerceptualCache:
+    """Bounded LRU map from perceptual hash to result, with near-duplicate lookup."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_distance=MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries = OrderedDict()                       # hash -> result, oldest first
+        self._bands = [dict() for _ in range(BANDS)]        # band value -> set of hashes
+        # XOR masks of every band value within max_distance // BANDS bits
+        radius = max_distance // BANDS
+        self._probes = [0] + [sum(1 << bit for bit in bits)
+                              for r in range(1, radius + 1)
+                              for bits in combinations(range(BAND_BITS), r)]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _band_values(key):
+        mask = (1 << BAND_BITS) - 1
+        return [(key >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+    def lookup(self, key):
+        """Stored result for `key` or its nearest hash within max_distance, else None."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            best, best_distance = None, self.max_distance + 1
+            for band, value in zip(self._bands, self._band_values(key)):
+                for probe in self._probes:
+                    for candidate in band.get(value ^ probe, ()):
+                        distance = hamming(key, candidate)
+                        if distance < best_distance:
+                            best, best_distance = candidate, distance
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            self.near_hits += 1
+            return self._entries[best]
+
+    def store(self, key, result):
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = result
+            for band, value in zip(self._bands, self._band_values(key)):
+                band.setdefault(value, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                for band, value in zip(self._bands, self._band_values(old)):
+                    keys = band[value]
+                    keys.discard(old)
+                    if not keys:
+                        del band[value]
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,238 @@
+"""
+Asynchronous jobs for long-running bulk analyses.
+
+A job is a list of tasks (feasibility or image analyses) stored in a local
+SQLite database. Worker threads claim queued jobs, run their tasks in chunks
+and commit each chunk's results together with the job's progress, so a job
+interrupted by a restart resumes from its last completed chunk. While a job
+runs, its process heartbeats it every JOB_HEARTBEAT_SECONDS, however long a
+chunk takes; jobs whose worker stopped heartbeating (e.g. a killed process)
+are reclaimed by any other worker sharing the database.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_CHUNK_SIZE = 50
+JOB_MAX_TASKS = 100000
+JOB_POLL_SECONDS = 1.0
+JOB_STALE_SECONDS = 60       # a running job without a heartbeat this long is reclaimed
+JOB_HEARTBEAT_SECONDS = 10   # how often a running job's heartbeat is refreshed
+JOB_BACKOFF_MAX_SECONDS = 30  # longest wait after a database error, doubling from JOB_POLL_SECONDS
+RESULTS_PAGE_MAX = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,            -- queued, running, done, failed
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    chunk_size INTEGER NOT NULL,
+    owner TEXT,
+    heartbeat REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE TABLE IF NOT EXISTS results (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class JobStore:
+    """
+    SQLite persistence for jobs, their tasks and results (one connection per thread).
+    `dumps` encodes results, e.g. the app's JSON provider for numpy values.
+    """
+
+    def __init__(self, path, dumps=json.dumps):
+        self.path = path
+        self._dumps = dumps
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def submit(self, kind, tasks, chunk_size=JOB_CHUNK_SIZE):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, total, chunk_size, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, len(tasks), chunk_size, now, now),
+            )
+            conn.executemany("INSERT INTO tasks (job_id, seq, payload) VALUES (?, ?, ?)",
+                             ((job_id, seq, json.dumps(task)) for seq, task in enumerate(tasks)))
+        return job_id
+
+    def claim(self, owner):
+        """Atomically takes the oldest queued (or abandoned running) job. Returns its row or None."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND heartbeat < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now - JOB_STALE_SECONDS,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?, updated_at = ? WHERE id = ?",
+                         (owner, now, now, row["id"]))
+        return self.get(row["id"])
+
+    def tasks(self, job_id, start, count):
+        rows = self._connect().execute(
+            "SELECT payload FROM tasks WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (job_id, start, count),
+        ).fetchall()
+        return [json.loads(r["payload"]) for r in rows]
+
+    def complete_chunk(self, job_id, owner, start, results):
+        """Stores one chunk's results and advances progress in a single transaction."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                "UPDATE jobs SET completed = ?, heartbeat = ?, updated_at = ?, "
+                "status = CASE WHEN ? >= total THEN 'done' ELSE status END "
+                "WHERE id = ? AND owner = ? AND completed = ?",
+                (start + len(results), now, now, start + len(results), job_id, owner, start),
+            ).rowcount
+            if not updated:
+                return False  # the job was reclaimed by another worker
+            conn.executemany("INSERT OR REPLACE INTO results (job_id, seq, result) VALUES (?, ?, ?)",
+                             ((job_id, start + i, self._dumps(r)) for i, r in enumerate(results)))
+        return True
+
+    def heartbeat(self, job_ids, owner):
+        """Refreshes the heartbeat of the given running jobs while `owner` still holds them."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany("UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                             ((now, job_id, owner) for job_id in job_ids))
+
+    def fail(self, job_id, owner, error):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ? AND owner = ?",
+                         (error, time.time(), job_id, owner))
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def results(self, job_id, offset, limit):
+        rows = self._connect().execute(
+            "SELECT seq, result FROM results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (job_id, offset, limit),
+        ).fetchall()
+        return [{"index": r["seq"], **json.loads(r["result"])} for r in rows]
+
+
+class JobRunner:
+    """
+    Worker threads that claim jobs and run them chunk by chunk.
+    `execute(kind, tasks)` returns one JSON-serializable result per task.
+    """
+
+    def __init__(self, store, execute, workers=2):
+        self.store = store
+        self.execute = execute
+        self.workers = workers
+        self._wake = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+        self._running = {}  # job id -> owner, for the heartbeat thread
+
+    def ensure_started(self):
+        """Starts the worker and heartbeat threads (again after a fork, where threads do not survive)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._running = {}
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+            threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def notify(self):
+        self._wake.set()
+
+    def _work(self):
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        backoff = JOB_POLL_SECONDS
+        last_error = None
+        while True:
+            try:
+                job = self.store.claim(owner)
+                if job is not None:
+                    self._running[job["id"]] = owner
+                    try:
+                        self._run(job, owner)
+                    except sqlite3.Error:
+                        raise  # the database, not the job, failed; another worker can resume it
+                    except Exception as e:
+                        self.store.fail(job["id"], owner, f"{type(e).__name__}: {e}")
+                    finally:
+                        self._running.pop(job["id"], None)
+                backoff, last_error = JOB_POLL_SECONDS, None
+            except sqlite3.Error as e:
+                if str(e) != last_error:  # printed once per distinct error, not per retry
+                    print(f"⚠ Job worker database error, retrying: {e}")
+                last_error = str(e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, JOB_BACKOFF_MAX_SECONDS)
+                continue
+            if job is None:
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+
+    def _heartbeat(self):
+        """Keeps this process's running jobs from being reclaimed while a long chunk runs."""
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            running = dict(self._running)
+            try:
+                for owner in set(running.values()):
+                    self.store.heartbeat([job_id for job_id, o in running.items() if o == owner], owner)
+            except sqlite3.Error as e:
+                print(f"⚠ Job heartbeat failed: {e}")
+
+    def _run(self, job, owner):
+        start = job["completed"]  # resume after the last committed chunk
+        while start < job["total"]:
+            tasks = self.store.tasks(job["id"], start, job["chunk_size"])
+            results = self.execute(job["kind"], tasks)
+            if not self.store.complete_chunk(job["id"], owner, start, results):
+                return
+            start += len(tasks)
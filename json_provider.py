@@ -0,0 +1,67 @@
+"""
+Flask JSON provider that serializes numpy and pandas values directly.
+
+Analysis results are dicts holding numpy scalars and arrays. Instead of first
+copying them into native Python types, the provider hands them to orjson,
+which encodes numpy scalars and arrays natively in a single pass and writes
+the response bytes without an intermediate str. Values neither understands
+(pandas NA/NaT, object arrays, dates) go through `_default`. Without orjson
+the stdlib encoder is used with the same `_default` hook.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+# Try to import orjson for the fast encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(obj):
+    """Native value for what the encoder cannot serialize itself."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with numpy/pandas support and orjson encoding."""
+
+    default = staticmethod(_default)
+
+    def _options(self, pretty=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._options()).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not ORJSON_AVAILABLE:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(pretty)) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,207 @@
+"""
+Memory accounting for the serving process.
+
+Each load step is measured twice: by the change in process RSS around the
+load, and by the footprint of the loaded object itself (DataFrame buffers,
+numpy arrays, model weights). Components declare a priority and an optional
+memory budget; with a process budget set (AGRONITY_MEMORY_BUDGET_MB), a
+component is skipped, with a logged reason, when loading it would leave too
+little room for the higher-priority components still to come.
+"""
+import os
+import sys
+
+import numpy as np
+
+# Try to import psutil for portable RSS readings
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+MB = 1024 * 1024
+REQUIRED_PRIORITY = 100  # components at or above this priority are never skipped
+
+
+def rss_bytes():
+    """Resident set size of this process in bytes (0 if it cannot be read)."""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, but the best available without /proc
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def memory_limit_bytes():
+    """Memory available to this container: the cgroup limit, else physical memory (None if unknown)."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:  # "max" or a huge number means unlimited
+            return int(value)
+    if PSUTIL_AVAILABLE:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def sharing(pid="self"):
+    """
+    How much of a process's memory is shared with other processes (e.g. pages a
+    forked worker still shares with its parent) and how much is its own, in MB,
+    from /proc/<pid>/smaps_rollup. None where it is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return {
+        "rss_mb": _mb(fields.get("Rss", 0)),
+        "pss_mb": _mb(fields.get("Pss", 0)),  # shared pages split between the processes sharing them
+        "shared_mb": _mb(fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)),
+        "private_mb": _mb(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)),
+    }
+
+
+def footprint(obj, _seen=None):
+    """Approximate bytes held by `obj`, following containers and object attributes."""
+    if obj is None:
+        return 0
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):  # DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, "get_weights") and hasattr(obj, "count_params"):  # Keras model
+        return sum(w.nbytes for w in obj.get_weights())
+
+    # id -> object; holding the objects keeps temporary __getstate__ results alive,
+    # so their ids cannot be reused by later objects during the walk
+    seen = _seen if _seen is not None else {}
+    if id(obj) in seen:
+        return 0
+    seen[id(obj)] = obj
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(footprint(k, seen) + footprint(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(footprint(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        size += footprint(vars(obj), seen)
+    elif not isinstance(obj, (str, bytes, int, float, bool, type)):
+        # Extension types without __dict__ (e.g. sklearn's Cython trees) expose their state here
+        try:
+            state = obj.__getstate__()
+        except Exception:
+            state = None
+        if isinstance(state, dict):
+            size += footprint(state, seen)
+    return size
+
+
+def _mb(value):
+    return None if value is None else round(value / MB, 2)
+
+
+class MemoryLedger:
+    """Per-component memory report for one load, enforcing an optional process budget."""
+
+    def __init__(self, components, budget_mb=None):
+        self.components = components          # name -> {"priority", "budget_mb"}
+        self.budget = None if budget_mb is None else budget_mb * MB
+        self.entries = {}
+        self._rss_before = {}
+
+    @classmethod
+    def from_env(cls, components, variable="AGRONITY_MEMORY_BUDGET_MB"):
+        value = os.environ.get(variable, "").strip()
+        return cls(components, float(value) if value else None)
+
+    def _declared(self, name):
+        spec = self.components.get(name, {})
+        budget = spec.get("budget_mb")
+        return spec.get("priority", REQUIRED_PRIORITY), None if budget is None else budget * MB
+
+    def admit(self, name):
+        """True if `name` may be loaded now; otherwise records it as skipped."""
+        priority, declared = self._declared(name)
+        rss = rss_bytes()
+        self._rss_before[name] = rss
+        if self.budget is None or priority >= REQUIRED_PRIORITY:
+            return True
+
+        # Keep room for higher-priority components that have not been loaded yet
+        reserved = sum(self._declared(other)[1] or 0 for other, spec in self.components.items()
+                       if other not in self.entries and other != name
+                       and spec.get("priority", REQUIRED_PRIORITY) > priority)
+        needed = declared or 0
+        if rss + reserved + needed <= self.budget:
+            return True
+
+        reason = (f"needs ~{_mb(needed)} MB with {_mb(rss)} MB in use and {_mb(reserved)} MB "
+                  f"reserved for higher-priority components (budget {_mb(self.budget)} MB)")
+        self.entries[name] = {"status": "skipped", "priority": priority,
+                              "budget_mb": _mb(declared), "reason": reason}
+        print(f"⚠ Skipping {name}: {reason}")
+        return False
+
+    def record(self, name, obj, rss_delta=None, size=None):
+        """
+        Records the measured cost of a loaded component (obj None = not available).
+        `rss_delta` and `size` override the measurements, e.g. for import costs.
+        """
+        priority, declared = self._declared(name)
+        rss_before = self._rss_before.pop(name, None)
+        if rss_delta is None:
+            rss_delta = 0 if rss_before is None else rss_bytes() - rss_before
+        if size is None:
+            size = footprint(obj) if obj is not None else 0
+        entry = {"status": "loaded" if obj is not None else "unavailable",
+                 "priority": priority, "budget_mb": _mb(declared),
+                 "rss_delta_mb": _mb(rss_delta), "footprint_mb": _mb(size)}
+        self.entries[name] = entry
+        if entry["status"] == "loaded":
+            print(f"✓ Memory {name}: +{_mb(rss_delta)} MB RSS, {_mb(size)} MB measured "
+                  f"(RSS now {_mb(rss_bytes())} MB)")
+            if declared is not None and max(rss_delta, size) > declared:
+                print(f"⚠ {name} exceeds its declared budget of {_mb(declared)} MB")
+
+    def skip(self, name, reason):
+        """Records a component that was not loaded for a reason other than the budget."""
+        priority, declared = self._declared(name)
+        self.entries[name] = {"status": "skipped", "priority": priority,
+                              "budget_mb": _mb(declared), "reason": reason}
+
+    def load(self, name, loader):
+        """Runs `loader()` if the budget admits `name`; returns its result or None."""
+        if not self.admit(name):
+            return None
+        value = loader()
+        self.record(name, value)
+        return value
+
+    def report(self):
+        return {
+            "rss_mb": _mb(rss_bytes()),
+            "budget_mb": _mb(self.budget),
+            "components": {name: dict(entry) for name, entry in self.entries.items()},
+        }
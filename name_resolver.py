@@ -0,0 +1,100 @@
+"""
+Typo-tolerant name resolution for districts, soil types and crops.
+
+Names are indexed by their character trigrams once, when the datasets are
+loaded. A lookup only considers names sharing at least one trigram with the
+query, ranks them by Dice coefficient over the trigram multisets and re-scores
+the best few with an edit-based ratio (short typos like "blak" share few
+trigrams). Resolving "Tarn Tarn" or "aluvial" takes tens of microseconds.
+"""
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+NGRAM = 3
+MIN_SCORE = 0.6  # below this a candidate is not considered a match
+RESCORE_CANDIDATES = 10
+
+
+def normalize(name):
+    """Lowercase, keep letters/digits only and collapse whitespace."""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(name).lower()).split())
+
+
+def ngrams(text, n=NGRAM):
+    """Character n-grams of a normalized name, padded so word edges count."""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return Counter([padded])
+    return Counter(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+class NameResolver:
+    """Inverted n-gram index over several named vocabularies ("kinds")."""
+
+    def __init__(self, n=NGRAM, min_score=MIN_SCORE):
+        self.n = n
+        self.min_score = min_score
+        self._names = defaultdict(list)      # kind -> [(normalized, canonical, gram count)]
+        self._exact = defaultdict(dict)      # kind -> normalized -> name id
+        self._postings = defaultdict(lambda: defaultdict(list))  # kind -> gram -> [(name id, count)]
+
+    def add(self, kind, name, canonical=None):
+        """Index `name` under `kind`; lookups of it return `canonical` (default: name)."""
+        key = normalize(name)
+        if not key or key in self._exact[kind]:
+            return
+        grams = ngrams(key, self.n)
+        name_id = len(self._names[kind])
+        self._names[kind].append((key, canonical if canonical is not None else name, sum(grams.values())))
+        self._exact[kind][key] = name_id
+        postings = self._postings[kind]
+        for gram, count in grams.items():
+            postings[gram].append((name_id, count))
+
+    def add_many(self, kind, names):
+        for name in names:
+            self.add(kind, name)
+
+    def resolve(self, kind, query, limit=3, min_score=None):
+        """
+        Best canonical match for `query` plus alternatives.
+        Returns {"match": name or None, "score": float, "alternatives": [{"name", "score"}]}.
+        """
+        min_score = self.min_score if min_score is None else min_score
+        key = normalize(query)
+        names = self._names.get(kind, [])
+        name_id = self._exact.get(kind, {}).get(key)
+        if name_id is not None:
+            return {"match": names[name_id][1], "score": 1.0, "alternatives": []}
+
+        grams = ngrams(key, self.n)
+        total = sum(grams.values())
+        postings = self._postings.get(kind, {})
+        shared = defaultdict(int)
+        for gram, count in grams.items():
+            for candidate, candidate_count in postings.get(gram, ()):
+                shared[candidate] += min(count, candidate_count)
+
+        dice = sorted(((2.0 * common / (total + names[candidate][2]), candidate)
+                       for candidate, common in shared.items()), reverse=True)
+
+        scored = {}
+        for score, candidate in dice[:RESCORE_CANDIDATES]:
+            candidate_key, canonical, _ = names[candidate]
+            score = max(score, SequenceMatcher(None, key, candidate_key).ratio())
+            if score > scored.get(canonical, 0.0):
+                scored[canonical] = score
+        ranked = sorted(scored.items(), key=lambda item: -item[1])[:limit + 1]
+
+        if not ranked or ranked[0][1] < min_score:
+            return {
+                "match": None,
+                "score": ranked[0][1] if ranked else 0.0,
+                "alternatives": [{"name": n, "score": round(s, 3)} for n, s in ranked[:limit]],
+            }
+        return {
+            "match": ranked[0][0],
+            "score": ranked[0][1],
+            "alternatives": [{"name": n, "score": round(s, 3)} for n, s in ranked[1:limit + 1]],
+        }
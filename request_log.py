@@ -0,0 +1,218 @@
+"""
+Buffered JSONL log of analysis requests and their outcomes.
+
+Handlers only put a record on a bounded in-memory queue; when the queue is
+full the record is dropped and counted, so logging never blocks a request. A
+background thread collects records into batches (up to `batch_size`, or
+whatever arrived within `flush_seconds`), encodes them and appends each batch
+with a single write while holding an exclusive lock file, so the lines of
+several gunicorn workers never interleave. When the file reaches `max_bytes` it
+is rotated to requests.jsonl.1 (… .N, optionally gzip-compressed) under the
+same lock.
+"""
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+# fcntl (POSIX) lets several worker processes share one log file
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+MAX_QUEUE = 10000
+BATCH_SIZE = 500
+FLUSH_SECONDS = 1.0
+MAX_BYTES = 50 * 1024 * 1024
+BACKUPS = 5
+BODY_MAX_BYTES = 64 * 1024   # larger responses are logged by size only
+LIST_MAX_ITEMS = 8           # longer lists are logged by length only
+STRING_MAX_CHARS = 200
+
+_STOP = object()
+
+
+def compact(value):
+    """Small JSON-friendly copy of a payload or result: long lists become their length."""
+    if isinstance(value, dict):
+        return {k: compact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if len(value) > LIST_MAX_ITEMS:
+            return {"items": len(value)}
+        return [compact(v) for v in value]
+    if isinstance(value, str) and len(value) > STRING_MAX_CHARS:
+        return value[:STRING_MAX_CHARS] + "…"
+    return value
+
+
+class RequestLog:
+    """Queue plus writer thread for one JSONL file (one thread per process, restarted after a fork)."""
+
+    def __init__(self, path, max_queue=MAX_QUEUE, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS,
+                 max_bytes=MAX_BYTES, backups=BACKUPS, compress=False, dumps=json.dumps, loads=json.loads):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self._dumps = dumps
+        self._loads = loads
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self.errors = 0
+        self.last_error = None
+
+    def ensure_started(self):
+        """Starts the writer thread (again after a fork, where threads do not survive)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is None:
+                atexit.register(self.close)
+            self._pid = os.getpid()
+            self._queue = queue.Queue(self._queue.maxsize)  # records queued by the parent stay with it
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._work, name="request-log", daemon=True)
+            self._thread.start()
+
+    def log(self, entry):
+        """
+        Queues one entry without blocking. The writer compacts `entry["request"]` and
+        replaces `entry["body"]` (the response bytes) with a compact `outcome`.
+        """
+        if self._pid != os.getpid():
+            self.ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Writes what is still queued and stops the writer thread."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def _record(self, entry):
+        if entry.get("request") is not None:
+            entry["request"] = compact(entry["request"])
+        body = entry.pop("body", None)
+        if body is not None:
+            if len(body) > BODY_MAX_BYTES:
+                entry["outcome"] = {"bytes": len(body)}
+            else:
+                try:
+                    entry["outcome"] = compact(self._loads(body))
+                except ValueError:
+                    entry["outcome"] = {"bytes": len(body)}
+        return entry
+
+    def _work(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_seconds
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        try:
+            lines = []
+            for entry in batch:
+                line = self._dumps(self._record(entry))
+                lines.append(line.encode() if isinstance(line, str) else line)
+            self._append(b"\n".join(lines) + b"\n")
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠ Request log write failed: {e}")
+            return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def _append(self, data):
+        with open(self.lock_path, "a") as lock:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # O_APPEND and one write per batch: a batch lands as one contiguous block
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                if os.path.getsize(self.path) >= self.max_bytes:
+                    self._rotate()
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _backup(self, n):
+        return f"{self.path}.{n}{'.gz' if self.compress else ''}"
+
+    def _rotate(self):
+        """requests.jsonl -> .1 -> .2 ... (the oldest beyond `backups` is dropped); caller holds the lock."""
+        if os.path.exists(self._backup(self.backups)):
+            os.remove(self._backup(self.backups))
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(self._backup(n)):
+                os.replace(self._backup(n), self._backup(n + 1))
+        if self.compress:
+            with open(self.path, "rb") as src, gzip.open(f"{self._backup(1)}.tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(f"{self._backup(1)}.tmp", self._backup(1))
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self._backup(1))
+        with self._lock:
+            self.rotations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "rotations": self.rotations,
+                "errors": self.errors,
+                "last_error": self.last_error,
+            }
@@ -0,0 +1,150 @@
+"""
+Static asset serving for the web front end.
+
+Only whitelisted files (the page, its stylesheet and the sample images) are
+served. At startup every asset is read once, hashed for its ETag and, for text
+types, precompressed to gzip and brotli, so a request is a dictionary lookup:
+no disk read and no per-request compression. Conditional requests
+(If-None-Match) are answered with 304.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response
+
+# Try to import brotli for precompressed .br variants
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+ASSET_FILES = ["sih.html", "sih.css"]
+ASSET_DIRS = ["images"]
+ASSET_EXTENSIONS = {".html", ".css", ".js", ".svg", ".ico", ".jpg", ".jpeg", ".png", ".webp"}
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "image/svg+xml")
+
+# Bodies are kept in memory up to this total; larger leftovers are read per request
+MAX_CACHED_BYTES = 8 * 1024 * 1024
+
+# The page URL never changes, so browsers must revalidate it (cheap with the ETag);
+# other assets can be reused for a day without asking.
+HTML_CACHE_CONTROL = "no-cache"
+ASSET_CACHE_CONTROL = "public, max-age=86400"
+
+
+class _Asset:
+    __slots__ = ("path", "mimetype", "etag", "cache_control", "body", "variants")
+
+    def __init__(self, path, mimetype, etag, cache_control):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        self.body = None
+        self.variants = {}  # content-encoding -> (bytes, etag)
+
+
+def _accepted_encodings(header):
+    """Encodings the client accepts (q > 0) from an Accept-Encoding header."""
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class AssetStore:
+    """In-memory, precompressed copy of the whitelisted static assets."""
+
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+        self.build()
+
+    def _discover(self):
+        names = [name for name in ASSET_FILES if os.path.isfile(os.path.join(self.root, name))]
+        for directory in ASSET_DIRS:
+            base = os.path.join(self.root, directory)
+            if not os.path.isdir(base):
+                continue
+            for name in sorted(os.listdir(base)):
+                if os.path.splitext(name)[1].lower() in ASSET_EXTENSIONS:
+                    names.append(f"{directory}/{name}")
+        return names
+
+    def build(self):
+        """(Re)reads, hashes and precompresses every asset; smallest files are cached first."""
+        assets = {}
+        raw_total = cached_total = 0
+        names = sorted(self._discover(), key=lambda n: os.path.getsize(os.path.join(self.root, n)))
+        for name in names:
+            path = os.path.join(self.root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            digest = hashlib.sha256(data).hexdigest()[:20]
+            cache_control = HTML_CACHE_CONTROL if mimetype == "text/html" else ASSET_CACHE_CONTROL
+            asset = _Asset(path, mimetype, f'"{digest}"', cache_control)
+
+            if mimetype.startswith(COMPRESSIBLE_TYPES):
+                compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+                if BROTLI_AVAILABLE:
+                    compressed["br"] = brotli.compress(data, quality=11)
+                for encoding, body in compressed.items():
+                    if len(body) < len(data):
+                        asset.variants[encoding] = (body, f'"{digest}-{encoding}"')
+
+            size = len(data) + sum(len(body) for body, _ in asset.variants.values())
+            if cached_total + size <= MAX_CACHED_BYTES:
+                asset.body = data
+                cached_total += size
+            else:
+                asset.variants = {}
+            raw_total += len(data)
+            assets[name] = asset
+
+        self.assets = assets
+        print(f"✓ Static assets: {len(assets)} files, {raw_total / 1e6:.2f} MB "
+              f"({cached_total / 1e6:.2f} MB cached in memory, brotli={'on' if BROTLI_AVAILABLE else 'off'})")
+
+    def response(self, name, request):
+        """Response for asset `name`, or None when it is not a served asset."""
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+
+        encoding, etag, body = None, asset.etag, asset.body
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding"))
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and candidate in accepted:
+                encoding = candidate
+                body, etag = asset.variants[candidate]
+                break
+
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or etag in tags:
+                return Response(status=304, headers=headers)
+
+        if body is None:
+            with open(asset.path, "rb") as f:
+                body = f.read()
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, mimetype=asset.mimetype, headers=headers)
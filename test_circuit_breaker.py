@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""Test script for the circuit breaker (circuit_breaker.py) around the Keras image model"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+from PIL import Image
+
+import agronity_test as ag
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+class Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def calls(breaker, outcomes):
+    """Runs one guarded call per outcome (True = fails); returns how many were allowed."""
+    allowed = 0
+    for fails in outcomes:
+        if breaker.allow():
+            allowed += 1
+            if fails:
+                breaker.failure(RuntimeError("boom"))
+            else:
+                breaker.success()
+    return allowed
+
+
+print("\n" + "="*80)
+print("CIRCUIT BREAKER TEST")
+print("="*80 + "\n")
+
+# closed -> open: not before min_calls outcomes, then at the failure rate
+clock = Clock()
+breaker = CircuitBreaker(window_size=10, min_calls=4, failure_rate=0.5, open_seconds=30, probe_calls=2, clock=clock)
+calls(breaker, [True, True, True])
+check("stays closed below min_calls", breaker.state == CLOSED, f"{breaker.stats()['window_failure_rate']} failing")
+calls(breaker, [False, False, False, False, False])
+check("stays closed below the failure rate", breaker.state == CLOSED,
+      f"{breaker.stats()['window_failure_rate']} failing")
+calls(breaker, [True, True])
+check("opens once the window reaches the failure rate", breaker.state == OPEN and
+      breaker.stats()["transitions"]["opened"] == 1, f"{breaker.stats()['window_failure_rate']} failing")
+check("records the last error", breaker.stats()["last_error"] == "RuntimeError: boom")
+
+# open: calls are rejected until the cooldown ends
+check("open breaker rejects calls", calls(breaker, [False] * 5) == 0 and breaker.stats()["rejected"] == 5)
+clock.now += 29
+check("still open before the cooldown", breaker.state == OPEN and breaker.stats()["retry_in_seconds"] == 1.0)
+
+# half-open: a failing probe re-opens for another cooldown
+clock.now += 1
+check("half-open after the cooldown", breaker.state == HALF_OPEN)
+check("failed probe re-opens", calls(breaker, [True]) == 1 and breaker.state == OPEN and
+      breaker.stats()["transitions"]["opened"] == 2 and breaker.stats()["retry_in_seconds"] == 30.0)
+
+# half-open: probe_calls slots at a time; released calls give their slot back
+clock.now += 30
+check("half-open again after another cooldown", breaker.state == HALF_OPEN)
+first, second, third = breaker.allow(), breaker.allow(), breaker.allow()
+check("only probe_calls probes in flight", first and second and not third)
+breaker.release()
+check("released probe frees its slot", breaker.allow() and not breaker.allow())
+breaker.success()
+check("one success is not enough to close", breaker.state == HALF_OPEN)
+breaker.success()
+check("all probes succeed: closed with an empty window", breaker.state == CLOSED and
+      breaker.stats()["window_failure_rate"] == 0.0 and breaker.stats()["transitions"] == {
+          "opened": 2, "half_opened": 2, "closed": 1})
+calls(breaker, [True, True, True])
+check("closed again: needs min_calls fresh outcomes to open", breaker.state == CLOSED)
+calls(breaker, [True])
+check("and opens once they fail", breaker.state == OPEN)
+
+# Old outcomes leave the rolling window
+breaker = CircuitBreaker(window_size=4, min_calls=4, failure_rate=0.5, clock=Clock())
+calls(breaker, [True, False, False, False, False, True])
+check("window keeps the most recent outcomes only", breaker.state == CLOSED and
+      breaker.stats()["window_failure_rate"] == 0.25)
+
+# Concurrent probes: exactly probe_calls of many threads get through
+clock = Clock()
+breaker = CircuitBreaker(min_calls=1, failure_rate=1.0, open_seconds=5, probe_calls=3, clock=clock)
+calls(breaker, [True])
+clock.now += 5
+allowed = []
+barrier = threading.Barrier(16)
+
+
+def probe():
+    barrier.wait()
+    allowed.append(breaker.allow())
+
+
+threads = [threading.Thread(target=probe) for _ in range(16)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+check("concurrent callers share probe_calls slots", sum(allowed) == 3, f"{sum(allowed)} of {len(allowed)} allowed")
+
+# analyze_image: a failing CNN opens the breaker and requests fall back without calling it
+predictions = []
+
+
+def failing_cnn(batch):
+    predictions.append(len(batch))
+    raise RuntimeError("graph execution failed")
+
+
+clock = Clock()
+breaker = CircuitBreaker(min_calls=3, failure_rate=0.5, open_seconds=10, probe_calls=1, clock=clock)
+models = {"keras_cnn": object(), "keras_infer": failing_cnn, "image_breaker": breaker, "image_cache": None}
+data_df = ag.load_data()
+filename = f"breaker_test_{os.getpid()}.jpg"
+path = os.path.join(ag.UPLOADS_DIR, filename)
+os.makedirs(ag.UPLOADS_DIR, exist_ok=True)
+Image.fromarray(np.full((32, 32, 3), 120, dtype=np.uint8)).save(path)
+try:
+    results = [ag.analyze_image(models, data_df, filename) for _ in range(6)]
+    check("failing CNN falls back to the ruleset", all(r.get("model_used") != "keras_cnn" for r in results))
+    check("breaker opens after min_calls failures; CNN no longer called", breaker.state == OPEN and
+          len(predictions) == 3, f"{len(predictions)} CNN calls for 6 requests")
+    missing = ag.analyze_image({**models, "image_breaker": CircuitBreaker(min_calls=1, clock=clock)}, data_df,
+                               "missing.jpg")
+    check("missing photo does not call the CNN", len(predictions) == 3 and missing is not None)
+
+    models["keras_infer"] = lambda batch: np.array([[0.9]])
+    clock.now += 10
+    result = ag.analyze_image(models, data_df, filename)
+    check("after the cooldown a probe reaches the CNN and closes", result["model_used"] == "keras_cnn" and
+          breaker.state == CLOSED)
+finally:
+    os.remove(path)
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Test script for the SQLite data backend: every lookup must match the pandas frames"""
+
+import os
+import sys
+import tempfile
+
+import agronity_test as ag
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def close(a, b, rel=1e-12):
+    """Equal up to `rel` on floats (SQLite and numpy sum in a different order)."""
+    if isinstance(a, dict):
+        return isinstance(b, dict) and a.keys() == b.keys() and all(close(a[k], b[k], rel) for k in a)
+    if isinstance(a, list):
+        return isinstance(b, list) and len(a) == len(b) and all(close(x, y, rel) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b) <= rel * max(1.0, abs(a))
+    return a == b
+
+
+def compare(name, calls, equal=lambda a, b: a == b):
+    """Runs each (args, pandas call, sqlite call) and reports how many results differ."""
+    differences = 0
+    example = ""
+    for args, expected, actual in calls:
+        if not equal(expected(), actual()):
+            differences += 1
+            example = example or f"first: {args}"
+    check(name, differences == 0, f"{len(calls) - differences}/{len(calls)} {example}")
+
+
+print("\n" + "="*80)
+print("DATA BACKENDS TEST")
+print("="*80 + "\n")
+
+models = ag.load_models(keras=False)
+data_df = ag.load_data()
+shards = ag.load_regional_shards()
+with tempfile.TemporaryDirectory() as tmp:
+    main_store, regional_store = ag.load_data_store(os.path.join(tmp, "data.sqlite3"))
+
+    check("both stores open", main_store is not None and regional_store is not None)
+    check("same row count", len(main_store) == len(data_df), f"{len(main_store)} rows")
+
+    districts = list(data_df["District"].cat.categories[:12]) + ["ariyalur", "Gaya", "Nowhere"]
+    soils = list(data_df["Soil_Type"].cat.categories[:5]) + ["Moon"]
+    crops = ["Rice", "Cotton", "Sugarcane", "wheat"]
+    compare("analyze_feasibility (sklearn)", [
+        ((crop, district, 3, soil, risk),
+         lambda a=(crop, district, 3, soil), r=risk: ag.analyze_feasibility(models, data_df, *a, risk=r),
+         lambda a=(crop, district, 3, soil), r=risk: ag.analyze_feasibility(models, main_store, *a, risk=r))
+        for district in districts for soil in soils for crop in crops for risk in (False, True)
+    ])
+    compare("recommend_crops", [
+        ((district, soil),
+         lambda d=district, s=soil: ag.recommend_crops(models, data_df, d, 3, s),
+         lambda d=district, s=soil: ag.recommend_crops(models, main_store, d, 3, s))
+        for district in districts[:6] for soil in soils[:3]
+    ])
+    compare("ruleset image detector", [
+        ((filename,),
+         lambda f=filename: ag._analyze_image_ruleset(data_df, f),
+         lambda f=filename: ag._analyze_image_ruleset(main_store, f))
+        for filename in ("tomato.jpg", "paddy_rust.png", "tomatto_leaf.jpg", "field.jpg", "potato.jpeg")
+    ])
+
+    if shards is not None and regional_store is not None:
+        compare("rank_districts (regional)", [
+            ((crop,),
+             lambda c=crop: ag.rank_districts(models, shards, c),
+             lambda c=crop: ag.rank_districts(models, regional_store, c))
+            for crop in (None, "Rice", "Wheat", "Cotton", "Paddy")
+        ], equal=close)
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""Test script for the compact dataset layout (compact_frame): answers must not change"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import agronity_test as ag
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+print("\n" + "="*80)
+print("DATA LAYOUT TEST")
+print("="*80 + "\n")
+
+models = ag.load_models(keras=False)
+data_df = ag.load_data()
+raw_df = pd.concat([pd.read_csv(os.path.join(ag.MODEL_DIR, name))
+                    for name in ("sihdatasets.csv", "corrected_soil_dataset.csv")], ignore_index=True)
+raw_df = raw_df.rename(columns={"Major_Crops": "crop"})
+
+# Numeric values are kept exactly; only the storage of names and integers shrinks
+floats = [c for c in ag.MAIN_DATA_COLUMNS if pd.api.types.is_float_dtype(raw_df[c])]
+check("float columns stay float64", all(data_df[c].dtype == np.float64 for c in floats),
+      f"{len(floats)} columns")
+check("numeric values equal the CSVs",
+      all(np.array_equal(data_df[c].to_numpy(dtype=np.float64), raw_df[c].to_numpy(dtype=np.float64), equal_nan=True)
+          for c in ag.MAIN_DATA_COLUMNS if c not in ag.CATEGORY_VOCABULARY))
+before, after = raw_df.memory_usage(deep=True).sum(), data_df.memory_usage(deep=True).sum()
+check("compact frame is smaller", after < before, f"{before / 1e6:.2f} MB → {after / 1e6:.2f} MB")
+
+# analyze_feasibility gives identical results on the raw and the compact frame,
+# for matched rows and for nearest-profile approximations alike. The nearest
+# profile search works on category codes, so the reference frame takes the
+# (lossless) categorical name columns and keeps the CSV's numeric dtypes.
+reference_df = raw_df[ag.MAIN_DATA_COLUMNS].astype({c: data_df[c].dtype for c in ag.CATEGORY_VOCABULARY
+                                                    if c in data_df.columns})
+districts = list(data_df["District"].cat.categories[:12]) + ["ariyalur", "Nowhere"]
+soils = list(data_df["Soil_Type"].cat.categories[:5]) + ["Moon"]
+crops = ["Rice", "Cotton", "Sugarcane"]
+total = differences = 0
+example = ""
+for district in districts:
+    for soil in soils:
+        for crop in crops:
+            for risk in (False, True):
+                args = (crop, district, 3, soil)
+                expected = ag.analyze_feasibility(models, reference_df, *args, risk=risk, explain=not risk)
+                actual = ag.analyze_feasibility(models, data_df, *args, risk=risk, explain=not risk)
+                total += 1
+                if expected != actual:
+                    differences += 1
+                    example = example or f"first: {args}"
+check("analyze_feasibility identical before and after compaction", differences == 0,
+      f"{total - differences}/{total} {example}")
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""Test script for the master-side reload under gunicorn (gunicorn.conf.py on_reload)"""
+
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+PORT = int(os.environ.get("RELOAD_TEST_PORT", "8791"))
+BASE_URL = f"http://127.0.0.1:{PORT}"
+TOKEN = "reload-test"
+PAYLOAD = {"crop": "Rice", "district": "Ariyalur", "area": 3, "soil": "Alluvial"}
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def worker_pids(requests_count=40):
+    """pids of the workers answering /models (each request lands on one of them)."""
+    return {requests.get(f"{BASE_URL}/models", timeout=10).json()["memory"]["process"]["pid"]
+            for _ in range(requests_count)}
+
+
+def wait_for(condition, timeout=180):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if condition():
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    return False
+
+
+print("\n" + "="*80)
+print("GUNICORN RELOAD TEST")
+print("="*80 + "\n")
+
+tmp = tempfile.mkdtemp()
+env = {**os.environ, "WEB_CONCURRENCY": "2", "AGRONITY_ADMIN_TOKEN": TOKEN, "AGRONITY_REQUEST_LOG": "",
+       "AGRONITY_JOBS_DB": os.path.join(tmp, "jobs.sqlite3"), "TF_CPP_MIN_LOG_LEVEL": "3"}
+log_path = os.path.join(tmp, "gunicorn.log")
+with open(log_path, "w") as log:
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{PORT}",
+                               "app:app"], cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+try:
+    started = wait_for(lambda: len(worker_pids()) == 2)
+    check("two workers serving", started)
+    if started:
+        before_pids = worker_pids()
+        before = requests.post(f"{BASE_URL}/analyze", json=PAYLOAD, timeout=30).json()
+
+        response = requests.post(f"{BASE_URL}/admin/reload", headers={"X-Admin-Token": TOKEN}, timeout=10)
+        check("reload accepted", response.status_code == 202 and response.json().get("scope") == "all workers",
+              str(response.status_code))
+
+        replaced = wait_for(lambda: len(worker_pids()) == 2 and not worker_pids() & before_pids)
+        check("every worker replaced after the master reload", replaced)
+        after = requests.post(f"{BASE_URL}/analyze", json=PAYLOAD, timeout=30).json()
+        check("answers unchanged across the reload", before == after)
+
+        with open(log_path) as f:
+            log_text = f.read()
+        check("master reloaded once", log_text.count("✓ Reloaded artifacts") == 1)
+        check("master logs how long it was blocked", "Master reload took" in log_text)
+finally:
+    server.send_signal(signal.SIGTERM)
+    server.wait(timeout=60)
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
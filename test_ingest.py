@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""Test script for dataset ingest (ingest_rows / sync_ingested) and the cross-process sync of the app"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+tmp = tempfile.mkdtemp()
+STORE = os.path.join(tmp, "ingested_rows.csv")
+os.environ["AGRONITY_INGEST_FILE"] = STORE
+os.environ["AGRONITY_JOBS_DB"] = os.path.join(tmp, "jobs.sqlite3")
+os.environ["AGRONITY_REQUEST_LOG"] = ""
+
+import numpy as np
+import pandas as pd
+
+import agronity_test as ag
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def same_frame(a, b):
+    """Same values, dtypes and categories (categoricals compared by value)."""
+    try:
+        pd.testing.assert_frame_equal(a.reset_index(drop=True), b.reset_index(drop=True), check_categorical=False)
+        return True
+    except AssertionError as e:
+        print(f"    {str(e).splitlines()[0]}")
+        return False
+
+
+def rows_like(n, **changes):
+    """`n` rows copied from the CSV with `changes` applied to every one."""
+    rows = pd.read_csv(os.path.join(ag.MODEL_DIR, "sihdatasets.csv"), nrows=n)[ag.INGEST_COLUMNS]
+    return [{**row, **changes} for row in rows.to_dict("records")]
+
+
+def analyses(data_df):
+    """
+    analyze_feasibility over matched and approximated pairs. Neighbour distances
+    are left out: an extended index keeps the standardization of the frame it
+    was built from until it is rebuilt (see PROFILE_PENDING_MAX).
+    """
+    results = [ag.analyze_feasibility(models, data_df, crop, district, 3, soil)
+               for district in ("Ariyalur", "Testpur", "Nowhere") for soil in ("Alluvial", "Black", "Moon")
+               for crop in ("Rice", "Cotton")]
+    for result in results:
+        for neighbour in result.get("neighbours", []):
+            neighbour.pop("distance")
+    return results
+
+
+print("\n" + "="*80)
+print("DATASET INGEST TEST")
+print("="*80 + "\n")
+
+models = ag.load_models(keras=False)
+base = ag.load_data()
+base_copy = base.copy(deep=True)
+base_dtypes = base.dtypes.to_dict()
+
+# Validation: nothing reaches the store unless every row is valid
+for rows, label in ((rows_like(2, pH_Level=15), "out-of-range pH"),
+                    (rows_like(1, District=" "), "empty district"),
+                    ([{"District": "Ariyalur"}], "missing columns"),
+                    ([], "no rows"),
+                    (rows_like(2) * (ag.INGEST_MAX_ROWS // 2 + 1), "too many rows")):
+    new_df, summary = ag.ingest_rows(base, rows)
+    check(f"rejects {label}", new_df is None and summary["accepted"] == 0 and summary["errors"],
+          str(summary["errors"][0])[:60])
+check("rejected rows are not stored", not os.path.exists(STORE) or os.path.getsize(STORE) == 0)
+
+# First ingest: a new district, a price beyond int8 and a fractional temperature
+first, summary = ag.ingest_rows(base, rows_like(3, District="Testpur", Mandi_Price_Rupees_per_kg=300) +
+                                rows_like(1, Avg_Temperature_C=31.5))
+check("accepts valid rows", first is not None and summary["accepted"] == 4 and len(first) == len(base) + 4,
+      f"{summary['rows']} rows")
+check("older snapshot unchanged", same_frame(base, base_copy) and base.dtypes.to_dict() == base_dtypes)
+check("integer column widened for a larger value",
+      first["Mandi_Price_Rupees_per_kg"].dtype == np.int16 and first["Mandi_Price_Rupees_per_kg"].iloc[-2] == 300,
+      f"{base_dtypes['Mandi_Price_Rupees_per_kg']} → {first['Mandi_Price_Rupees_per_kg'].dtype}")
+check("integer column widened to float64 for a fraction",
+      first["Avg_Temperature_C"].dtype == np.float64 and first["Avg_Temperature_C"].iloc[-1] == 31.5,
+      f"{base_dtypes['Avg_Temperature_C']} → {first['Avg_Temperature_C'].dtype}")
+check("new district gets a category", "Testpur" in first["District"].cat.categories and
+      (first["District"] == "Testpur").sum() == 3)
+check("frame equals a fresh load of CSVs + store", same_frame(first, ag.load_data()))
+check("indexes updated: answers equal a fresh load", analyses(first) == analyses(ag.load_data()))
+check("older snapshot answers unchanged", analyses(base) == analyses(base_copy))
+cached = [ag.frame_index(frame)[name] for frame in (base, first) for name in ("profiles", "district_means", "crop_spread")]
+check("cached index arrays are read-only", all(not array.flags.writeable for entry in cached
+                                               for array in entry.values() if isinstance(array, np.ndarray)))
+
+# Two snapshots extended from the same frame do not see each other's buffer space
+first_copy = first.copy(deep=True)
+second, _ = ag.ingest_rows(first, rows_like(2, Zinc_ppm=9.5))
+branch = ag.sync_ingested(base)
+check("appending again leaves the previous snapshot unchanged", same_frame(first, first_copy))
+check("an old snapshot syncs to the same rows in store order", same_frame(branch, second) and
+      same_frame(second, ag.load_data()))
+
+# Another process ingests into the same store; this one picks the rows up
+child = ("import agronity_test as ag\n"
+         "df = ag.load_data()\n"
+         "rows = __import__('pandas').read_csv('sihdatasets.csv', nrows=5)[ag.INGEST_COLUMNS].to_dict('records')\n"
+         "ag.ingest_rows(df, [{**r, 'District': 'Otherpur'} for r in rows])\n")
+env = {**os.environ, "TF_CPP_MIN_LOG_LEVEL": "3"}
+result = subprocess.run([sys.executable, "-c", child], cwd=ag.MODEL_DIR, env=env, capture_output=True, text=True)
+check("other process ingested", result.returncode == 0, result.stderr.strip().splitlines()[-1] if result.returncode else "")
+check("pending rows detected", ag.ingest_pending(second))
+synced = ag.sync_ingested(second)
+check("synced frame equals a fresh load", synced is not None and (synced["District"] == "Otherpur").sum() == 5 and
+      same_frame(synced, ag.load_data()))
+check("nothing pending after the sync", not ag.ingest_pending(synced) and ag.sync_ingested(synced) is None)
+
+# The app (one per gunicorn worker) syncs before its next request
+import app
+
+client = app.app.test_client()
+rows_before = client.get("/models").json["data_rows"]
+result = subprocess.run([sys.executable, "-c", child], cwd=ag.MODEL_DIR, env=env, capture_output=True, text=True)
+body = client.get("/models").json
+check("app serves rows another process ingested", result.returncode == 0 and body["data_rows"] == rows_before + 5 and
+      body["data_revision"] == ag.ingest_state(app.runtime["data_df"])["rows"], f"{rows_before} → {body['data_rows']}")
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""Test script for the background jobs (jobs.py) and the /jobs endpoints"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+tmp = tempfile.mkdtemp()
+os.environ["AGRONITY_JOBS_DB"] = os.path.join(tmp, "app_jobs.sqlite3")
+os.environ["AGRONITY_REQUEST_LOG"] = ""
+
+import jobs
+from app import app
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def wait_done(store, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    return store.get(job_id)
+
+
+print("\n" + "="*80)
+print("JOBS TEST")
+print("="*80 + "\n")
+
+# Chunked execution: every task runs exactly once and results keep task order
+calls = []
+store = jobs.JobStore(os.path.join(tmp, "jobs.sqlite3"))
+runner = jobs.JobRunner(store, lambda kind, tasks: calls.extend(tasks) or [{"double": t["n"] * 2} for t in tasks])
+runner.ensure_started()
+job_id = store.submit("test", [{"n": n} for n in range(130)], chunk_size=50)
+runner.notify()
+job = wait_done(store, job_id)
+results = store.results(job_id, 0, 1000)
+check("job completes in chunks", job["status"] == "done" and job["completed"] == 130, job["status"])
+check("each task runs once, results in order",
+      sorted(t["n"] for t in calls) == list(range(130)) and [r["double"] for r in results] == [n * 2 for n in range(130)])
+check("results are paged", [r["index"] for r in store.results(job_id, 120, 5)] == list(range(120, 125)))
+
+# A job whose worker stopped heartbeating is reclaimed and resumes after its last chunk
+job_id = store.submit("test", [{"n": n} for n in range(10)], chunk_size=5)
+store.claim("gone:1")
+store.complete_chunk(job_id, "gone:1", 0, [{"double": n * 2} for n in range(5)])
+with sqlite3.connect(store.path) as conn:
+    conn.execute("UPDATE jobs SET heartbeat = heartbeat - ? WHERE id = ?", (jobs.JOB_STALE_SECONDS + 1, job_id))
+calls.clear()
+runner.notify()
+job = wait_done(store, job_id)
+check("abandoned job resumed from its last chunk", job["status"] == "done" and
+      sorted(t["n"] for t in calls) == list(range(5, 10)), f"re-ran {len(calls)} tasks")
+check("stale owner can no longer commit", not store.complete_chunk(job_id, "gone:1", 5, [{}] * 5))
+
+# A chunk running longer than the stale window keeps its job through the heartbeat
+stale, heartbeat = jobs.JOB_STALE_SECONDS, jobs.JOB_HEARTBEAT_SECONDS
+jobs.JOB_STALE_SECONDS, jobs.JOB_HEARTBEAT_SECONDS = 0.6, 0.1
+slow_calls = []
+
+
+def slow(kind, tasks):
+    slow_calls.extend(tasks)
+    time.sleep(1.5)
+    return [{} for _ in tasks]
+
+
+slow_runner = jobs.JobRunner(jobs.JobStore(os.path.join(tmp, "slow_jobs.sqlite3")), slow, workers=2)
+slow_runner.ensure_started()
+job_id = slow_runner.store.submit("test", [{"n": n} for n in range(2)], chunk_size=2)
+slow_runner.notify()
+job = wait_done(slow_runner.store, job_id)
+check("long chunk is not reclaimed and run twice", job["status"] == "done" and len(slow_calls) == 2,
+      f"ran {len(slow_calls)} tasks")
+jobs.JOB_STALE_SECONDS, jobs.JOB_HEARTBEAT_SECONDS = stale, heartbeat
+
+# A database error while claiming is logged and retried, not fatal to the worker thread
+flaky_store = jobs.JobStore(os.path.join(tmp, "flaky_jobs.sqlite3"))
+claim = flaky_store.claim
+errors = [sqlite3.OperationalError("database is locked")] * 2
+
+
+def flaky_claim(owner):
+    if errors:
+        raise errors.pop()
+    return claim(owner)
+
+
+flaky_store.claim = flaky_claim
+flaky_runner = jobs.JobRunner(flaky_store, lambda kind, tasks: [{} for _ in tasks], workers=1)
+flaky_runner.ensure_started()
+job_id = flaky_store.submit("test", [{"n": 1}])
+flaky_runner.notify()
+job = wait_done(flaky_store, job_id)
+check("worker survives database errors while claiming", job["status"] == "done" and not errors)
+job_id = flaky_store.submit("test", [{"n": 2}])
+flaky_runner.notify()
+check("the same worker thread runs later jobs", wait_done(flaky_store, job_id)["status"] == "done")
+
+# A failing task batch fails the job with the error
+failing_runner = jobs.JobRunner(jobs.JobStore(os.path.join(tmp, "failing_jobs.sqlite3")),
+                                lambda kind, tasks: 1 / 0, workers=1)
+failing_runner.ensure_started()
+job_id = failing_runner.store.submit("test", [{"n": 1}])
+failing_runner.notify()
+job = wait_done(failing_runner.store, job_id)
+check("failing execute marks the job failed", job["status"] == "failed" and "ZeroDivisionError" in job["error"],
+      str(job["error"]))
+
+# /jobs: the results equal one /analyze call per task
+client = app.test_client()
+tasks = [
+    {"crop": "Rice", "district": "Ariyalur", "area": 3, "soil": "Alluvial"},
+    {"crop": "Cotton", "district": "Nowhere", "area": 2, "soil": "Black", "risk": True},
+    {"crop": "Sugarcane", "district": "ariyalur", "area": 5, "soil": "Red", "explain": True},
+    {"crop": "Rice", "district": "Ariyalur", "area": 3},
+    {"crop": "Rice", "district": "Ariyalur", "area": 3, "soil": "Alluvial", "risk": "yes"},
+]
+response = client.post("/jobs", json={"kind": "feasibility", "tasks": tasks})
+check("POST /jobs queues the job", response.status_code == 202 and response.json["total"] == len(tasks),
+      str(response.status_code))
+job_id = response.json["job_id"]
+deadline = time.monotonic() + 60
+while time.monotonic() < deadline and client.get(f"/jobs/{job_id}").json["status"] not in ("done", "failed"):
+    time.sleep(0.1)
+body = client.get(f"/jobs/{job_id}").json
+check("job finishes", body["status"] == "done" and body["progress"] == 1.0, body["status"])
+expected = [client.post("/analyze", json=task).json for task in tasks[:3]]
+check("results equal /analyze per task",
+      [{k: v for k, v in r.items() if k != "index"} for r in body["results"][:3]] == expected)
+check("missing field is a per-task error", body["results"][3].get("error", "").startswith("Missing required fields"))
+check("non-boolean flag is a per-task error", body["results"][4].get("error") == "risk must be true or false")
+
+page = client.get(f"/jobs/{job_id}?offset=1&limit=2").json
+check("GET /jobs pages results", [r["index"] for r in page["results"]] == [1, 2] and page["next_offset"] == 3)
+check("unknown job is 404", client.get("/jobs/nope").status_code == 404)
+for payload, label in (({"kind": "x", "tasks": tasks}, "unknown kind"), ({"kind": "image", "tasks": []}, "no tasks"),
+                       ({"kind": "image", "tasks": ["a.jpg"]}, "tasks not objects")):
+    check(f"POST /jobs rejects {label}", client.post("/jobs", json=payload).status_code == 400)
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
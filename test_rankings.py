@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""Test script for the regional district rankings (rank_districts, GET /rankings)"""
+
+import math
+import os
+import sys
+import tempfile
+
+tmp = tempfile.mkdtemp()
+os.environ["AGRONITY_JOBS_DB"] = os.path.join(tmp, "jobs.sqlite3")
+os.environ["AGRONITY_REQUEST_LOG"] = ""
+
+import agronity_test as ag
+import app
+
+success_count = 0
+fail_count = 0
+
+SCORES = ["feasibility_score", "productivity_score", "profit_loss_percent"]
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def get(**query):
+    return client.get("/rankings", query_string=query)
+
+
+print("\n" + "="*80)
+print("DISTRICT RANKINGS TEST")
+print("="*80 + "\n")
+
+client = app.app.test_client()
+regional = app.runtime["agri_ml_data_df"]
+models = app.runtime["models"]
+crops = sorted({crop for state in regional.files for crop in regional.shard(state)["Major_Crops"].astype(str)})
+
+# The grouped pass gives what a single-district agri_ml analysis gives, district by district
+# (scored without the model itself, which only the explanation needs)
+single_models = {"agri_ml": {"model": None, "encoders": None, "numeric_cols": ag._agri_ml_numeric_cols(models)}}
+for crop in [None, crops[0]]:
+    ranked = ag.rank_districts(models, regional, crop)["districts"]
+    mismatches = []
+    for entry in ranked:
+        single = ag._analyze_feasibility_agri_ml(single_models, regional, crop, entry["district"], 3, None)
+        if single["feasible"] != entry["feasible"] or \
+                any(not math.isclose(single[s], entry[s], rel_tol=1e-9, abs_tol=1e-9) for s in SCORES):
+            mismatches.append(entry["district"])
+    check(f"crop {crop}: scores equal single-district analyses", not mismatches,
+          f"{len(ranked)} districts, mismatches {mismatches[:3]}")
+
+# Default: every district, by profit/loss, highest first
+body = get(limit=app.RANKINGS_PAGE_MAX).json
+everything = ag.rank_districts(models, regional)["districts"]
+check("default lists every district", body["total"] == len(everything) and len(body["districts"]) == len(everything),
+      f"{body['total']} districts")
+check("default order is profit_loss_percent descending", body["sort"] == "profit_loss_percent" and
+      body["districts"] == sorted(everything, key=lambda d: d["profit_loss_percent"], reverse=True))
+check("version is the loaded dataset version", body["version"] == app.runtime["version"])
+
+for sort_key in app.RANKING_SORT_KEYS:
+    for order in ("asc", "desc"):
+        page = get(sort=sort_key, order=order, limit=app.RANKINGS_PAGE_MAX).json["districts"]
+        keys = [d[sort_key] for d in page]
+        check(f"sort={sort_key} order={order}", keys == sorted(keys, reverse=(order == "desc")) and
+              len(page) == len(everything))
+check("district sort defaults to ascending", get(sort="district").json["order"] == "asc")
+
+# Pages stitch back into the full list
+pages, offset = [], 0
+while True:
+    page = get(sort="district", offset=offset, limit=7).json
+    if not page["districts"]:
+        break
+    pages += page["districts"]
+    offset += 7
+full = get(sort="district", limit=app.RANKINGS_PAGE_MAX).json["districts"]
+check("pages of 7 concatenate to the full list", pages == full, f"{len(pages)} districts")
+check("limit is capped and at least one", get(limit=100000).json["limit"] == app.RANKINGS_PAGE_MAX and
+      len(get(limit=0).json["districts"]) == 1)
+check("negative offset starts at the beginning", get(offset=-5, sort="district").json["districts"] == full[:50])
+
+# State filter: each district listed under every state that has it
+totals = 0
+for state in regional.files:
+    listed = get(state=state.upper(), limit=app.RANKINGS_PAGE_MAX).json
+    totals += listed["total"]
+    check(f"state {state}: only its districts (case-insensitive)", listed["total"] > 0 and
+          all(state in d["states"] for d in listed["districts"]), f"{listed['total']} districts")
+check("states cover every district", totals >= len(everything))
+check("unknown state lists nothing", get(state="Atlantis").json["total"] == 0)
+
+# Crop filter
+for crop in crops[:3]:
+    listed = get(crop=crop.lower(), sort="district", limit=app.RANKINGS_PAGE_MAX).json
+    expected = sorted(ag.rank_districts(models, regional, crop)["districts"], key=lambda d: d["district"])
+    check(f"crop {crop}: equals rank_districts", listed["crop"].lower() == crop.lower() and listed["districts"] == expected and
+          any(d["crop_matched"] for d in expected), f"{sum(d['crop_matched'] for d in expected)} matched")
+check("unknown crop is a 400", get(crop="Moonberry").status_code == 400)
+
+for query, label in (({"sort": "rows"}, "unknown sort"), ({"order": "up"}, "unknown order"),
+                     ({"offset": "x"}, "non-integer offset"), ({"limit": "1.5"}, "non-integer limit")):
+    response = get(**query)
+    check(f"rejects {label}", response.status_code == 400 and "error" in response.json, str(response.status_code))
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Test script for the top-k crop recommendations (POST /recommend)"""
+
+import os
+import sys
+import tempfile
+
+tmp = tempfile.mkdtemp()
+os.environ["AGRONITY_JOBS_DB"] = os.path.join(tmp, "jobs.sqlite3")
+os.environ["AGRONITY_REQUEST_LOG"] = ""
+
+import app
+
+success_count = 0
+fail_count = 0
+
+# Figures /analyze reports for a feasible crop, under the same names in /recommend
+FEASIBLE_FIELDS = ["probability", "expected_yield_tpha", "yield_percentage", "profit_rs", "total_revenue_rs",
+                   "revenue_1yr_rs", "revenue_2yr_rs"]
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def ranked(entries, rank_by):
+    """Feasible crops first by `rank_by` (ties by probability), then the rest by probability."""
+    key = "profit_rs" if rank_by == "profit" else "probability"
+    return sorted(entries, key=lambda e: (not e["feasible"], -(e[key] if e["feasible"] else 0), -e["probability"]))
+
+
+print("\n" + "="*80)
+print("CROP RECOMMENDATION TEST")
+print("="*80 + "\n")
+
+client = app.app.test_client()
+data_df = app.runtime["data_df"]
+pairs = list(data_df[["District", "Soil_Type"]].drop_duplicates().astype(str).itertuples(index=False, name=None))[:25]
+pairs += [("Nowhere", "Alluvial"), ("ariyalur", "alluvial")]
+
+mismatches, misordered, feasible_seen = [], [], 0
+for district, soil in pairs:
+    for rank_by in ("profit", "probability"):
+        body = client.post("/recommend", json={"district": district, "area": 3, "soil": soil, "top_k": 100,
+                                                "rank_by": rank_by}).json
+        entries = body["recommendations"]
+        if [e["crop"] for e in entries] != [e["crop"] for e in ranked(entries, rank_by)] or \
+                len(entries) != body["crops_scored"]:
+            misordered.append((district, soil, rank_by))
+        if rank_by != "profit":
+            continue
+        for entry in entries:
+            analysis = client.post("/analyze", json={"crop": entry["crop"], "district": district, "area": 3,
+                                                     "soil": soil}).json
+            feasible_seen += analysis["feasible"]
+            same = analysis["feasible"] == entry["feasible"]
+            if same and analysis["feasible"]:
+                same = all(analysis[field] == entry[field] for field in FEASIBLE_FIELDS) and \
+                    analysis["mandi_price_rs_per_quintal"] == body["mandi_price_rs_per_quintal"]
+            if same:
+                same = analysis.get("neighbours") == body.get("neighbours")
+            if not same:
+                mismatches.append((district, soil, entry["crop"]))
+
+check("every crop ranked: feasible first, by profit / probability", not misordered, str(misordered[:2]))
+check("each recommendation equals /analyze for that crop", not mismatches,
+      f"{feasible_seen} feasible crops compared {mismatches[:2]}")
+
+district, soil = pairs[0]
+full = client.post("/recommend", json={"district": district, "area": 3, "soil": soil, "top_k": 100}).json
+top = client.post("/recommend", json={"district": district, "area": 3, "soil": soil, "top_k": 3}).json
+check("top_k returns the head of the full ranking", top["recommendations"] == full["recommendations"][:3])
+default = client.post("/recommend", json={"district": district, "area": 3, "soil": soil}).json
+check("default top_k is 5", len(default["recommendations"]) == min(5, full["crops_scored"]))
+
+misspelled = client.post("/recommend", json={"district": district[:-1] + "x", "area": 3, "soil": soil}).json
+check("misspelled district is resolved", misspelled.get("district") == district and
+      "District" in misspelled["resolved_inputs"], str(misspelled.get("resolved_inputs"))[:50])
+
+for payload, label in (({"district": district, "area": 3}, "missing soil"),
+                       ({"district": district, "area": 3, "soil": soil, "rank_by": "yield"}, "unknown rank_by"),
+                       ({"district": district, "area": 3, "soil": soil, "top_k": "many"}, "non-integer top_k")):
+    response = client.post("/recommend", json=payload)
+    check(f"rejects {label}", response.status_code == 400 and "error" in response.json,
+          str(response.status_code))
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
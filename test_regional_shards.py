@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Test script for the lazily loaded regional shards (RegionalShards) behind the agri_ml paths"""
+
+import sys
+import threading
+
+import agronity_test as ag
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+print("\n" + "="*80)
+print("REGIONAL SHARDS TEST")
+print("="*80 + "\n")
+
+shards = ag.load_regional_shards()
+if shards is None:
+    print("✗ Regional datasets not found; nothing to test")
+    sys.exit(1)
+models = {"agri_ml": None}
+columns = [c for c in ag._regional_data_columns()[1] or [] if c in shards.columns][:6]
+crops = sorted({crop for state in shards.files for crop in shards.shard(state)["Major_Crops"].astype(str)})
+
+# Cached group sums give exactly what a groupby over the shard frames gives
+for crop in [None, crops[0].lower()] + crops:
+    expected = ag._combine_group_sums([ag._district_group_sums(shards.shard(state), columns, crop)
+                                       for state in shards.files])
+    actual = shards.district_sums(columns, crop)
+    check(f"district sums, crop {crop}", all(a.sort_index().equals(b.sort_index()) for a, b in zip(expected, actual)),
+          f"{len(actual[2])} districts")
+
+# With a cache smaller than all shards, rankings do not reload evicted shards
+small = ag.RegionalShards(cache_mb=1.5)
+rankings = {crop: ag.rank_districts(models, small, crop) for crop in [None] + crops}
+loads = small.stats()["loads"]
+for crop in [None] + crops:
+    ag.rank_districts(models, small, crop)
+check("rankings load each shard once", loads == len(small.files) and small.stats()["loads"] == loads,
+      f"{small.stats()['loads']} loads, {small.stats()['evictions']} evictions")
+check("rankings equal those over a cache holding every shard",
+      all(rankings[crop] == ag.rank_districts(models, shards, crop) for crop in rankings))
+
+# Concurrent cold loads read each state once; other states are not blocked
+concurrent = ag.RegionalShards()
+frames = []
+threads = [threading.Thread(target=lambda s=state: frames.append((s, concurrent.shard(s))))
+           for state in list(concurrent.files) * 4]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+stats = concurrent.stats()
+check("each state read once under concurrent first use", stats["loads"] == len(concurrent.files) and
+      stats["hits"] == len(threads) - len(concurrent.files), f"{stats['loads']} loads, {stats['hits']} hits")
+check("waiting threads get the loaded frame",
+      all(frame is concurrent.shard(state) for state, frame in frames))
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
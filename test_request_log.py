@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""Test script for the buffered request log (request_log.py): batching, shared writers and rotation"""
+
+import glob
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from request_log import LIST_MAX_ITEMS, RequestLog
+
+success_count = 0
+fail_count = 0
+
+# One writer process: argv = path, writer id, records, max_bytes, backups
+WRITER = """
+import sys
+from request_log import RequestLog
+path, writer, n, max_bytes, backups = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), int(sys.argv[5])
+log = RequestLog(path, batch_size=50, flush_seconds=0.05, max_bytes=max_bytes, backups=backups)
+for seq in range(n):
+    log.log({"writer": writer, "seq": seq, "request": {"pad": "x" * 100}})
+log.close(timeout=60)
+print(log.stats()["written"], log.stats()["dropped"])
+"""
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def read_lines(path):
+    """Lines of the log and its backups, oldest first (backup N is the oldest)."""
+    backups = sorted(glob.glob(f"{path}.[0-9]*"), key=lambda p: int(p[len(path) + 1:].split(".")[0]), reverse=True)
+    lines = []
+    for name in backups + ([path] if os.path.exists(path) else []):
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(name, "rt") as f:
+            lines += f.read().splitlines()
+    return lines
+
+
+print("\n" + "="*80)
+print("REQUEST LOG TEST")
+print("="*80 + "\n")
+
+tmp = tempfile.mkdtemp()
+
+# Records arriving together are written in batches of batch_size, in order
+path = os.path.join(tmp, "batched.jsonl")
+log = RequestLog(path, batch_size=500, flush_seconds=0.5)
+for seq in range(1200):
+    log.log({"seq": seq})
+log.close()
+records = [json.loads(line) for line in read_lines(path)]
+stats = log.stats()
+check("every record written once, in order", [r["seq"] for r in records] == list(range(1200)) and
+      stats["written"] == 1200 and stats["dropped"] == 0)
+check("records grouped into batch_size batches", stats["batches"] == 3, f"{stats['batches']} batches")
+
+# A lone record is flushed after flush_seconds without waiting for a full batch
+path = os.path.join(tmp, "lone.jsonl")
+log = RequestLog(path, batch_size=500, flush_seconds=0.2)
+started = time.monotonic()
+log.log({"seq": 0})
+while not os.path.exists(path) and time.monotonic() - started < 5:
+    time.sleep(0.02)
+check("lone record flushed after flush_seconds", os.path.exists(path) and time.monotonic() - started < 2,
+      f"{time.monotonic() - started:.2f} s")
+log.close()
+
+# Request and response bodies are compacted
+log = RequestLog(os.path.join(tmp, "compact.jsonl"), flush_seconds=0.05)
+log.log({"request": {"tasks": list(range(LIST_MAX_ITEMS + 1)), "crop": "Rice"}, "body": b'{"feasible": true}'})
+log.log({"request": None, "body": b"<html>"})
+log.log({"request": None, "body": b" " * (64 * 1024 + 1)})
+log.close()
+first, second, third = (json.loads(line) for line in read_lines(log.path))
+check("long lists logged by length", first["request"] == {"tasks": {"items": LIST_MAX_ITEMS + 1}, "crop": "Rice"})
+check("JSON body becomes the outcome", first["outcome"] == {"feasible": True} and "body" not in first)
+check("non-JSON and large bodies logged by size", second["outcome"] == {"bytes": 6} and
+      third["outcome"] == {"bytes": 64 * 1024 + 1})
+
+# A full queue drops records instead of blocking the caller
+release = threading.Event()
+
+
+def slow_dumps(value):
+    release.wait()
+    return json.dumps(value)
+
+
+log = RequestLog(os.path.join(tmp, "full.jsonl"), max_queue=5, batch_size=1, flush_seconds=0.01, dumps=slow_dumps)
+started = time.monotonic()
+for seq in range(50):
+    log.log({"seq": seq})
+elapsed = time.monotonic() - started
+release.set()
+log.close()
+stats = log.stats()
+check("full queue drops records without blocking", elapsed < 0.5 and stats["dropped"] > 0 and
+      stats["written"] + stats["dropped"] == 50, f"{stats['written']} written, {stats['dropped']} dropped")
+
+# Rotation: at max_bytes the file moves to .1, .1 to .2, and the oldest beyond `backups` goes
+path = os.path.join(tmp, "rotated.jsonl")
+log = RequestLog(path, batch_size=10, flush_seconds=0.01, max_bytes=2000, backups=2)
+for seq in range(300):
+    log.log({"seq": seq, "request": {"pad": "x" * 50}})
+log.close()
+records = [json.loads(line) for line in read_lines(path)]
+seqs = [r["seq"] for r in records]
+check("only `backups` rotated files are kept", not os.path.exists(f"{path}.3") and os.path.exists(f"{path}.2") and
+      log.stats()["rotations"] > 2, f"{log.stats()['rotations']} rotations")
+check("kept files hold the newest records in order", seqs == list(range(300 - len(seqs), 300)),
+      f"{len(seqs)} records kept")
+# A file is rotated after the batch (10 records of < 100 bytes) that takes it past max_bytes
+check("each file rotated at max_bytes", all(os.path.getsize(f"{path}.{n}") < 2000 + 10 * 100 for n in (1, 2)))
+
+path = os.path.join(tmp, "compressed.jsonl")
+log = RequestLog(path, batch_size=10, flush_seconds=0.01, max_bytes=2000, backups=3, compress=True)
+for seq in range(100):
+    log.log({"seq": seq, "request": {"pad": "x" * 50}})
+log.close()
+check("compressed backups are gzip and complete", os.path.exists(f"{path}.1.gz") and
+      [json.loads(line)["seq"] for line in read_lines(path)][-1] == 99 and not glob.glob(f"{path}*.tmp"))
+
+# Several processes share one file: lines never interleave, and rotation happens once per threshold
+path = os.path.join(tmp, "shared.jsonl")
+writers, per_writer = 4, 2000
+processes = [subprocess.Popen([sys.executable, "-c", WRITER, path, str(w), str(per_writer), str(200 * 1024), "50"],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, text=True)
+             for w in range(writers)]
+outputs = [p.communicate(timeout=120)[0].split() for p in processes]
+lines = read_lines(path)
+try:
+    records = [json.loads(line) for line in lines]
+    whole = True
+except ValueError:
+    records, whole = [], False
+check("every line from every process is whole JSON", whole and len(lines) == writers * per_writer,
+      f"{len(lines)} lines, written {[o[0] for o in outputs]}")
+by_writer = {}
+for record in records:
+    by_writer.setdefault(record["writer"], []).append(record["seq"])
+check("each process's records in order across rotated files",
+      all(seqs == list(range(per_writer)) for seqs in by_writer.values()) and len(by_writer) == writers)
+sizes = [os.path.getsize(name) for name in glob.glob(f"{path}.[0-9]*")]
+check("shared rotation: no tiny files from racing writers", sizes and min(sizes) >= 200 * 1024,
+      f"{len(sizes)} backups")
+
+# After a fork the child gets its own writer thread and queue
+path = os.path.join(tmp, "forked.jsonl")
+log = RequestLog(path, flush_seconds=0.05)
+log.log({"who": "parent"})
+pid = os.fork()
+if pid == 0:
+    log.log({"who": "child"})
+    log.close()
+    os._exit(0)
+os.waitpid(pid, 0)
+log.close()
+check("forked child writes through its own thread", sorted(json.loads(line)["who"] for line in read_lines(path)) ==
+      ["child", "parent"])
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Test script for risk mode: the Monte Carlo profit distribution (simulate_profit, /analyze "risk")"""
+
+import math
+import os
+import sys
+import tempfile
+
+tmp = tempfile.mkdtemp()
+os.environ["AGRONITY_JOBS_DB"] = os.path.join(tmp, "jobs.sqlite3")
+os.environ["AGRONITY_REQUEST_LOG"] = ""
+
+import numpy as np
+
+import agronity_test as ag
+import app
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def standard_error(risk):
+    return risk["profit_std_rs"] / math.sqrt(risk["simulations"])
+
+
+print("\n" + "="*80)
+print("RISK MODE TEST")
+print("="*80 + "\n")
+
+client = app.app.test_client()
+data_df = app.runtime["data_df"]
+pairs = list(data_df[["District", "Soil_Type"]].drop_duplicates().astype(str).itertuples(index=False, name=None))[:10]
+requests_ = [{"crop": crop, "district": district, "area": 3, "soil": soil}
+             for district, soil in pairs for crop in ("Paddy", "Cotton", "Maize", "Rice")]
+
+results = [(payload, client.post("/analyze", json={**payload, "risk": True}).json) for payload in requests_]
+feasible = [(payload, result) for payload, result in results if result["feasible"]]
+check("some requests are feasible", len(feasible) > 0, f"{len(feasible)} of {len(results)}")
+
+check("risk only on feasible results",
+      all(("risk" in result) == result["feasible"] for _, result in results))
+check("identical requests get identical distributions",
+      all(client.post("/analyze", json={**payload, "risk": True}).json == result for payload, result in feasible[:5]))
+plain = [client.post("/analyze", json=payload).json for payload, _ in results]
+check("risk leaves the other fields unchanged",
+      all({k: v for k, v in result.items() if k != "risk"} == other for (_, result), other in zip(results, plain)) and
+      not any("risk" in other for other in plain))
+
+risks = [result["risk"] for _, result in feasible]
+check("simulation mean matches profit_rs",
+      all(abs(risk["expected_profit_rs"] - result["profit_rs"]) <= 5 * standard_error(risk) for (_, result), risk in
+          zip(feasible, risks)), f"{feasible[0][1]['profit_rs']:.0f} vs {risks[0]['expected_profit_rs']:.0f}")
+ordered = [[r["profit_percentiles_rs"][f"p{p}"] for p in ag.RISK_PERCENTILES] for r in risks]
+check("percentiles increase", all(values == sorted(values) for values in ordered))
+check("probability of loss agrees with the percentiles",
+      all((r["profit_percentiles_rs"]["p5"] >= 0 or r["probability_of_loss"] >= 0.05) and
+          (r["profit_percentiles_rs"]["p95"] >= 0 or r["probability_of_loss"] >= 0.95) for r in risks))
+
+# Coefficients of variation are the crop's spread in the dataset
+crop = feasible[0][0]["crop"]
+rows = data_df[data_df["crop"].astype(str).str.lower() == crop.lower()]
+price, production = (rows[c].to_numpy(dtype=np.float64)
+                     for c in ("Mandi_Price_Rupees_per_kg", "Crop_Production_Rate_Yearly"))
+check("price and yield CVs come from the crop's rows",
+      math.isclose(risks[0]["price_cv"], price.std() / price.mean(), rel_tol=1e-9) and
+      math.isclose(risks[0]["yield_cv"], production.std() / production.mean(), rel_tol=1e-9),
+      f"{crop}: {risks[0]['price_cv']:.3f}, {risks[0]['yield_cv']:.3f}")
+
+# simulate_profit directly, with a yield large enough for revenue to matter
+large = ag.simulate_profit(data_df, crop, 8.0, 25, 3)
+deterministic = ag.estimate_profit(8.0, 25, 3)["profit"]
+check("yield clipping only lowers the mean profit",
+      large["expected_profit_rs"] <= deterministic + 5 * standard_error(large), f"{deterministic:.0f} vs {large['expected_profit_rs']:.0f}")
+idle = ag.simulate_profit(data_df, crop, 0.0, 25, 3)
+check("zero yield: the loss is the cultivation cost", idle["probability_of_loss"] == 1.0 and
+      abs(idle["expected_profit_rs"] + 3 * ag.DEFAULT_COST_PER_HA) <= 5 * standard_error(idle))
+double = ag.simulate_profit(data_df, crop, 8.0, 25, 6, seed=7)
+single = ag.simulate_profit(data_df, crop, 8.0, 25, 3, seed=7)
+check("same seed: profit scales with area", all(math.isclose(double["profit_percentiles_rs"][p],
+                                                             2 * single["profit_percentiles_rs"][p], rel_tol=1e-9)
+                                                for p in single["profit_percentiles_rs"]))
+
+for value in ("yes", 1, None):
+    response = client.post("/analyze", json={**requests_[0], "risk": value})
+    check(f"rejects risk={value!r}", response.status_code == 400 and
+          response.json.get("error") == "risk must be true or false", str(response.status_code))
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""Test script for the per-feature attributions of the tree models (tree_explain.py)"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import (ExtraTreesClassifier, GradientBoostingClassifier, GradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+import agronity_test as ag
+from tree_explain import TreeExplainer
+
+TOLERANCE = 1e-9
+rng = np.random.default_rng(7)
+
+success_count = 0
+fail_count = 0
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def expected_prediction(model, x, output):
+    """
+    Brute force: walks every tree recursively, following both children of a
+    split on a NaN feature weighted by their training samples.
+    """
+    trees = model.estimators_ if hasattr(model, "estimators_") else [model]
+
+    def walk(tree, node, weight):
+        structure = tree.tree_
+        left, right = structure.children_left[node], structure.children_right[node]
+        if left < 0:
+            return weight * output(structure.value[node])
+        value = x[structure.feature[node]]
+        if np.isnan(value):
+            cover = structure.weighted_n_node_samples
+            return (walk(tree, left, weight * cover[left] / cover[node])
+                    + walk(tree, right, weight * cover[right] / cover[node]))
+        return walk(tree, left if value <= structure.threshold[node] else right, weight)
+
+    return np.mean([walk(tree, 0, 1.0) for tree in trees])
+
+
+print("\n" + "="*80)
+print("TREE EXPLANATION TEST")
+print("="*80 + "\n")
+
+# Complete rows: base + contributions reproduces the model output exactly
+X = rng.normal(size=(400, 6)).astype(np.float32)
+y_class = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+y_reg = X[:, 0] * 3 + np.sin(X[:, 3])
+y_multi = np.column_stack([y_reg, X[:, 4] - X[:, 5]])
+X_test = rng.normal(size=(50, 6)).astype(np.float32)
+
+cases = [
+    ("RandomForestClassifier", RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y_class),
+     lambda m, X: m.predict_proba(X)[:, 1]),
+    ("ExtraTreesClassifier", ExtraTreesClassifier(n_estimators=20, random_state=0).fit(X, y_class),
+     lambda m, X: m.predict_proba(X)[:, 1]),
+    ("DecisionTreeClassifier", DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y_class),
+     lambda m, X: m.predict_proba(X)[:, 1]),
+    ("GradientBoostingClassifier (log-odds)", GradientBoostingClassifier(n_estimators=30, random_state=0).fit(X, y_class),
+     lambda m, X: m.decision_function(X)),
+    ("RandomForestRegressor (two outputs)", RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y_multi),
+     lambda m, X: m.predict(X).mean(axis=1)),
+    ("DecisionTreeRegressor", DecisionTreeRegressor(max_depth=8, random_state=0).fit(X, y_reg),
+     lambda m, X: m.predict(X)),
+    ("GradientBoostingRegressor", GradientBoostingRegressor(n_estimators=30, random_state=0).fit(X, y_reg),
+     lambda m, X: m.predict(X)),
+]
+for name, model, predict in cases:
+    explainer = TreeExplainer(model)
+    base, contributions = explainer.explain(X_test)
+    error = np.abs(base + contributions.sum(axis=1) - predict(model, X_test)).max()
+    single = max(abs(b[0] + c.sum() - p) for b, c, p in
+                 ((*explainer.explain(x), p) for x, p in zip(X_test[:10], predict(model, X_test[:10]))))
+    check(f"{name}: batch and single rows", max(error, single) <= TOLERANCE, f"max error {max(error, single):.1e}")
+
+# Rows with unknown (NaN) features: the expected prediction over the unknown ones
+forest = cases[0][1]
+explainer = TreeExplainer(forest)
+for unknown in ([1], [0, 4], [1, 2, 3, 5]):
+    x = X_test[0].copy()
+    x[unknown] = np.nan
+    base, contributions = explainer.explain(x)
+    expected = expected_prediction(forest, x, lambda value: value[0, 1] / value[0].sum())
+    error = abs(base[0] + contributions.sum() - expected)
+    check(f"RandomForestClassifier, features {unknown} unknown", error <= TOLERANCE and
+          np.all(contributions[0, unknown] == 0), f"error {error:.1e}")
+regressor = cases[4][1]
+x = X_test[1].copy()
+x[[0, 3]] = np.nan
+base, contributions = TreeExplainer(regressor).explain(x)
+expected = expected_prediction(regressor, x, lambda value: value[:, 0].mean())
+error = abs(base[0] + contributions.sum() - expected)
+check("RandomForestRegressor (two outputs), features [0, 3] unknown", error <= TOLERANCE, f"error {error:.1e}")
+try:
+    TreeExplainer(cases[3][1]).explain(x)
+    check("GradientBoostingClassifier rejects unknown features", False)
+except ValueError:
+    check("GradientBoostingClassifier rejects unknown features", True)
+
+# sklearn path: one-hot columns are reported against their input column
+frame = pd.DataFrame({
+    "crop": rng.choice(["Rice", "Wheat", "Maize"], 400),
+    "soil": rng.choice(["Alluvial", "Black", "Red"], 400),
+    "rain": rng.normal(900, 200, 400),
+    "area": rng.uniform(1, 10, 400),
+})
+target = ((frame["crop"] == "Rice") & (frame["rain"] > 850) | (frame["soil"] == "Black")).astype(int)
+preprocessor = ColumnTransformer([
+    ("cat", Pipeline([("onehot", OneHotEncoder(handle_unknown="ignore"))]), ["crop", "soil"]),
+    ("num", StandardScaler(), ["rain", "area"]),
+]).fit(frame)
+clf = RandomForestClassifier(n_estimators=20, random_state=0).fit(preprocessor.transform(frame), target)
+models = {"sklearn": {"preprocessor": preprocessor, "clf": clf, "reg": None}}
+groups = ag._preprocessor_feature_groups(models)
+row = frame.iloc[[3]]
+explanation = ag._explain_row(ag._tree_explainer(models, "clf"), preprocessor.transform(row), groups,
+                              row.iloc[0].to_dict())
+error = abs(explanation["prediction"] - clf.predict_proba(preprocessor.transform(row))[0, 1])
+features = sorted(c["feature"] for c in explanation["contributions"])
+check("_explain_row groups one-hot columns by input", features == ["area", "crop", "rain", "soil"] and
+      error <= TOLERANCE, f"error {error:.1e}")
+check("explainer state kept on the models snapshot",
+      ag._tree_explainer(models, "clf") is models["explainers"]["clf"] and
+      ag._preprocessor_feature_groups(models) is groups and not groups[1].flags.writeable)
+
+# agri_ml path: a forest over label-encoded categoricals predicting the regional numeric means
+regional = pd.DataFrame({
+    "District": rng.choice(["Ludhiana", "Amritsar", "Madurai", "Salem"], 600),
+    "Major_Crops": rng.choice(["Rice", "Wheat", "Cotton"], 600),
+    "Soil_Type": rng.choice(["Alluvial", "Loamy", "Clay"], 600),
+})
+encoders = {column: LabelEncoder().fit(regional[column]) for column in regional.columns}
+encoded = pd.DataFrame({column: encoders[column].transform(regional[column]) for column in regional.columns})
+outputs = np.column_stack([encoded["District"] * 2.0 + encoded["Major_Crops"], encoded["Soil_Type"] * 1.5])
+outputs = outputs + rng.normal(0, 0.1, outputs.shape)
+agri_ml = {"model": RandomForestRegressor(n_estimators=20, random_state=0).fit(encoded, outputs), "encoders": encoders}
+models = {"agri_ml": agri_ml}
+
+inputs = {"District": "Salem", "Major_Crops": "Wheat", "Soil_Type": "Clay"}
+explanation = ag._explain_agri_ml(models, inputs)
+x_full = pd.DataFrame([{column: encoders[column].transform([inputs[column]])[0] for column in encoders}])
+error = abs(explanation["prediction"] - agri_ml["model"].predict(x_full).mean())
+check("_explain_agri_ml, all inputs known", explanation["marginalized"] == [] and error <= TOLERANCE,
+      f"error {error:.1e}")
+
+partial = {"District": "Salem", "Major_Crops": "Mango"}  # unknown crop, no soil given
+explanation = ag._explain_agri_ml(models, partial)
+x = np.array([encoders["District"].transform(["Salem"])[0], np.nan, np.nan], dtype=np.float32)
+expected = expected_prediction(agri_ml["model"], x, lambda value: value[:, 0].mean())
+error = abs(explanation["prediction"] - expected)
+check("_explain_agri_ml, unknown and missing inputs marginalized",
+      explanation["marginalized"] == ["Major_Crops", "Soil_Type"] and error <= TOLERANCE, f"error {error:.1e}")
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""Test script for the what-if response surfaces (whatif_sweep, POST /whatif)"""
+
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+tmp = tempfile.mkdtemp()
+os.environ["AGRONITY_JOBS_DB"] = os.path.join(tmp, "jobs.sqlite3")
+os.environ["AGRONITY_REQUEST_LOG"] = ""
+
+import numpy as np
+import pandas as pd
+
+import agronity_test as ag
+import app
+
+success_count = 0
+fail_count = 0
+
+# Grid arrays of the /whatif answer that /analyze reports for a feasible crop
+GRID_FIELDS = ["probability", "expected_yield_tpha", "profit_rs", "total_revenue_rs"]
+
+
+def check(name, ok, detail=""):
+    global success_count, fail_count
+    print(f"{'✓' if ok else '✗'} {name:<62} {detail}")
+    if ok:
+        success_count += 1
+    else:
+        fail_count += 1
+
+
+def at(grid, index):
+    for i in index:
+        grid = grid[i]
+    return grid
+
+
+def single_row(crop, district, soil, area, changes):
+    """One prediction on the matched row with `changes` ({parameter: value}) applied, like a single /analyze."""
+    sk = app.runtime["models"]["sklearn"]
+    matched_row, _ = ag._matched_profile(data_df, district, soil)
+    row = ag._sklearn_input_row(matched_row, crop, area)
+    for name, value in changes.items():
+        column, factor = ag.WHATIF_PARAMETERS[name]
+        row[column] = value * factor
+    X_input = sk["preprocessor"].transform(pd.DataFrame([row]))
+    expected_yield = max(0, sk["reg"].predict(X_input)[0])
+    estimate = ag.estimate_profit(expected_yield, matched_row["Mandi_Price_Rupees_per_kg"], row["area_ha"])
+    return {"feasible": bool(sk["clf"].predict(X_input)[0]), "probability": sk["clf"].predict_proba(X_input)[0, 1],
+            "expected_yield_tpha": expected_yield, "profit_rs": estimate["profit"],
+            "total_revenue_rs": estimate["total_revenue"]}
+
+
+print("\n" + "="*80)
+print("WHAT-IF SWEEP TEST")
+print("="*80 + "\n")
+
+client = app.app.test_client()
+data_df = app.runtime["data_df"]
+base = {"crop": "Paddy", "district": "Chengalpattu", "area": 3, "soil": "Black"}
+
+# Sweeping the area: every grid point equals /analyze with that area
+areas = [0.5, 1, 3, 7.5, 20]
+body = client.post("/whatif", json={**base, "sweep": {"area": areas}}).json
+mismatches = []
+for i, area in enumerate(areas):
+    analysis = client.post("/analyze", json={**base, "area": area}).json
+    if analysis["feasible"] != body["feasible"][i] or \
+            (analysis["feasible"] and any(analysis[f] != body[f][i] for f in GRID_FIELDS)):
+        mismatches.append(area)
+check("area grid points equal /analyze at each area", body["shape"] == [len(areas)] and not mismatches,
+      f"{sum(body['feasible'])} feasible, mismatches {mismatches}")
+
+# Two swept inputs: grid[i][j] is one prediction with both values applied
+sweep = {"rainfall": {"start": 400, "stop": 2400, "steps": 6}, "ph": [5.0, 6.5, 8.0]}
+for district, soil in (("Chengalpattu", "Black"), ("Chennai", "Red")):
+    # Sent as raw JSON: the test client's serializer would sort the sweep keys
+    body = client.post("/whatif", data=json.dumps({**base, "district": district, "soil": soil, "sweep": sweep}),
+                       content_type="application/json").json
+    values = [body["values"][name] for name in body["parameters"]]
+    mismatches = []
+    for index in itertools.product(*(range(len(v)) for v in values)):
+        expected = single_row(base["crop"], district, soil, base["area"],
+                              {name: axis[i] for name, axis, i in zip(body["parameters"], values, index)})
+        if at(body["feasible"], index) != expected["feasible"] or \
+                any(not np.isclose(at(body[f], index), expected[f], rtol=1e-12, atol=0) for f in GRID_FIELDS):
+            mismatches.append(index)
+    check(f"{district}/{soil}: 2-D grid equals single predictions",
+          body["parameters"] == ["rainfall", "ph"] and body["shape"] == [6, 3] and not mismatches,
+          f"{len(mismatches)} of 18 differ")
+check("range spec gives evenly spaced values", body["values"]["rainfall"] == [400, 800, 1200, 1600, 2000, 2400])
+
+# Unswept inputs come from the matched row, so a one-point sweep at the row's own value is /analyze
+matched_row, _ = ag._matched_profile(data_df, "Chengalpattu", "Black")
+fertilizer = float(matched_row["Fertilizer_Usage_kg_per_ha"])
+body = client.post("/whatif", json={**base, "sweep": {"fertilizer": [fertilizer]}}).json
+analysis = client.post("/analyze", json=base).json
+check("sweep at the matched value equals /analyze", body["feasible"] == [analysis["feasible"]] and
+      (not analysis["feasible"] or all(body[f] == [analysis[f]] for f in GRID_FIELDS)))
+
+for sweep, label in (({}, "no parameters"),
+                     ({"area": [1], "ph": [6], "rainfall": [900]}, "three parameters"),
+                     ({"humidity": [1, 2]}, "unknown parameter"),
+                     ({"ph": {"start": 5, "stop": 8, "steps": ag.WHATIF_MAX_STEPS + 1}}, "too many steps"),
+                     ({"ph": list(range(ag.WHATIF_MAX_STEPS + 1))}, "too many values"),
+                     ({"ph": {"start": 5}}, "range without stop"),
+                     ({"ph": ["acid"]}, "non-numeric values")):
+    response = client.post("/whatif", json={**base, "sweep": sweep})
+    check(f"rejects {label}", response.status_code == 400 and "error" in response.json, str(response.status_code))
+response = client.post("/whatif", json={**base, "district": "Nowhere", "soil": "Moon", "sweep": {"ph": [6]}})
+check("unknown district/soil is a 400 with resolved inputs", response.status_code == 400 and
+      "resolved_inputs" in response.json, str(response.status_code))
+
+print("\n" + "="*80)
+print(f"Results: {success_count} successful, {fail_count} failed")
+print("="*80)
+sys.exit(1 if fail_count else 0)
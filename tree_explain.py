@@ -0,0 +1,184 @@
+"""
+Per-prediction feature attributions for sklearn tree models.
+
+Uses path tracing (Saabas): following one row's path through a tree, each
+split moves the node value from the parent's to the child's, and that change
+is credited to the split's feature. Summed over the trees of an ensemble, a
+prediction is exactly the ensemble's base value (the average root value) plus
+one contribution per input feature.
+
+The per-node change and the feature credited for it are precomputed once per
+model, with every tree's nodes numbered into one array. Explaining rows is then
+one apply() per tree to find the leaves, and a vectorized walk from all leaves
+up to the roots through the parent links, accumulated with one bincount.
+Results for single rows are cached by the row's bytes.
+
+A row may leave features unknown (NaN). Its paths then follow both children of
+every split on an unknown feature, weighted by the training samples reaching
+each child, so the explained output is the expected prediction given the known
+features and the contributions still add up to it exactly.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_ENTRIES = 4096
+
+
+def _trees(model):
+    """(fitted trees, weight of each tree's output, output units) for supported models."""
+    estimators = getattr(model, "estimators_", None)
+    if estimators is None and hasattr(model, "tree_"):
+        return [model], 1.0, None
+    if isinstance(estimators, np.ndarray):  # gradient boosting: one regression tree per stage and class
+        if estimators.shape[1] != 1:
+            raise ValueError("multiclass gradient boosting is not supported")
+        return list(estimators[:, 0]), float(model.learning_rate), "raw"
+    if isinstance(estimators, list) and estimators and all(hasattr(e, "tree_") for e in estimators):
+        return estimators, 1.0 / len(estimators), None
+    raise ValueError(f"{type(model).__name__} is not a supported tree model")
+
+
+def _node_values(tree, model, class_index, boosted):
+    """Scalar output of every node: class probability for classifiers, mean over targets for regressors."""
+    value = tree.tree_.value
+    if boosted or not hasattr(model, "classes_"):
+        return value[:, :, 0].mean(axis=1)
+    counts = value[:, 0, :]
+    return counts[:, class_index] / counts.sum(axis=1)
+
+
+class TreeExplainer:
+    """
+    Attributions for one fitted tree model. For classifiers the explained output is
+    the probability of `positive_class` (forests and single trees) or the raw
+    log-odds (gradient boosting); for multi-output regressors it is the mean of
+    the outputs.
+    """
+
+    def __init__(self, model, positive_class=1, cache_entries=CACHE_ENTRIES):
+        self.model = model
+        trees, weight, units = _trees(model)
+        self.boosted = units == "raw"
+        classes = list(getattr(model, "classes_", []))
+        class_index = classes.index(positive_class) if positive_class in classes else len(classes) - 1
+        self.units = "log_odds" if self.boosted and classes else ("probability" if classes else "value")
+        self.n_features = model.n_features_in_
+        self._trees = [t.tree_ for t in trees]
+
+        parents, features, deltas, offsets = [], [], [], []
+        lefts, rights, splits, thresholds, covers = [], [], [], [], []
+        offset, base = 0, 0.0
+        for tree in trees:
+            structure = tree.tree_
+            values = _node_values(tree, model, class_index, self.boosted)
+            nodes = np.arange(structure.node_count)
+            internal = structure.children_left >= 0
+            parent = np.full(structure.node_count, -1)
+            parent[structure.children_left[internal]] = nodes[internal]
+            parent[structure.children_right[internal]] = nodes[internal]
+            child = parent >= 0
+            feature = np.zeros(structure.node_count, dtype=np.intp)
+            feature[child] = structure.feature[parent[child]]
+            delta = np.zeros(structure.node_count)
+            delta[child] = (values[child] - values[parent[child]]) * weight
+            parents.append(np.where(child, parent + offset, -1))
+            lefts.append(np.where(internal, structure.children_left + offset, -1))
+            rights.append(np.where(internal, structure.children_right + offset, -1))
+            splits.append(np.where(internal, structure.feature, 0))
+            thresholds.append(structure.threshold)
+            covers.append(structure.weighted_n_node_samples)
+            features.append(feature)
+            deltas.append(delta)
+            offsets.append(offset)
+            base += values[0] * weight
+            offset += structure.node_count
+        # Indexed by global node id: parent node, feature split on to reach it, value change
+        self._parent = np.concatenate(parents)
+        self._feature = np.concatenate(features)
+        self._delta = np.concatenate(deltas)
+        self._offsets = np.array(offsets)
+        # Children, split feature, threshold and training cover, for rows with unknown features
+        self._left = np.concatenate(lefts)
+        self._right = np.concatenate(rights)
+        self._split = np.concatenate(splits)
+        self._threshold = np.concatenate(thresholds)
+        self._cover = np.concatenate(covers)
+        self.base = base  # boosted models add their init prediction per row in explain()
+        self._cache = OrderedDict()
+        self._cache_entries = cache_entries
+        self._lock = threading.Lock()
+
+    def _compute(self, X):
+        n_rows = len(X)
+        leaves = np.stack([tree.apply(X) for tree in self._trees], axis=1) + self._offsets
+        nodes = leaves.ravel()
+        slots = np.repeat(np.arange(n_rows) * self.n_features, len(self._trees))
+        index, weights = [], []
+        while nodes.size:  # one step up every path per iteration
+            index.append(slots + self._feature[nodes])
+            weights.append(self._delta[nodes])
+            parent = self._parent[nodes]
+            up = parent >= 0
+            nodes, slots = parent[up], slots[up]
+        contributions = np.bincount(np.concatenate(index), weights=np.concatenate(weights),
+                                    minlength=n_rows * self.n_features).reshape(n_rows, self.n_features)
+        if self.boosted:
+            raw = self.model.decision_function(X) if self.units == "log_odds" else self.model.predict(X)
+            base = np.asarray(raw, dtype=np.float64).reshape(len(X)) - contributions.sum(axis=1)
+        else:
+            base = np.full(len(X), self.base)
+        return base, contributions
+
+    def _compute_marginal(self, x):
+        """One row with NaN for unknown features: walks down every path, splitting weight at unknown splits."""
+        contributions = np.zeros(self.n_features)
+        nodes = self._offsets.copy()
+        weights = np.ones(len(nodes))
+        while nodes.size:
+            internal = self._left[nodes] >= 0
+            nodes, weights = nodes[internal], weights[internal]
+            value = x[self._split[nodes]]
+            unknown = np.isnan(value)
+            go_left = value <= self._threshold[nodes]
+            known = ~unknown
+            children = [np.where(go_left[known], self._left[nodes[known]], self._right[nodes[known]]),
+                        self._left[nodes[unknown]], self._right[nodes[unknown]]]
+            child_weights = [weights[known],
+                             weights[unknown] * self._cover[children[1]] / self._cover[nodes[unknown]],
+                             weights[unknown] * self._cover[children[2]] / self._cover[nodes[unknown]]]
+            # Across both children of an unknown split the changes cancel (the parent value is their
+            # cover-weighted mean), so only known splits are credited
+            contributions += np.bincount(self._feature[children[0]], weights=child_weights[0] * self._delta[children[0]],
+                                         minlength=self.n_features)
+            nodes, weights = np.concatenate(children), np.concatenate(child_weights)
+        return np.array([self.base]), contributions.reshape(1, -1)
+
+    def explain(self, X):
+        """
+        (base value per row, contributions [rows x features]); base + contributions.sum(1)
+        is the prediction (the expected prediction for a single row with NaN features).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(X) != 1:
+            return self._compute(X)  # batches must be complete
+        key = X.tobytes()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        if np.isnan(X).any():
+            if self.boosted:
+                raise ValueError("unknown features are not supported for gradient boosting")
+            result = self._compute_marginal(X[0])
+        else:
+            result = self._compute(X)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self._cache_entries:
+                self._cache.popitem(last=False)
+        return result